@@ -1,110 +1,301 @@
-import pyodbc
-from flask import Flask, jsonify, render_template, request, redirect, url_for, session, send_file
+import click
+import csv
+from flask import Flask, Response, jsonify, render_template, request, redirect, url_for, session, send_file
 from flask_cors import CORS
 from datetime import datetime
+import json
+import math
 import secrets
 import io
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
-from reportlab.lib.units import inch
+import os
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from auth import CredentialCache, HasherBusy, LoginRateLimiter, PasswordHasher, is_password_hash
+from db_backend import create_backend
+from db_pool import ConnectionPool
+from catalog import (
+    CatalogCache, bump_catalog_version, bump_catalog_version_after_commit, catalog_etag, read_catalog_version,
+)
+from checkout import MAX_BATCH_SALES, InsufficientStock, ItemLocks, ItemLockTimeout, checkout, checkout_batch
+from instrumentation import InstrumentedConnection, Metrics, define_metrics, instrument_app, timed_acquire
+from exports import EXPORT_FORMATS, csv_gzip_chunks, export_query, parquet_available, parquet_chunks
+from invoices import InvoiceCache, invoice_cache_key, render_invoice
+from item_changes import (
+    DEFAULT_CHANGES_LIMIT, ITEM_STREAM_LIMIT, ITEM_STREAM_MAX_SECONDS, ITEM_STREAM_RETRY_MS, ItemChangeFeed,
+    current_item_version, fetch_item_changes, parse_changes_limit, parse_since, record_item_deletion,
+)
+from item_import import ItemImport, import_format, iter_csv_records, iter_jsonl_records
+from item_search import ItemSearch, fetch_item_documents, parse_search_limit
+from rbac import RBAC, bump_role_permission_version, fetch_role_permissions, read_role_permission_version
+from report_jobs import REPORTS_DIR, ReportJobs
+import repository
+from repository import ITEMS_QUERY
+from sales_rollups import backfill_sales, record_sale
+from schema import apply_migrations
+from sessions import ServerSessionInterface, create_session_store, rotate_session
+from stats import ActiveUserTracker, read_stats, rebuild_stats, record_items, record_transaction
+from streaming import stream_chunks, stream_query, wants_ndjson, wants_stream
+from tenancy import PerTenant, parse_tenant_databases
+from transaction_queries import (
+    TRANSACTION_COLUMNS, TRANSACTION_LINES_QUERY, build_transaction_filters, encode_cursor,
+    keyset_page_query, parse_page_size, parse_username_match, transaction_to_dict, where_sql,
+)
 
 app = Flask(__name__)
-# Automatically generate a secure secret key
-app.secret_key = secrets.token_hex(16)
+# Set SECRET_KEY to keep anything Flask signs valid across restarts and
+# workers; otherwise a random key is generated at startup
+app.secret_key = os.environ.get('SECRET_KEY') or secrets.token_hex(16)
+
+# Sessions live server-side; the cookie carries only a random session id.
+# SESSION_STORE=sqlite shares them between worker processes on this host
+session_store = create_session_store(
+    os.environ.get('SESSION_STORE', 'memory'),
+    ttl=int(os.environ.get('SESSION_TTL', str(8 * 3600))),
+    max_entries=int(os.environ.get('SESSION_MAX_ENTRIES', '10000')),
+    path=os.environ.get('SESSION_DB', 'sessions.db'),
+)
+app.session_interface = ServerSessionInterface(session_store)
 
 # Enable CORS for all routes
 CORS(app, supports_credentials=True)
 
 # Updated connection string - make sure this matches your SQL Server setup
-conn_str = (
+conn_str = os.environ.get('DB_CONNECTION_STRING') or (
     "Driver={SQL Server};"
     "Server=localhost;"
     "Database=RBAC;"
     "Trusted_Connection=yes;"
 )
 
-def get_db_connection():
-    try:
-        return pyodbc.connect(conn_str)
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        return None
+# DB_BACKEND=sqlite serves from a local SQLite file (SQLITE_PATH) instead, e.g. at edge stores
+backend = create_backend(
+    os.environ.get('DB_BACKEND', 'mssql'),
+    conn_str=conn_str,
+    sqlite_path=os.environ.get('SQLITE_PATH', 'rbac_pos.db'),
+)
+
+# Request, SQL and PDF timings for /metrics and the per-request log line
+metrics = define_metrics(Metrics())
+instrument_app(app, metrics, log_requests=os.environ.get('REQUEST_LOG', '1') != '0')
+SLOW_QUERY_SECONDS = float(os.environ.get('SLOW_QUERY_MS', '500')) / 1000.0
+
+# Large tenants can keep their items and transactions in a database of their
+# own (TENANT_DATABASES); users, roles and everyone else stay in the main one
+tenant_backends = parse_tenant_databases(os.environ.get('TENANT_DATABASES'))
+
+def backend_for(tenant_id):
+    return tenant_backends.get(tenant_id, backend)
+
+# Connection pool settings (per process, and per database)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '10'))
+DB_POOL_TIMEOUT = float(os.environ.get('DB_POOL_TIMEOUT', '5'))
+DB_POOL_MAX_IDLE = float(os.environ.get('DB_POOL_MAX_IDLE', '300'))
+
+def create_pool(database):
+    return ConnectionPool(
+        lambda: InstrumentedConnection(database.connect(), metrics, SLOW_QUERY_SECONDS),
+        max_size=DB_POOL_SIZE,
+        timeout=DB_POOL_TIMEOUT,
+        max_idle=DB_POOL_MAX_IDLE,
+    )
+
+db_pool = create_pool(backend)
+tenant_pools = {tenant_id: create_pool(database) for tenant_id, database in tenant_backends.items()}
+
+@contextmanager
+def get_db_connection(tenant_id=None):
+    # Borrow a pooled connection; it always goes back to the pool (rolled back
+    # if left mid-transaction) when the with-block exits, even on errors.
+    # Pass the tenant for its items and transactions (they may live elsewhere).
+    pool = tenant_pools.get(tenant_id, db_pool)
+    with ExitStack() as stack:
+        try:
+            conn = stack.enter_context(timed_acquire(metrics, pool.connection()))
+        except Exception as e:
+            print(f"Database connection error: {e}")
+            conn = None
+        yield conn
+
+def load_role_permissions():
+    with get_db_connection() as conn:
+        if not conn:
+            raise RuntimeError("Database connection failed")
+        return fetch_role_permissions(conn.cursor())
+
+def load_role_permission_version():
+    with get_db_connection() as conn:
+        if not conn:
+            raise RuntimeError("Database connection failed")
+        return read_role_permission_version(conn.cursor())
+
+# Rendered invoice PDFs, LRU-evicted by size; set INVOICE_CACHE_DIR to keep them on disk
+invoice_cache = InvoiceCache(
+    max_bytes=int(os.environ.get('INVOICE_CACHE_MAX_BYTES', str(64 * 1024 * 1024))),
+    directory=os.environ.get('INVOICE_CACHE_DIR') or None,
+)
+
+# Queues this process's concurrent checkouts of the same items
+item_locks = ItemLocks(timeout=float(os.environ.get('ITEM_LOCK_TIMEOUT', '2')))
+
+# Serialized item catalogs, served while CatalogVersions is unchanged
+catalog_cache = CatalogCache(
+    max_bytes=int(os.environ.get('CATALOG_CACHE_MAX_BYTES', str(16 * 1024 * 1024))),
+)
+
+# Report PDFs are rendered off the request thread by a local process pool
+report_jobs = ReportJobs(
+    backend_for,
+    directory=os.environ.get('REPORTS_DIR', REPORTS_DIR),
+    max_workers=int(os.environ.get('REPORT_WORKERS', '2')),
+    metrics=metrics,
+    slow_query_seconds=SLOW_QUERY_SECONDS,
+)
+
+# Role -> permission sets, cached per process and reloaded every RBAC_CACHE_TTL
+# seconds, or within RBAC_VERSION_INTERVAL of a change made in any process
+rbac = RBAC(
+    load_role_permissions,
+    ttl=float(os.environ.get('RBAC_CACHE_TTL', '300')),
+    read_version=load_role_permission_version,
+    check_interval=float(os.environ.get('RBAC_VERSION_INTERVAL', '1')),
+)
+
+# Password hashes are checked on a bounded pool, off the request threads, and
+# recent logins are remembered so a re-login skips the hash
+password_hasher = PasswordHasher(
+    workers=int(os.environ.get('LOGIN_HASH_WORKERS', str(min(4, os.cpu_count() or 1)))),
+    max_pending=int(os.environ.get('LOGIN_HASH_QUEUE', '64')),
+)
+credential_cache = CredentialCache(ttl=float(os.environ.get('LOGIN_CACHE_TTL', '300')))
+login_limiter = LoginRateLimiter(
+    max_failures=int(os.environ.get('LOGIN_MAX_FAILURES', '5')),
+    window=float(os.environ.get('LOGIN_FAILURE_WINDOW', '300')),
+)
+
+def load_item_documents(tenant_id):
+    with get_db_connection(tenant_id) as conn:
+        if not conn:
+            raise RuntimeError("Database connection failed")
+        return fetch_item_documents(conn.cursor(), tenant_id)
+
+# In-process item search index per tenant; item writes update it, other processes' writes show up on rebuild
+item_search = PerTenant(lambda tenant_id: ItemSearch(
+    lambda: load_item_documents(tenant_id),
+    ttl=float(os.environ.get('ITEM_INDEX_TTL', '300')),
+))
+
+def load_item_version(tenant_id):
+    with get_db_connection(tenant_id) as conn:
+        if not conn:
+            raise RuntimeError("Database connection failed")
+        return current_item_version(conn.cursor())
+
+def load_item_changes(tenant_id, since, limit):
+    with get_db_connection(tenant_id) as conn:
+        if not conn:
+            raise RuntimeError("Database connection failed")
+        return fetch_item_changes(conn.cursor(), tenant_id, since, limit)
+
+# Shared Items change watcher per tenant: that tenant's pollers and SSE clients are served from it
+item_feed = PerTenant(lambda tenant_id: ItemChangeFeed(
+    lambda: load_item_version(tenant_id),
+    lambda since, limit: load_item_changes(tenant_id, since, limit),
+    interval=float(os.environ.get('ITEM_FEED_INTERVAL', '2')),
+))
+
+# Each open change stream holds a request thread, so only this many run per
+# process; further clients are refused with 503 and poll /api/items/changes
+item_stream_slots = threading.BoundedSemaphore(int(os.environ.get('ITEM_STREAM_LIMIT', str(ITEM_STREAM_LIMIT))))
+item_stream_max_seconds = float(os.environ.get('ITEM_STREAM_MAX_SECONDS', str(ITEM_STREAM_MAX_SECONDS)))
+
+# Users seen recently, for the dashboard's active-user card. Counted in the
+# shared session store when there is one, so every worker reports the same
+# number; the in-memory store only knows this process's users
+active_users = ActiveUserTracker(store=session_store if session_store.shared else None)
+
+@app.before_request
+def track_active_user():
+    if 'user' in session:
+        try:
+            active_users.touch(session['user']['tenantID'], session['user']['userID'])
+        except Exception as e:
+            print(f"Error recording active user: {e}")
+
+def item_to_dict(row):
+    return {
+        'ItemID': row[0],
+        'ItemName': row[1],
+        'Category': row[2],
+        'Quantity': row[3],
+        'Price': float(row[4])
+    }
 
 @app.route('/')
 def home():
     return render_template('index.html')
 
+def login_error(message, status=200, retry_after=None):
+    response = app.make_response((render_template('index.html', error=message), status))
+    if retry_after:
+        response.headers['Retry-After'] = str(math.ceil(retry_after))
+    return response
+
 @app.route('/login', methods=['POST'])
 def login():
-    username = request.form.get('username')
-    password = request.form.get('password')
+    username = request.form.get('username') or ''
+    password = request.form.get('password') or ''
+
+    retry_after = login_limiter.retry_after(username)
+    if retry_after:
+        return login_error("Too many failed logins, try again later", 429, retry_after)
 
     try:
-        conn = get_db_connection()
-        if not conn:
-            error_message = "Database connection failed"
-            return render_template('index.html', error=error_message)
-            
-        cursor = conn.cursor()
-        
-        # Get user with tenant info
-        cursor.execute("""
-            SELECT u.UserID, u.Username, u.PasswordHash, u.TenantID, t.TenantName
-            FROM Users u
-            JOIN Tenants t ON u.TenantID = t.TenantID
-            WHERE u.Username = ?
-        """, (username,))
-        
-        user_row = cursor.fetchone()
-        
-        # For demo purposes, we're using simple password comparison
-        if user_row and user_row[2] == password:
-            user_id = user_row[0]
-            
-            # Get user roles
-            cursor.execute("""
-                SELECT r.RoleName
-                FROM UserRoles ur
-                JOIN Roles r ON ur.RoleID = r.RoleID
-                WHERE ur.UserID = ?
-            """, (user_id,))
-            
-            roles = [row[0] for row in cursor.fetchall()]
-            
-            # Get user permissions
-            cursor.execute("""
-                SELECT DISTINCT p.PermissionName
-                FROM UserRoles ur
-                JOIN RolePermissions rp ON ur.RoleID = rp.RoleID
-                JOIN Permissions p ON rp.PermissionID = p.PermissionID
-                WHERE ur.UserID = ?
-            """, (user_id,))
-            
-            permissions = [row[0] for row in cursor.fetchall()]
-            
-            # Store user data in session
-            session['user'] = {
-                'userID': user_id,
-                'username': user_row[1],
-                'tenantID': user_row[3],
-                'tenantName': user_row[4],
-                'roles': roles,
-                'permissions': permissions
-            }
-            
-            conn.close()
-            return redirect(url_for('dashboard'))
+        with get_db_connection() as conn:
+            if not conn:
+                return login_error("Database connection failed")
+
+            # User, tenant and roles in one round trip; permissions come from the RBAC cache
+            user_row = repository.fetch_login(conn.cursor(), username)
+
+        # The connection is back in the pool before the (slow) hash check
+        stored = user_row[2] if user_row else None
+        if user_row and credential_cache.matches(user_row[1], stored, password):
+            valid = True
         else:
-            conn.close()
-            error_message = "Invalid username or password"
-            return render_template('index.html', error=error_message)
-            
+            valid = password_hasher.verify(stored, password)
+            if valid:
+                if not is_password_hash(stored):
+                    # Replace a legacy plaintext password with its hash on first use
+                    stored = password_hasher.hash(password)
+                    with get_db_connection() as conn:
+                        if conn:
+                            repository.update_password_hash(conn.cursor(), user_row[0], stored)
+                            conn.commit()
+                credential_cache.remember(user_row[1], stored, password)
+
+        if not valid:
+            login_limiter.record_failure(username)
+            return login_error("Invalid username or password")
+
+        login_limiter.reset(username)
+        # Store user data in session; permissions are resolved per
+        # request from the cached role -> permission sets
+        rotate_session(session)
+        session['user'] = {
+            'userID': user_row[0],
+            'username': user_row[1],
+            'tenantID': user_row[3],
+            'tenantName': user_row[4],
+            'roles': user_row[5]
+        }
+        return redirect(url_for('dashboard'))
+
+    except HasherBusy:
+        return login_error("The server is busy, please try again", 503, 1)
     except Exception as e:
         print(f"Database error: {e}")
-        error_message = "Database connection error"
-        return render_template('index.html', error=error_message)
+        return login_error("Database connection error")
 
 @app.route('/dashboard')
 def dashboard():
@@ -113,435 +304,559 @@ def dashboard():
     return render_template('dashboard.html')
 
 @app.route('/api/user')
+@rbac.requires()
 def get_current_user():
-    if 'user' not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-    return jsonify(session['user'])
+    user = dict(session['user'])
+    user['permissions'] = sorted(rbac.permissions_for(user['roles']))
+    return jsonify(user)
 
 @app.route('/api/items')
+@rbac.requires('Read_Item')
 def get_items():
-    if 'user' not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-    
-    user_permissions = session['user']['permissions']
-    if 'Read_Item' not in user_permissions:
-        return jsonify({'error': 'Access denied'}), 403
-    
+    tenant_id = session['user']['tenantID']
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
+        if wants_stream(request):
+            response = stream_query(get_db_connection(tenant_id), ITEMS_QUERY, (tenant_id,), item_to_dict,
+                                    ndjson=wants_ndjson(request))
+            if response is None:
+                return jsonify({'error': 'Database connection failed'}), 500
+            return response
+
+        with get_db_connection(tenant_id) as conn:
+            if not conn:
+                return jsonify({'error': 'Database connection failed'}), 500
             
-        cursor = conn.cursor()
-        cursor.execute("SELECT ItemID, ItemName, Category, Quantity, Price FROM Items")
-        
-        items = []
-        for row in cursor.fetchall():
-            items.append({
-                'ItemID': row[0],
-                'ItemName': row[1],
-                'Category': row[2],
-                'Quantity': row[3],
-                'Price': float(row[4])
-            })
-        
-        conn.close()
-        return jsonify(items)
+            cursor = conn.cursor()
+            # One primary-key read decides between 304, a cached body and a full load
+            version = read_catalog_version(cursor, tenant_id)
+            etag = catalog_etag(tenant_id, version)
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+            else:
+                cached = catalog_cache.get(tenant_id, version)
+                if cached is None:
+                    # Read first, so the body is at least this new for /api/items/changes
+                    item_version = current_item_version(cursor)
+                    items = [item_to_dict(row) for row in repository.fetch_items(cursor, tenant_id)]
+                    cached = catalog_cache.put(tenant_id, version, items, item_version)
+                body, item_version = cached
+                response = app.response_class(body, mimetype='application/json')
+                response.headers['X-Items-Version'] = str(item_version)
+
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
     except Exception as e:
         print(f"Error fetching items: {e}")
         return jsonify({'error': 'Failed to fetch items'}), 500
 
+@app.route('/api/items/search')
+@rbac.requires('Read_Item')
+def search_items():
+    try:
+        limit = parse_search_limit(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    tenant_id = session['user']['tenantID']
+    try:
+        item_ids = item_search[tenant_id].search(request.args.get('q', ''), limit)
+        if not item_ids:
+            return jsonify([])
+
+        # The index only ranks; current stock and price come from the table
+        with get_db_connection(tenant_id) as conn:
+            if not conn:
+                return jsonify({'error': 'Database connection failed'}), 500
+
+            rows = {row[0]: row for row in repository.fetch_items(conn.cursor(), tenant_id, item_ids)}
+
+        return jsonify([item_to_dict(rows[item_id]) for item_id in item_ids if item_id in rows])
+    except Exception as e:
+        print(f"Error searching items: {e}")
+        return jsonify({'error': 'Failed to search items'}), 500
+
+@app.route('/api/items/changes')
+@rbac.requires('Read_Item')
+def get_item_changes():
+    # Items changed since the client's version; since=0 (or none) is a full snapshot
+    try:
+        since = parse_since(request.args.get('since'))
+        limit = parse_changes_limit(request.args.get('limit'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    tenant_id = session['user']['tenantID']
+    try:
+        changes = item_feed[tenant_id].changes_since(since, limit) if since else None
+        if changes is None:
+            changes = load_item_changes(tenant_id, since, limit)
+        return jsonify(changes)
+    except Exception as e:
+        print(f"Error fetching item changes: {e}")
+        return jsonify({'error': 'Failed to fetch item changes'}), 500
+
+@app.route('/api/items/changes/stream')
+@rbac.requires('Read_Item')
+def stream_item_changes():
+    # Server-Sent Events; EventSource resends the last event id when it reconnects
+    try:
+        since = parse_since(request.headers.get('Last-Event-ID') or request.args.get('since'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if not item_stream_slots.acquire(blocking=False):
+        # EventSource gives up on a 503; the dashboard then polls instead
+        response = jsonify({'error': 'Too many open change streams; poll /api/items/changes'})
+        response.headers['Retry-After'] = str(ITEM_STREAM_RETRY_MS // 1000)
+        return response, 503
+
+    tenant_id = session['user']['tenantID']
+    feed = item_feed[tenant_id]
+    deadline = time.monotonic() + item_stream_max_seconds
+
+    def event(changes):
+        return f"id: {changes['version']}\nevent: items\ndata: {json.dumps(changes)}\n\n"
+
+    def generate():
+        current = since
+        yield f"retry: {ITEM_STREAM_RETRY_MS}\n\n"
+        try:
+            while True:
+                changes = feed.changes_since(current) if current else None
+                if changes is None:
+                    changes = load_item_changes(tenant_id, current, DEFAULT_CHANGES_LIMIT)
+                if changes['version'] > current or not current:
+                    yield event(changes)
+                    current = changes['version']
+                if changes['hasMore']:
+                    continue
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    # Hand the thread back; the client reconnects from its last event id
+                    return
+                if feed.wait(current, timeout=min(15, remaining)) in (None, current):
+                    # Comment line keeps proxies from closing an idle stream
+                    yield ': keepalive\n\n'
+        except Exception as e:
+            print(f"Error streaming item changes: {e}")
+
+    try:
+        response = Response(generate(), mimetype='text/event-stream',
+                            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+    except Exception:
+        item_stream_slots.release()
+        raise
+    # The server closes the response when the stream ends or the client goes away
+    response.call_on_close(item_stream_slots.release)
+    return response
+
 @app.route('/api/items', methods=['POST'])
+@rbac.requires('Create_Item')
 def create_item():
-    if 'user' not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-    
-    user_permissions = session['user']['permissions']
-    if 'Create_Item' not in user_permissions:
-        return jsonify({'error': 'Access denied'}), 403
-    
     data = request.json
+    tenant_id = session['user']['tenantID']
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
+        with get_db_connection(tenant_id) as conn:
+            if not conn:
+                return jsonify({'error': 'Database connection failed'}), 500
             
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO Items (ItemName, Category, Quantity, Price)
-            VALUES (?, ?, ?, ?)
-        """, (data['itemName'], data['category'], data['quantity'], data['price']))
-        
-        conn.commit()
-        conn.close()
-        return jsonify({'message': 'Item created successfully'})
+            cursor = conn.cursor()
+            item_id = repository.insert_item(cursor, tenant_id, data['itemName'], data['category'],
+                                             data['quantity'], data['price'])
+            record_items(cursor, tenant_id, 1)
+            bump_catalog_version(cursor, tenant_id)
+        
+            conn.commit()
+            catalog_cache.invalidate(tenant_id)
+            item_search[tenant_id].upsert(item_id, data['itemName'], data['category'])
+            item_feed[tenant_id].poke()
+            return jsonify({'message': 'Item created successfully'})
     except Exception as e:
         print(f"Error creating item: {e}")
         return jsonify({'error': 'Failed to create item'}), 500
 
+@app.route('/api/items/import', methods=['POST'])
+@rbac.requires('Create_Item')
+def import_items():
+    # Supplier price lists: CSV or JSON lines, streamed, upserted by item name
+    if not rbac.allows(session['user']['roles'], 'Update_Item'):
+        return jsonify({'error': 'Access denied'}), 403
+    try:
+        upload_format = import_format(request.args.get('format'), request.content_type)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    records = (iter_csv_records if upload_format == 'csv' else iter_jsonl_records)(request.stream)
+
+    tenant_id = session['user']['tenantID']
+
+    def after_write(cursor, inserted, updated):
+        if inserted:
+            record_items(cursor, tenant_id, inserted)
+        if inserted or updated:
+            bump_catalog_version(cursor, tenant_id)
+
+    job = None
+    try:
+        with get_db_connection(tenant_id) as conn:
+            if not conn:
+                return jsonify({'error': 'Database connection failed'}), 500
+
+            job = ItemImport(conn, tenant_id, after_write=after_write)
+            summary = job.run(records)
+        return jsonify(summary)
+    except (UnicodeDecodeError, csv.Error) as e:
+        # Chunks before the unreadable part are already saved
+        return jsonify(dict(job.summary, error=f'Upload could not be read: {e}')), 400
+    except Exception as e:
+        print(f"Error importing items: {e}")
+        return jsonify({'error': 'Failed to import items'}), 500
+    finally:
+        if job is not None and (job.summary['inserted'] or job.summary['updated']):
+            catalog_cache.invalidate(tenant_id)
+            # Rebuilt on the next search rather than patched row by row
+            item_search[tenant_id].invalidate()
+            item_feed[tenant_id].poke()
+
 @app.route('/api/items/<int:item_id>', methods=['PUT'])
+@rbac.requires('Update_Item')
 def update_item(item_id):
-    if 'user' not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-    
-    user_permissions = session['user']['permissions']
-    if 'Update_Item' not in user_permissions:
-        return jsonify({'error': 'Access denied'}), 403
-    
     data = request.json
+    tenant_id = session['user']['tenantID']
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
+        with get_db_connection(tenant_id) as conn:
+            if not conn:
+                return jsonify({'error': 'Database connection failed'}), 500
             
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE Items 
-            SET ItemName = ?, Category = ?, Quantity = ?, Price = ?
-            WHERE ItemID = ?
-        """, (data['itemName'], data['category'], data['quantity'], data['price'], item_id))
-        
-        conn.commit()
-        conn.close()
-        return jsonify({'message': 'Item updated successfully'})
+            cursor = conn.cursor()
+            updated = repository.update_item(cursor, tenant_id, item_id, data['itemName'], data['category'],
+                                             data['quantity'], data['price'])
+            if not updated:
+                return jsonify({'error': 'Item not found'}), 404
+            bump_catalog_version(cursor, tenant_id)
+        
+            conn.commit()
+            catalog_cache.invalidate(tenant_id)
+            item_search[tenant_id].upsert(item_id, data['itemName'], data['category'])
+            item_feed[tenant_id].poke()
+            return jsonify({'message': 'Item updated successfully'})
     except Exception as e:
         print(f"Error updating item: {e}")
         return jsonify({'error': 'Failed to update item'}), 500
 
 @app.route('/api/items/<int:item_id>', methods=['DELETE'])
+@rbac.requires('Delete_Item')
 def delete_item(item_id):
-    if 'user' not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-    
-    user_permissions = session['user']['permissions']
-    if 'Delete_Item' not in user_permissions:
-        return jsonify({'error': 'Access denied'}), 403
-    
+    tenant_id = session['user']['tenantID']
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
+        with get_db_connection(tenant_id) as conn:
+            if not conn:
+                return jsonify({'error': 'Database connection failed'}), 500
             
-        cursor = conn.cursor()
-        cursor.execute("DELETE FROM Items WHERE ItemID = ?", (item_id,))
-        
-        conn.commit()
-        conn.close()
-        return jsonify({'message': 'Item deleted successfully'})
+            cursor = conn.cursor()
+            deleted = repository.delete_item(cursor, tenant_id, item_id)
+            if not deleted:
+                return jsonify({'error': 'Item not found'}), 404
+            record_items(cursor, tenant_id, -deleted)
+            record_item_deletion(cursor, tenant_id, item_id)
+            bump_catalog_version(cursor, tenant_id)
+        
+            conn.commit()
+            catalog_cache.invalidate(tenant_id)
+            item_search[tenant_id].remove(item_id)
+            item_feed[tenant_id].poke()
+            return jsonify({'message': 'Item deleted successfully'})
     except Exception as e:
         print(f"Error deleting item: {e}")
         return jsonify({'error': 'Failed to delete item'}), 500
 
 @app.route('/api/transactions')
+@rbac.requires()
 def get_transactions():
-    if 'user' not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-    
+    # Get query parameters for filtering and paging
+    start_date = request.args.get('start_date')
+    end_date = request.args.get('end_date')
+    username_filter = request.args.get('username')
+    page_cursor = request.args.get('cursor')
+    tenant_id = session['user']['tenantID']
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-            
-        cursor = conn.cursor()
-        
-        # Get query parameters for filtering
-        start_date = request.args.get('start_date')
-        end_date = request.args.get('end_date')
-        username_filter = request.args.get('username')
-        
-        # Build query with filters
-        query = """
-            SELECT tm.TransactionID, tm.TransactionDate, tm.Username, 
-                   tm.TotalAmount, tm.Discount, tm.NetAmount
+        username_match = parse_username_match(request.args.get('username_match'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    if wants_stream(request):
+        # Full filtered history, streamed in fetchmany batches instead of paged
+        clauses, params = build_transaction_filters(tenant_id, start_date, end_date, username_filter, username_match)
+        query = f"""
+            SELECT {TRANSACTION_COLUMNS}
             FROM TransactionMaster tm
-            WHERE 1=1
+            {where_sql(clauses)}
+            ORDER BY tm.TransactionDate DESC, tm.TransactionID DESC
         """
-        params = []
-        
-        if start_date:
-            query += " AND tm.TransactionDate >= ?"
-            params.append(start_date)
-        
-        if end_date:
-            query += " AND tm.TransactionDate <= ?"
-            params.append(end_date + ' 23:59:59')  # Include full day
-        
-        if username_filter:
-            query += " AND tm.Username LIKE ?"
-            params.append(f'%{username_filter}%')
-        
-        query += " ORDER BY tm.TransactionDate DESC"
-        
-        cursor.execute(query, params)
-        
-        transactions = []
-        for row in cursor.fetchall():
-            transactions.append({
-                'TransactionID': row[0],
-                'TransactionDate': row[1].isoformat() if row[1] else None,
-                'Username': row[2],
-                'TotalAmount': float(row[3]) if row[3] else 0,
-                'Discount': float(row[4]) if row[4] else 0,
-                'NetAmount': float(row[5]) if row[5] else 0
-            })
-        
-        conn.close()
-        return jsonify(transactions)
+        try:
+            response = stream_query(get_db_connection(tenant_id), query, params, transaction_to_dict,
+                                    ndjson=wants_ndjson(request))
+        except Exception as e:
+            print(f"Error streaming transactions: {e}")
+            return jsonify({'error': 'Failed to fetch transactions'}), 500
+        if response is None:
+            return jsonify({'error': 'Database connection failed'}), 500
+        return response
+
+    try:
+        page_size = parse_page_size(request.args.get('limit'))
+        clauses, params = build_transaction_filters(tenant_id, start_date, end_date, username_filter, username_match)
+        query, params = keyset_page_query(clauses, params, page_size, page_cursor, backend_for(tenant_id).dialect)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        with get_db_connection(tenant_id) as conn:
+            if not conn:
+                return jsonify({'error': 'Database connection failed'}), 500
+            
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        
+        # The query fetches one row past the page to detect a following page
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0]) if has_more else None
+
+        return jsonify({
+            'transactions': [transaction_to_dict(row) for row in rows],
+            'nextCursor': next_cursor
+        })
     except Exception as e:
         print(f"Error fetching transactions: {e}")
         return jsonify({'error': 'Failed to fetch transactions'}), 500
 
 @app.route('/api/transactions', methods=['POST'])
+@rbac.requires()
 def create_transaction():
-    if 'user' not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-    
     data = request.json
+    tenant_id = session['user']['tenantID']
+    catalog_version = None
+
+    def after_write(cursor):
+        # Hot rows (sharded tenant totals) are touched last, just before commit
+        record_transaction(cursor, tenant_id, data['transactionDate'], data['netAmount'])
+        record_sale(cursor, tenant_id, session['user']['username'], data['transactionDate'],
+                    data['totalAmount'], data['discount'], data['netAmount'])
+
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
+        with get_db_connection(tenant_id) as conn:
+            if not conn:
+                return jsonify({'error': 'Database connection failed'}), 500
             
-        cursor = conn.cursor()
-        
-        # Insert transaction master
-        cursor.execute("""
-            INSERT INTO TransactionMaster (TransactionDate, Username, TotalAmount, Discount, NetAmount)
-            VALUES (?, ?, ?, ?, ?)
-        """, (data['transactionDate'], session['user']['username'], 
-              data['totalAmount'], data['discount'], data['netAmount']))
-        
-        # Get the inserted transaction ID
-        cursor.execute("SELECT @@IDENTITY")
-        transaction_id = cursor.fetchone()[0]
-        
-        # Insert transaction details
-        for item in data['items']:
-            cursor.execute("""
-                INSERT INTO TransactionDetails (TransactionID, ItemName, Quantity, Price, Amount)
-                VALUES (?, ?, ?, ?, ?)
-            """, (transaction_id, item['itemName'], item['quantity'], item['price'], item['amount']))
-            
-            # Update item quantity
-            cursor.execute("""
-                UPDATE Items 
-                SET Quantity = Quantity - ?
-                WHERE ItemName = ?
-            """, (item['quantity'], item['itemName']))
-        
-        conn.commit()
-        conn.close()
+            # Master row, detail batch and conditional stock update in one DB transaction
+            transaction_id, stock = checkout(conn, tenant_id, session['user']['username'], data, item_locks,
+                                             after_write=after_write)
+            if stock is not None:
+                # One row per tenant: bumped after the commit so checkouts don't queue on it
+                catalog_version = bump_catalog_version_after_commit(conn, tenant_id)
+
+        if stock is not None:
+            # Move this process's cached catalog forward instead of reloading it
+            if catalog_version is None:
+                catalog_cache.invalidate(tenant_id)
+            else:
+                catalog_cache.patch_stock(tenant_id, catalog_version, stock)
+            item_feed[tenant_id].poke()
         return jsonify({'message': 'Transaction created successfully', 'transactionID': transaction_id})
+    except InsufficientStock as e:
+        return jsonify({'error': 'Insufficient stock', 'itemIDs': e.item_ids}), 409
+    except ItemLockTimeout:
+        return jsonify({'error': 'Items are busy, please retry'}), 503
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         print(f"Error creating transaction: {e}")
         return jsonify({'error': 'Failed to create transaction'}), 500
 
+@app.route('/api/transactions/batch', methods=['POST'])
+@rbac.requires()
+def create_transactions_batch():
+    # Sales queued by a till, each with a client-generated idempotencyKey;
+    # re-sending a batch never writes a sale twice
+    sales = (request.json or {}).get('transactions')
+    if not isinstance(sales, list) or not sales:
+        return jsonify({'error': 'transactions must be a non-empty list'}), 400
+    if len(sales) > MAX_BATCH_SALES:
+        return jsonify({'error': f'At most {MAX_BATCH_SALES} transactions per batch'}), 400
+
+    tenant_id = session['user']['tenantID']
+    username = session['user']['username']
+    catalog_version = None
+
+    def after_write(cursor, written):
+        for sale, _ in written:
+            record_transaction(cursor, tenant_id, sale['transactionDate'], sale['netAmount'])
+            record_sale(cursor, tenant_id, username, sale['transactionDate'],
+                        sale['totalAmount'], sale['discount'], sale['netAmount'])
+
+    try:
+        with get_db_connection(tenant_id) as conn:
+            if not conn:
+                return jsonify({'error': 'Database connection failed'}), 500
+
+            results, stock = checkout_batch(conn, tenant_id, username, sales, item_locks, after_write=after_write)
+            created = any(result['status'] == 'created' for result in results)
+            if created:
+                catalog_version = bump_catalog_version_after_commit(conn, tenant_id)
+
+        if created:
+            if catalog_version is None:
+                catalog_cache.invalidate(tenant_id)
+            else:
+                catalog_cache.patch_stock(tenant_id, catalog_version, stock)
+            item_feed[tenant_id].poke()
+        return jsonify({'results': results})
+    except ItemLockTimeout:
+        return jsonify({'error': 'Items are busy, please retry'}), 503
+    except Exception as e:
+        print(f"Error creating transaction batch: {e}")
+        return jsonify({'error': 'Failed to create transactions'}), 500
+
 @app.route('/api/dashboard-stats')
+@rbac.requires()
 def get_dashboard_stats():
-    if 'user' not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-    
+    tenant_id = session['user']['tenantID']
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
+        with get_db_connection(tenant_id) as conn:
+            if not conn:
+                return jsonify({'error': 'Database connection failed'}), 500
             
-        cursor = conn.cursor()
-        
-        # Get total items
-        cursor.execute("SELECT COUNT(*) FROM Items")
-        total_items = cursor.fetchone()[0]
-        
-        # Get total transactions
-        cursor.execute("SELECT COUNT(*) FROM TransactionMaster")
-        total_transactions = cursor.fetchone()[0]
+            cursor = conn.cursor()
         
-        # Get total revenue
-        cursor.execute("SELECT ISNULL(SUM(NetAmount), 0) FROM TransactionMaster")
-        total_revenue = float(cursor.fetchone()[0])
-        
-        conn.close()
-        return jsonify({
-            'totalItems': total_items,
-            'totalTransactions': total_transactions,
-            'totalRevenue': total_revenue,
-            'activeUsers': 4  # Static for demo
-        })
+            # Running totals maintained alongside every write (see stats.py)
+            stats = read_stats(cursor, tenant_id)
+            stats['activeUsers'] = active_users.count(tenant_id)
+            return jsonify(stats)
     except Exception as e:
         print(f"Error getting dashboard stats: {e}")
         return jsonify({'error': 'Failed to fetch dashboard stats'}), 500
     
-@app.route('/api/generate-invoice/<int:transaction_id>')
-def generate_invoice(transaction_id):
-    if 'user' not in session:
+@app.route('/api/rbac/invalidate', methods=['POST'])
+@rbac.requires()
+def invalidate_role_permissions():
+    if 'Admin' not in session['user']['roles']:
+        return jsonify({'error': 'Access denied'}), 403
+    try:
+        # Other worker processes see the new version on their next check
+        with get_db_connection() as conn:
+            if not conn:
+                return jsonify({'error': 'Database connection failed'}), 500
+            bump_role_permission_version(conn.cursor())
+            conn.commit()
+    except Exception as e:
+        print(f"Error invalidating role permissions: {e}")
+        return jsonify({'error': 'Failed to invalidate role permissions'}), 500
+    rbac.invalidate()
+    return jsonify({'message': 'Role permission cache invalidated'})
+
+def metrics_access_error():
+    """None if the caller may read pool stats and metrics: the METRICS_TOKEN bearer token or an Admin session."""
+    token = os.environ.get('METRICS_TOKEN')
+    if token and secrets.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+        return None
+    user = session.get('user')
+    if user is None:
         return jsonify({'error': 'Not authenticated'}), 401
+    if 'Admin' not in user['roles']:
+        return jsonify({'error': 'Access denied'}), 403
+    return None
+
+@app.route('/api/db-pool-stats')
+def get_db_pool_stats():
+    error = metrics_access_error()
+    if error:
+        return error
+    stats = db_pool.stats()
+    if tenant_pools:
+        stats['tenants'] = {str(tenant_id): pool.stats() for tenant_id, pool in tenant_pools.items()}
+    return jsonify(stats)
+
+@app.route('/metrics')
+def get_metrics():
+    # Prometheus scrape endpoint: scrape with METRICS_TOKEN as a bearer token
+    error = metrics_access_error()
+    if error:
+        return error
+    # The main database's pool is tenant="default"; TENANT_DATABASES pools carry their TenantID
+    pools = [('default', db_pool.stats())]
+    pools += [(str(tenant_id), pool.stats()) for tenant_id, pool in tenant_pools.items()]
+
+    def samples(field):
+        return [((('tenant', tenant),), stats[field]) for tenant, stats in pools]
+
+    body = metrics.render(gauges={
+        'db_pool_in_use': ('Pooled connections checked out.', samples('inUse')),
+        'db_pool_idle': ('Idle pooled connections.', samples('idle')),
+        'db_pool_max_size': ('Connection pool capacity.', samples('maxSize')),
+        'db_pool_timeouts_total': ('Connection acquisitions that timed out.', samples('timeouts')),
+    })
+    return Response(body, mimetype='text/plain; version=0.0.4')
 
+@app.route('/api/cache-stats')
+@rbac.requires()
+def get_cache_stats():
+    return jsonify({
+        'catalog': catalog_cache.stats(),
+        'invoices': invoice_cache.stats(),
+    })
+
+@app.route('/api/generate-invoice/<int:transaction_id>')
+@rbac.requires()
+def generate_invoice(transaction_id):
+    tenant_id = session['user']['tenantID']
+    tenant_name = session['user']['tenantName']
     try:
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-        
-        cursor = conn.cursor()
-        
-        # Get transaction master details
-        cursor.execute("""
-            SELECT tm.TransactionID, tm.TransactionDate, tm.Username, 
-                   tm.TotalAmount, tm.Discount, tm.NetAmount
-            FROM TransactionMaster tm
-            WHERE tm.TransactionID = ?
-        """, (transaction_id,))
-        
-        transaction = cursor.fetchone()
-        if not transaction:
-            return jsonify({'error': 'Transaction not found'}), 404
+        with get_db_connection(tenant_id) as conn:
+            if not conn:
+                return jsonify({'error': 'Database connection failed'}), 500
         
-        # Get transaction details (items)
-        cursor.execute("""
-            SELECT td.ItemName, td.Quantity, td.Price, td.Amount
-            FROM TransactionDetails td
-            WHERE td.TransactionID = ?
-        """, (transaction_id,))
-        
-        transaction_items = cursor.fetchall()
-        
-        # Generate PDF Invoice
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*inch)
-        story = []
-        
-        # Styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'InvoiceTitle',
-            parent=styles['Heading1'],
-            fontSize=24,
-            spaceAfter=30,
-            alignment=1,  # Center alignment
-            textColor=colors.darkblue
-        )
-        
-        header_style = ParagraphStyle(
-            'HeaderStyle',
-            parent=styles['Normal'],
-            fontSize=12,
-            spaceAfter=10,
-            textColor=colors.darkblue
-        )
-        
-        # Company Header
-        story.append(Paragraph("RBAC POS SYSTEM", title_style))
-        story.append(Paragraph(f"<b>Tenant:</b> {session['user']['tenantName']}", header_style))
-        story.append(Spacer(1, 20))
-        
-        # Invoice Title and Number
-        invoice_title = ParagraphStyle(
-            'InvoiceNumber',
-            parent=styles['Heading2'],
-            fontSize=18,
-            spaceAfter=20,
-            alignment=1
-        )
-        story.append(Paragraph(f"INVOICE #{transaction[0]:06d}", invoice_title))
-        story.append(Spacer(1, 20))
-        
-        # Invoice Details Table
-        invoice_details = [
-            ['Invoice Date:', transaction[1].strftime('%Y-%m-%d %H:%M:%S') if transaction[1] else ''],
-            ['Served By:', transaction[2] or ''],
-            ['Transaction ID:', str(transaction[0])]
-        ]
-        
-        details_table = Table(invoice_details, colWidths=[2*inch, 3*inch])
-        details_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-        ]))
-        
-        story.append(details_table)
-        story.append(Spacer(1, 30))
-        
-        # Items Table
-        story.append(Paragraph("ITEMS PURCHASED", styles['Heading3']))
-        story.append(Spacer(1, 10))
-        
-        # Items data
-        items_data = [['Item Name', 'Quantity', 'Unit Price', 'Amount']]
-        
-        for item in transaction_items:
-            items_data.append([
-                item[0] or '',  # ItemName
-                str(item[1]) if item[1] else '0',  # Quantity
-                f'${float(item[2]):.2f}' if item[2] else '$0.00',  # Price
-                f'${float(item[3]):.2f}' if item[3] else '$0.00'   # Amount
-            ])
-        
-        # Create items table
-        items_table = Table(items_data, colWidths=[3*inch, 1*inch, 1.5*inch, 1.5*inch])
-        items_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black),
-            ('FONTSIZE', (0, 1), (-1, -1), 10),
-            ('ALIGN', (1, 1), (-1, -1), 'CENTER'),  # Align numbers to center
-            ('ALIGN', (0, 1), (0, -1), 'LEFT'),     # Align item names to left
-        ]))
-        
-        story.append(items_table)
-        story.append(Spacer(1, 30))
-        
-        # Totals Table
-        totals_data = [
-            ['Subtotal:', f'${float(transaction[3]):.2f}' if transaction[3] else '$0.00'],
-            ['Discount:', f'${float(transaction[4]):.2f}' if transaction[4] else '$0.00'],
-            ['TOTAL AMOUNT:', f'${float(transaction[5]):.2f}' if transaction[5] else '$0.00']
-        ]
-        
-        totals_table = Table(totals_data, colWidths=[4*inch, 2*inch])
-        totals_table.setStyle(TableStyle([
-            ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
-            ('FONTNAME', (0, 0), (-1, 1), 'Helvetica'),
-            ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 1), 12),
-            ('FONTSIZE', (0, 2), (-1, 2), 14),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 2), (-1, 2), 12),
-            ('LINEABOVE', (0, 2), (-1, 2), 2, colors.black),
-            ('BACKGROUND', (0, 2), (-1, 2), colors.lightblue),
-        ]))
-        
-        story.append(totals_table)
-        story.append(Spacer(1, 40))
-        
-        # Footer
-        footer_text = f"""
-        <para align="center">
-        <b>Thank you for your business!</b><br/>
-        Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}<br/>
-        System: RBAC POS
-        </para>
-        """
-        story.append(Paragraph(footer_text, styles['Normal']))
-        
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
-        
-        conn.close()
+            cursor = conn.cursor()
         
+            # Get transaction master details (only the tenant's own)
+            transaction = repository.fetch_transaction(cursor, tenant_id, transaction_id)
+            if not transaction:
+                return jsonify({'error': 'Transaction not found'}), 404
+
+            # Same transaction, row version and tenant => byte-identical PDF (the
+            # invoice shows the transaction's own date, never the time it was rendered)
+            cache_key = invoice_cache_key(transaction[0], transaction[6], tenant_name)
+            etag = cache_key[:32]
+            if request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+                return response
+
+            pdf = invoice_cache.get(cache_key)
+            if pdf is None:
+                # Get transaction details (items)
+                cursor.execute(TRANSACTION_LINES_QUERY, (transaction_id,))
+                transaction_items = cursor.fetchall()
+
+        if pdf is None:
+            # Render after the connection is back in the pool
+            with metrics.timer('pdf_build_seconds', kind='invoice'):
+                pdf = render_invoice(transaction, transaction_items, tenant_name)
+            metrics.observe('pdf_size_bytes', len(pdf), kind='invoice')
+            invoice_cache.put(cache_key, pdf)
+
         # Return PDF file
-        return send_file(
-            buffer,
+        response = send_file(
+            io.BytesIO(pdf),
             as_attachment=True,
             download_name=f'invoice_{transaction[0]:06d}.pdf',
             mimetype='application/pdf'
         )
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
         
     except Exception as e:
         print(f"Error generating invoice: {e}")
@@ -549,170 +864,178 @@ def generate_invoice(transaction_id):
 
 
 @app.route('/api/generate-report', methods=['POST'])
+@rbac.requires()
 def generate_report():
-    if 'user' not in session:
-        return jsonify({'error': 'Not authenticated'}), 401
-    
+    data = request.json or {}
+    filters = {
+        'start_date': data.get('start_date') or None,
+        'end_date': data.get('end_date') or None,
+        'username': data.get('username') or None,
+    }
+    report_type = data.get('report_type', 'summary')
+
     try:
-        data = request.json
-        start_date = data.get('start_date')
-        end_date = data.get('end_date')
-        username_filter = data.get('username', '')
-        report_type = data.get('report_type', 'summary')
-        
-        conn = get_db_connection()
-        if not conn:
-            return jsonify({'error': 'Database connection failed'}), 500
-        
-        cursor = conn.cursor()
-        
-        # Build query with filters
-        query = """
-            SELECT tm.TransactionID, tm.TransactionDate, tm.Username, 
-                   tm.TotalAmount, tm.Discount, tm.NetAmount
-            FROM TransactionMaster tm
-            WHERE 1=1
-        """
-        params = []
-        
-        if start_date:
-            query += " AND tm.TransactionDate >= ?"
-            params.append(start_date)
-        
-        if end_date:
-            query += " AND tm.TransactionDate <= ?"
-            params.append(end_date + ' 23:59:59')
-        
-        if username_filter:
-            query += " AND tm.Username LIKE ?"
-            params.append(f'%{username_filter}%')
-        
-        query += " ORDER BY tm.TransactionDate DESC"
-        
-        cursor.execute(query, params)
-        transactions = cursor.fetchall()
-        
-        # Generate PDF
-        buffer = io.BytesIO()
-        doc = SimpleDocTemplate(buffer, pagesize=A4)
-        story = []
-        
-        # Styles
-        styles = getSampleStyleSheet()
-        title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=styles['Heading1'],
-            fontSize=18,
-            spaceAfter=30,
-            alignment=1  # Center alignment
-        )
-        
-        # Title
-        story.append(Paragraph("Transaction Report", title_style))
-        story.append(Spacer(1, 12))
-        
-        # Report Info
-        report_info = f"""
-        <b>Generated by:</b> {session['user']['username']}<br/>
-        <b>Tenant:</b> {session['user']['tenantName']}<br/>
-        <b>Generated on:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}<br/>
-        <b>Date Range:</b> {start_date or 'All'} to {end_date or 'All'}<br/>
-        <b>User Filter:</b> {username_filter or 'All Users'}<br/>
-        <b>Total Transactions:</b> {len(transactions)}
-        """
-        story.append(Paragraph(report_info, styles['Normal']))
-        story.append(Spacer(1, 20))
-        
-        if transactions:
-            # Calculate summary
-            total_amount = sum(float(t[3]) if t[3] else 0 for t in transactions)
-            total_discount = sum(float(t[4]) if t[4] else 0 for t in transactions)
-            total_net = sum(float(t[5]) if t[5] else 0 for t in transactions)
-            
-            # Summary table
-            summary_data = [
-                ['Summary', 'Amount'],
-                ['Total Amount', f'${total_amount:.2f}'],
-                ['Total Discount', f'${total_discount:.2f}'],
-                ['Net Amount', f'${total_net:.2f}']
-            ]
-            
-            summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
-            summary_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 14),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
-            
-            story.append(summary_table)
-            story.append(Spacer(1, 20))
-            
-            # Detailed transactions table
-            if report_type == 'detailed':
-                story.append(Paragraph("Detailed Transactions", styles['Heading2']))
-                story.append(Spacer(1, 12))
-                
-                # Transaction data
-                table_data = [['ID', 'Date', 'User', 'Total', 'Discount', 'Net Amount']]
-                
-                for transaction in transactions:
-                    table_data.append([
-                        str(transaction[0]),
-                        transaction[1].strftime('%Y-%m-%d %H:%M') if transaction[1] else '',
-                        transaction[2] or '',
-                        f'${float(transaction[3]):.2f}' if transaction[3] else '$0.00',
-                        f'${float(transaction[4]):.2f}' if transaction[4] else '$0.00',
-                        f'${float(transaction[5]):.2f}' if transaction[5] else '$0.00'
-                    ])
-                
-                # Create table
-                table = Table(table_data, colWidths=[0.8*inch, 1.5*inch, 1.2*inch, 1*inch, 1*inch, 1.2*inch])
-                table.setStyle(TableStyle([
-                    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                    ('FONTSIZE', (0, 0), (-1, 0), 10),
-                    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                    ('GRID', (0, 0), (-1, -1), 1, colors.black),
-                    ('FONTSIZE', (0, 1), (-1, -1), 8),
-                ]))
-                
-                story.append(table)
-        else:
-            story.append(Paragraph("No transactions found for the specified criteria.", styles['Normal']))
-        
-        # Build PDF
-        doc.build(story)
-        buffer.seek(0)
-        
-        conn.close()
-        
-        # Return PDF file
-        return send_file(
-            buffer,
-            as_attachment=True,
-            download_name=f'transaction_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.pdf',
-            mimetype='application/pdf'
-        )
-        
+        filters['username_match'] = parse_username_match(data.get('username_match'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+    try:
+        # Rendering happens in the report process pool; identical requests made
+        # while a job is still running share it
+        state = report_jobs.submit(filters, report_type, session['user'])
+        return jsonify(report_job_to_dict(state)), 200 if state['status'] == 'done' else 202
     except Exception as e:
         print(f"Error generating report: {e}")
         return jsonify({'error': 'Failed to generate report'}), 500
 
+@app.route('/api/reports/<job_id>')
+@rbac.requires()
+def get_report_job(job_id):
+    state = report_jobs.status(job_id, session['user']['tenantID'])
+    if not state:
+        return jsonify({'error': 'Report job not found'}), 404
+    return jsonify(report_job_to_dict(state))
+
+@app.route('/api/reports/<job_id>/download')
+@rbac.requires()
+def download_report(job_id):
+    state = report_jobs.status(job_id, session['user']['tenantID'])
+    if not state:
+        return jsonify({'error': 'Report job not found'}), 404
+    if state['status'] != 'done':
+        return jsonify({'error': 'Report is not ready', 'status': state['status']}), 409
+
+    finished = datetime.fromtimestamp(state.get('finishedAt') or state['updatedAt'])
+    return send_file(
+        report_jobs.store.pdf_path(job_id),
+        as_attachment=True,
+        download_name=f'transaction_report_{finished.strftime("%Y%m%d_%H%M%S")}.pdf',
+        mimetype='application/pdf'
+    )
+
+@app.route('/api/export/transactions')
+@rbac.requires()
+def export_transactions():
+    # Raw transaction lines for spreadsheets, streamed while the query runs
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    if export_format == 'parquet' and not parquet_available():
+        return jsonify({'error': 'Parquet export is not available on this server'}), 501
+
+    tenant_id = session['user']['tenantID']
+    filters = {
+        'tenant_id': tenant_id,
+        'start_date': request.args.get('start_date') or None,
+        'end_date': request.args.get('end_date') or None,
+        'username': request.args.get('username') or None,
+    }
+    try:
+        filters['username_match'] = parse_username_match(request.args.get('username_match'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    query, params = export_query(filters)
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    filename = f'transactions_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+
+    try:
+        response = stream_chunks(
+            get_db_connection(tenant_id), query, params,
+            csv_gzip_chunks if export_format == 'csv' else parquet_chunks,
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'},
+        )
+    except Exception as e:
+        print(f"Error exporting transactions: {e}")
+        return jsonify({'error': 'Failed to export transactions'}), 500
+    if response is None:
+        return jsonify({'error': 'Database connection failed'}), 500
+    return response
+
+def report_job_to_dict(state):
+    total = state.get('total')
+    processed = state.get('processed') or 0
+    if state['status'] == 'done':
+        progress = 1.0
+    elif total:
+        progress = min(processed / total, 0.99)
+    else:
+        progress = 0.0
+    job = {
+        'jobId': state['jobId'],
+        'status': state['status'],
+        'processed': processed,
+        'total': total,
+        'progress': progress,
+    }
+    if state['status'] == 'done':
+        job['downloadUrl'] = url_for('download_report', job_id=state['jobId'])
+        if state.get('timings'):
+            job['timings'] = state['timings']
+    if state.get('error'):
+        job['error'] = 'Failed to generate report'
+    return job
+
 @app.route('/logout')
 def logout():
-    session.pop('user', None)
+    user = session.get('user')
+    session.clear()
+    if user:
+        active_users.forget(user['tenantID'], user['userID'])
     return redirect(url_for('home'))
 
+@app.cli.command('migrate')
+def migrate_command():
+    """Apply pending schema migrations (to every tenant database too)."""
+    for tenant_id in [None, *tenant_pools]:
+        with get_db_connection(tenant_id) as conn:
+            if not conn:
+                raise SystemExit("Database connection failed")
+            for name in apply_migrations(conn):
+                print(f"Applied {name}" + (f" (tenant {tenant_id})" if tenant_id is not None else ""))
+
+@app.cli.command('rebuild-stats')
+def rebuild_stats_command():
+    """Recompute dashboard running totals from the base tables."""
+    for tenant_id in [None, *tenant_pools]:
+        with get_db_connection(tenant_id) as conn:
+            if not conn:
+                raise SystemExit("Database connection failed")
+            rebuild_stats(conn.cursor())
+            conn.commit()
+    print("Dashboard stats rebuilt")
+
+@app.cli.command('backfill-sales')
+@click.option('--start', 'start_date', help='First day (YYYY-MM-DD); defaults to the oldest transaction')
+@click.option('--end', 'end_date', help='Last day (YYYY-MM-DD); defaults to the newest transaction')
+def backfill_sales_command(start_date, end_date):
+    """Rebuild the daily/monthly sales rollups from TransactionMaster."""
+    for tenant_id in [None, *tenant_pools]:
+        with get_db_connection(tenant_id) as conn:
+            if not conn:
+                raise SystemExit("Database connection failed")
+            for month in backfill_sales(conn, start_date, end_date):
+                print(f"Rebuilt sales rollups for {month:%Y-%m}" +
+                      (f" (tenant {tenant_id})" if tenant_id is not None else ""))
+
+@app.cli.command('hash-passwords')
+def hash_passwords_command():
+    """Replace plaintext passwords in Users with password hashes."""
+    with get_db_connection() as conn:
+        if not conn:
+            raise SystemExit("Database connection failed")
+        cursor = conn.cursor()
+        cursor.execute("SELECT UserID, PasswordHash FROM Users")
+        plaintext = [(user_id, stored) for user_id, stored in cursor.fetchall() if not is_password_hash(stored)]
+        hashes = password_hasher.hash_many([stored for _, stored in plaintext])
+        for (user_id, _), password_hash in zip(plaintext, hashes):
+            repository.update_password_hash(cursor, user_id, password_hash)
+        conn.commit()
+    print(f"Hashed {len(plaintext)} passwords")
+
 if __name__ == '__main__':
-    print("Starting RBAC POS System...")
-    print("Secret key generated automatically for security")
+    # Development server only; production runs under gunicorn (gunicorn.conf.py)
+    print("Starting RBAC POS System (development server)...")
+    print("For production use: gunicorn -c gunicorn.conf.py app:app")
     print("Access the application at: http://localhost:5000")
-    app.run(debug=True, host='0.0.0.0', port=5000)
\ No newline at end of file
+    app.run(debug=os.environ.get('FLASK_DEBUG') == '1', host='0.0.0.0', port=5000, threaded=True)
\ No newline at end of file
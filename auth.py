@@ -0,0 +1,188 @@
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+LOGIN_HASH_WORKERS = min(4, os.cpu_count() or 1)
+# Logins waiting for a hash worker before new ones are turned away
+LOGIN_HASH_QUEUE = 64
+LOGIN_HASH_TIMEOUT = 10
+LOGIN_MAX_FAILURES = 5
+LOGIN_FAILURE_WINDOW = 300
+LOGIN_CACHE_TTL = 300
+LOGIN_MAX_TRACKED = 10000
+HASH_PREFIXES = ('scrypt:', 'pbkdf2:')
+
+
+class HasherBusy(Exception):
+    pass
+
+
+def is_password_hash(stored):
+    # Rows created before hashing hold the plaintext password
+    return stored.startswith(HASH_PREFIXES)
+
+
+class PasswordHasher:
+    """Checks and creates password hashes on a small thread pool.
+
+    scrypt runs inside OpenSSL with the GIL released, so up to ``workers``
+    logins hash in parallel while the web threads keep serving everything
+    else. Beyond ``max_pending`` waiting logins, new ones fail fast with
+    HasherBusy instead of queueing behind a login storm.
+    """
+
+    def __init__(self, workers=LOGIN_HASH_WORKERS, max_pending=LOGIN_HASH_QUEUE, timeout=LOGIN_HASH_TIMEOUT):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._executor = None
+        self._executor_pid = None
+        self._slots = None
+        self._dummy_hash = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created lazily (and again after a fork) so each web worker owns its pool
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='login-hash')
+                self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+                self._executor_pid = os.getpid()
+            return self._executor, self._slots
+
+    def _run(self, fn, *args):
+        executor, slots = self._get_executor()
+        if not slots.acquire(blocking=False):
+            raise HasherBusy()
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            slots.release()
+            raise
+        # The slot is held until the hash finishes, even if this request gave up on it
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            raise HasherBusy()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password)
+
+    def hash_many(self, passwords):
+        """Hashes for a batch job (no queue limit), in order."""
+        executor, _ = self._get_executor()
+        return list(executor.map(generate_password_hash, passwords))
+
+    def verify(self, stored, password):
+        if stored is None:
+            # Unknown user: spend the same time as a real check so it doesn't show
+            if self._dummy_hash is None:
+                self._dummy_hash = self._run(generate_password_hash, secrets.token_hex(16))
+            self._run(check_password_hash, self._dummy_hash, password)
+            return False
+        if not is_password_hash(stored):
+            return hmac.compare_digest(stored.encode('utf-8'), password.encode('utf-8'))
+        return self._run(check_password_hash, stored, password)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class CredentialCache:
+    """Recent successful logins, so signing in again skips the slow hash.
+
+    Keeps an HMAC of the password under a random per-process key, next to the
+    stored hash it was checked against; a changed hash in the database (a new
+    password) no longer matches.
+    """
+
+    def __init__(self, ttl=LOGIN_CACHE_TTL, max_entries=LOGIN_MAX_TRACKED):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._key = secrets.token_bytes(32)
+        self._entries = OrderedDict()   # username -> (stored hash, digest, expires_at)
+        self._lock = threading.Lock()
+
+    def _digest(self, stored, password):
+        message = f'{stored}\0{password}'.encode('utf-8')
+        return hmac.new(self._key, message, hashlib.sha256).digest()
+
+    def matches(self, username, stored, password):
+        if self.ttl <= 0:
+            return False
+        with self._lock:
+            entry = self._entries.get(username)
+        if entry is None or entry[0] != stored or entry[2] <= time.monotonic():
+            return False
+        return hmac.compare_digest(entry[1], self._digest(stored, password))
+
+    def remember(self, username, stored, password):
+        if self.ttl <= 0:
+            return
+        entry = (stored, self._digest(stored, password), time.monotonic() + self.ttl)
+        with self._lock:
+            self._entries[username] = entry
+            self._entries.move_to_end(username)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class LoginRateLimiter:
+    """Failed logins per username over a sliding window.
+
+    After ``max_failures`` failures within ``window`` seconds the username is
+    refused until the oldest of them ages out. Unknown usernames count too,
+    so the limiter doesn't reveal which ones exist.
+    """
+
+    def __init__(self, max_failures=LOGIN_MAX_FAILURES, window=LOGIN_FAILURE_WINDOW,
+                 max_entries=LOGIN_MAX_TRACKED):
+        self.max_failures = max_failures
+        self.window = window
+        self.max_entries = max_entries
+        self._failures = OrderedDict()   # username -> deque of failure times
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(username):
+        # Usernames compare case-insensitively in the database
+        return username.casefold()
+
+    def retry_after(self, username):
+        """Seconds until ``username`` may try again; 0 if it may now."""
+        now = time.monotonic()
+        with self._lock:
+            failures = self._failures.get(self._key(username))
+            if not failures:
+                return 0
+            while failures and failures[0] <= now - self.window:
+                failures.popleft()
+            if len(failures) < self.max_failures:
+                return 0
+            return failures[-self.max_failures] + self.window - now
+
+    def record_failure(self, username):
+        key = self._key(username)
+        with self._lock:
+            failures = self._failures.get(key)
+            if failures is None:
+                failures = self._failures[key] = deque(maxlen=self.max_failures)
+            failures.append(time.monotonic())
+            self._failures.move_to_end(key)
+            while len(self._failures) > self.max_entries:
+                self._failures.popitem(last=False)
+
+    def reset(self, username):
+        with self._lock:
+            self._failures.pop(self._key(username), None)
@@ -0,0 +1,114 @@
+"""Round trips and latency of the checkout write path against basket size.
+
+Runs the legacy per-line write path and checkout.write_transaction against a
+cursor that charges a fixed network round trip per statement, so the numbers
+show how each path scales with basket size independent of server speed.
+
+    python benchmarks/bench_checkout.py --rtt-ms 1.5 --sizes 1 5 10 20 40 80
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from checkout import write_transaction  # noqa: E402
+
+
+class RoundTripCursor:
+    def __init__(self, rtt):
+        self.rtt = rtt
+        self.round_trips = 0
+        self.fast_executemany = False
+
+    def _round_trip(self):
+        self.round_trips += 1
+        time.sleep(self.rtt)
+
+    def execute(self, sql, params=()):
+        self._round_trip()
+        self._last = sql
+        self._params = list(params)
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        rows = list(seq_of_params)
+        if self.fast_executemany:
+            self._round_trip()
+        else:
+            for _ in rows:
+                self._round_trip()
+
+    def fetchone(self):
+        return (1,)
+
+    def fetchall(self):
+        if 'SELECT ItemID, ItemName FROM Items' in self._last:
+            # The basket's item ids all check out against their names
+            return [(item_id, f'Item {item_id}') for item_id in self._params[1:]]
+        if 'UPDATE i' in self._last:
+            # Every item has stock: report each (ItemID, new Quantity) as updated
+            return [(item_id, 0) for item_id in self._params[:-1:2]]
+        return []
+
+
+def legacy_write(cursor, tenant_id, username, data):
+    cursor.execute("INSERT INTO TransactionMaster ...", ())
+    cursor.execute("SELECT @@IDENTITY")
+    transaction_id = cursor.fetchone()[0]
+    for item in data['items']:
+        cursor.execute("INSERT INTO TransactionDetails ...", ())
+        cursor.execute("UPDATE Items ... WHERE ItemName = ?", ())
+    return transaction_id
+
+
+def make_basket(size):
+    items = [
+        {'itemID': i + 1, 'itemName': f'Item {i + 1}', 'quantity': 1, 'price': 2.5, 'amount': 2.5}
+        for i in range(size)
+    ]
+    total = sum(item['amount'] for item in items)
+    return {
+        'transactionDate': '2024-01-15',
+        'totalAmount': total,
+        'discount': 0,
+        'netAmount': total,
+        'items': items,
+    }
+
+
+def measure(write, basket, rtt, repeat):
+    best = None
+    for _ in range(repeat):
+        cursor = RoundTripCursor(rtt)
+        start = time.perf_counter()
+        write(cursor, 1, 'bench', basket)
+        elapsed = time.perf_counter() - start
+        # +1 for the commit, which both paths pay once
+        round_trips = cursor.round_trips + 1
+        elapsed += rtt
+        if best is None or elapsed < best[1]:
+            best = (round_trips, elapsed)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rtt-ms', type=float, default=1.0, help='simulated round-trip time')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1, 5, 10, 20, 40, 80])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+    rtt = args.rtt_ms / 1000.0
+
+    print(f"{'basket':>6} | {'legacy trips':>12} {'legacy ms':>10} | {'bulk trips':>10} {'bulk ms':>8} | {'speedup':>7}")
+    for size in args.sizes:
+        basket = make_basket(size)
+        legacy_trips, legacy_time = measure(legacy_write, basket, rtt, args.repeat)
+        bulk_trips, bulk_time = measure(write_transaction, basket, rtt, args.repeat)
+        print(f"{size:>6} | {legacy_trips:>12} {legacy_time * 1000:>10.1f} | "
+              f"{bulk_trips:>10} {bulk_time * 1000:>8.1f} | {legacy_time / bulk_time:>6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,245 @@
+"""Many concurrent change-feed clients against one ItemChangeFeed.
+
+A writer thread updates, creates and deletes items in a simulated catalog
+while N client threads keep a local replica current:
+- pollers call changes_since() every --poll-ms (falling back to the
+  "database" when the feed cannot answer), like GET /api/items/changes;
+- streamers block in wait(), like the SSE endpoint.
+
+At the end every replica must equal the catalog, and the number of
+change queries the database saw is printed next to the number of client
+requests it served.
+
+    python benchmarks/bench_item_changes.py --clients 200 --seconds 10
+
+--url runs HTTP pollers against a running server instead (log in first and
+pass the session cookie value with --cookie).
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from item_changes import ItemChangeFeed, changes_to_dict  # noqa: E402
+
+
+class SimulatedItems:
+    """Items + tombstones with a rowversion-like counter; counts change queries."""
+
+    def __init__(self, size):
+        self._lock = threading.Lock()
+        self.version = 0
+        self.rows = {}        # item_id -> (version, item)
+        self.tombstones = {}  # item_id -> version
+        self.queries = 0
+        for item_id in range(1, size + 1):
+            self.upsert(item_id, quantity=100)
+
+    def upsert(self, item_id, quantity):
+        with self._lock:
+            self.version += 1
+            self.tombstones.pop(item_id, None)
+            self.rows[item_id] = (self.version, {
+                'ItemID': item_id, 'ItemName': f'Item {item_id}', 'Category': 'Bench',
+                'Quantity': quantity, 'Price': 1.0,
+            })
+
+    def delete(self, item_id):
+        with self._lock:
+            if self.rows.pop(item_id, None):
+                self.version += 1
+                self.tombstones[item_id] = self.version
+
+    def current_version(self):
+        with self._lock:
+            self.queries += 1
+            return self.version
+
+    def fetch_changes(self, since, limit):
+        with self._lock:
+            self.queries += 1
+            changes = [(version, item) for version, item in self.rows.values() if version > since]
+            if since:
+                changes += [(version, {'ItemID': item_id, 'Deleted': True})
+                            for item_id, version in self.tombstones.items() if version > since]
+            changes.sort(key=lambda change: change[0])
+            has_more = len(changes) > limit
+            changes = changes[:limit]
+            version = changes[-1][0] if has_more else max(self.version, since)
+            return changes_to_dict(version, changes, has_more)
+
+    def snapshot(self):
+        with self._lock:
+            return {item['ItemID']: item for _, item in self.rows.values()}
+
+
+class Replica:
+    def __init__(self):
+        self.items = {}
+        self.version = 0
+        self.requests = 0
+        self.snapshot_queries = 0
+        self.fallback_queries = 0
+
+    def apply(self, changes):
+        for item_id in changes['deleted']:
+            self.items.pop(item_id, None)
+        for item in changes['items']:
+            self.items[item['ItemID']] = item
+        self.version = changes['version']
+
+
+def sync(feed, items, replica, snapshot=False):
+    while True:
+        replica.requests += 1
+        changes = feed.changes_since(replica.version) if replica.version else None
+        if changes is None:
+            if snapshot:
+                replica.snapshot_queries += 1
+            else:
+                replica.fallback_queries += 1
+            changes = items.fetch_changes(replica.version, 1000)
+        replica.apply(changes)
+        if not changes['hasMore']:
+            return
+
+
+def poller(feed, items, replica, stop, drained, poll_interval):
+    sync(feed, items, replica, snapshot=True)
+    while not stop.is_set():
+        time.sleep(poll_interval * random.uniform(0.5, 1.5))
+        sync(feed, items, replica)
+    drained.wait()
+    sync(feed, items, replica)
+
+
+def streamer(feed, items, replica, stop, drained):
+    sync(feed, items, replica, snapshot=True)
+    while not stop.is_set():
+        feed.wait(replica.version, timeout=0.5)
+        sync(feed, items, replica)
+    drained.wait()
+    sync(feed, items, replica)
+
+
+def writer(items, stop, writes_per_second, size):
+    rng = random.Random(1)
+    next_id = size + 1
+    while not stop.is_set():
+        action = rng.random()
+        if action < 0.8:
+            items.upsert(rng.randint(1, next_id - 1), quantity=rng.randint(0, 100))
+        elif action < 0.9:
+            items.upsert(next_id, quantity=10)
+            next_id += 1
+        else:
+            items.delete(rng.randint(1, next_id - 1))
+        time.sleep(1.0 / writes_per_second)
+
+
+def run_local(args):
+    items = SimulatedItems(args.items)
+    feed = ItemChangeFeed(items.current_version, items.fetch_changes,
+                          interval=args.feed_interval_ms / 1000.0)
+    stop = threading.Event()
+    drained = threading.Event()
+    replicas = [Replica() for _ in range(args.clients)]
+    threads = [threading.Thread(target=writer, args=(items, stop, args.writes_per_second, args.items))]
+    for i, replica in enumerate(replicas):
+        if i % 2:
+            threads.append(threading.Thread(target=streamer, args=(feed, items, replica, stop, drained)))
+        else:
+            threads.append(threading.Thread(
+                target=poller, args=(feed, items, replica, stop, drained, args.poll_ms / 1000.0)))
+
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    threads[0].join()
+    # Let the watcher pick up the writer's last changes, then do one final sync each
+    feed.poke()
+    deadline = time.monotonic() + 5
+    while feed.stats()['version'] != items.version and time.monotonic() < deadline:
+        time.sleep(0.05)
+    drained.set()
+    for thread in threads[1:]:
+        thread.join()
+
+    expected = items.snapshot()
+    diverged = sum(1 for replica in replicas if replica.items != expected)
+    requests = sum(replica.requests for replica in replicas)
+    snapshot_queries = sum(replica.snapshot_queries for replica in replicas)
+    fallback_queries = sum(replica.fallback_queries for replica in replicas)
+    feed_queries = items.queries - snapshot_queries - fallback_queries
+    print(f"{args.clients} clients ({args.clients // 2} streaming), {args.seconds}s, "
+          f"{items.version - args.items} writes")
+    print(f"client requests served: {requests}")
+    print(f"database queries: {snapshot_queries} initial snapshot pages, "
+          f"{feed_queries} by the shared watcher, {fallback_queries} client fallbacks")
+    print(f"replicas matching the catalog: {args.clients - diverged}/{args.clients}")
+    return 1 if diverged else 0
+
+
+def run_http(args):
+    stop = threading.Event()
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+
+    def client():
+        since = 0
+        while not stop.is_set():
+            request = urllib.request.Request(
+                f"{args.url.rstrip('/')}/api/items/changes?since={since}",
+                headers={'Cookie': f'session={args.cookie}'},
+            )
+            start = time.perf_counter()
+            try:
+                with urllib.request.urlopen(request, timeout=10) as response:
+                    since = json.load(response)['version']
+                with lock:
+                    latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                with lock:
+                    errors.append(str(e))
+            time.sleep(args.poll_ms / 1000.0)
+
+    threads = [threading.Thread(target=client) for _ in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    if latencies:
+        print(f"{len(latencies)} polls, p50 {latencies[len(latencies) // 2] * 1e3:.1f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1e3:.1f} ms")
+    print(f"{len(errors)} errors" + (f", e.g. {errors[0]}" if errors else ''))
+    return 1 if errors else 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--items', type=int, default=5000)
+    parser.add_argument('--writes-per-second', type=float, default=200)
+    parser.add_argument('--poll-ms', type=float, default=500)
+    parser.add_argument('--feed-interval-ms', type=float, default=200)
+    parser.add_argument('--url', help='poll a running server instead of the in-process simulation')
+    parser.add_argument('--cookie', default='', help='session cookie value for --url')
+    args = parser.parse_args()
+    sys.exit(run_http(args) if args.url else run_local(args))
+
+
+if __name__ == '__main__':
+    main()
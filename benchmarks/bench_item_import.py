@@ -0,0 +1,179 @@
+"""Catalog load throughput: per-item writes vs. the chunked bulk upsert.
+
+Builds a supplier price list (--rows lines, --existing share of them for items
+the tenant already has, the rest new) and loads it into a scratch database
+twice from the same starting point:
+
+    per-item   what one POST /api/items or PUT /api/items/<id> per SKU costs:
+               look the item up, write it, bump the catalog, commit
+    bulk       item_import.ItemImport, as behind POST /api/items/import
+
+and prints rows/second for each. Without --dsn the database is a temporary
+SQLite file; --dsn runs against a scratch SQL Server database (its items for
+--tenant-id are replaced).
+
+--url measures the same two ways through the API of a running server instead,
+logged in as a seeded bench user: one POST /api/items per new item against one
+CSV upload. New item names are used, so it adds items to that user's tenant.
+
+    python benchmarks/bench_item_import.py --rows 50000
+    python benchmarks/bench_item_import.py --dsn "Driver=...;Database=RBAC_bench;..." --rows 50000
+    python benchmarks/bench_item_import.py --url http://localhost:5000 --rows 50000
+"""
+import argparse
+import csv
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import repository  # noqa: E402
+from catalog import bump_catalog_version  # noqa: E402
+from db_backend import SqliteBackend, SqlServerBackend  # noqa: E402
+from item_import import ItemImport  # noqa: E402
+from schema import apply_migrations  # noqa: E402
+from stats import record_items  # noqa: E402
+
+from loadtest import Client  # noqa: E402
+
+CATEGORIES = ('Dairy', 'Bakery', 'Produce', 'Meat', 'Frozen', 'Beverages', 'Snacks', 'Household')
+
+
+def price_list(rng, rows, existing):
+    """(starting catalog rows, uploaded records) with ``existing`` of the uploads already in the catalog."""
+    known = int(rows * existing)
+    catalog = [(f'Import item {n}', rng.choice(CATEGORIES), rng.randint(0, 500), round(rng.uniform(0.5, 50), 2))
+               for n in range(known)]
+    records = [{'itemName': name, 'category': category, 'quantity': str(quantity),
+                'price': str(round(price * rng.choice((1, 1, 1.05, 1.1)), 2))}
+               for name, category, quantity, price in catalog]
+    records += [{'itemName': f'Import item {n}', 'category': rng.choice(CATEGORIES),
+                 'quantity': str(rng.randint(0, 500)), 'price': str(round(rng.uniform(0.5, 50), 2))}
+                for n in range(known, rows)]
+    rng.shuffle(records)
+    return catalog, records
+
+
+def reset_items(conn, tenant_id, catalog):
+    cursor = conn.cursor()
+    cursor.execute("DELETE FROM Items WHERE TenantID = ?", (tenant_id,))
+    cursor.executemany("INSERT INTO Items (TenantID, ItemName, Category, Quantity, Price) VALUES (?, ?, ?, ?, ?)",
+                       [(tenant_id, *row) for row in catalog])
+    conn.commit()
+
+
+def load_per_item(conn, tenant_id, records):
+    cursor = conn.cursor()
+    for record in records:
+        quantity, price = int(record['quantity']), float(record['price'])
+        cursor.execute("SELECT ItemID FROM Items WHERE TenantID = ? AND ItemName = ?",
+                       (tenant_id, record['itemName']))
+        row = cursor.fetchone()
+        if row:
+            repository.update_item(cursor, tenant_id, row[0], record['itemName'], record['category'], quantity, price)
+        else:
+            repository.insert_item(cursor, tenant_id, record['itemName'], record['category'], quantity, price)
+            record_items(cursor, tenant_id, 1)
+        bump_catalog_version(cursor, tenant_id)
+        conn.commit()
+
+
+def load_bulk(conn, tenant_id, records):
+    def after_write(cursor, inserted, updated):
+        if inserted:
+            record_items(cursor, tenant_id, inserted)
+        bump_catalog_version(cursor, tenant_id)
+
+    summary = ItemImport(conn, tenant_id, after_write=after_write).run(
+        (line, record) for line, record in enumerate(records, start=2))
+    if summary['failed']:
+        raise SystemExit(f"bulk load rejected rows: {summary['errors'][:5]}")
+    return summary
+
+
+def run_http(args, rng):
+    client = Client(args.url, args.username, args.password, rng, timeout=600)
+    client.login()
+    run = int(time.time())
+    records = [{'itemName': f'Import item {run}-{n}', 'category': rng.choice(CATEGORIES),
+                'quantity': rng.randint(0, 500), 'price': round(rng.uniform(0.5, 50), 2)}
+               for n in range(args.rows + args.per_item_rows)]
+    sample, records = records[:args.per_item_rows], records[args.per_item_rows:]
+
+    started = time.perf_counter()
+    for record in sample:
+        client.json('POST', '/api/items', record)
+    per_item_rate = len(sample) / (time.perf_counter() - started)
+    print(f"per-item  {per_item_rate:>10.0f} rows/s  ({len(sample)} POSTs; "
+          f"{args.rows / per_item_rate:.1f} s for {args.rows})")
+
+    body = io.StringIO()
+    writer = csv.DictWriter(body, fieldnames=['itemName', 'category', 'quantity', 'price'])
+    writer.writeheader()
+    writer.writerows(records)
+    request = urllib.request.Request(f"{args.url.rstrip('/')}/api/items/import", data=body.getvalue().encode(),
+                                     method='POST', headers={'Content-Type': 'text/csv'})
+    started = time.perf_counter()
+    with client.opener.open(request, timeout=600) as response:
+        summary = json.loads(response.read())
+    elapsed = time.perf_counter() - started
+    print(f"bulk      {args.rows / elapsed:>10.0f} rows/s  ({elapsed:.2f} s; {summary['inserted']} inserted, "
+          f"{summary['failed']} failed)")
+    print(f"speedup   {args.rows / elapsed / per_item_rate:>10.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--existing', type=float, default=0.5, help='share of rows updating existing items')
+    parser.add_argument('--per-item-rows', type=int, default=2000,
+                        help='rows timed on the per-item path (it is extrapolated from these)')
+    parser.add_argument('--tenant-id', type=int, default=1)
+    parser.add_argument('--dsn', help='pyodbc connection string of a scratch SQL Server database')
+    parser.add_argument('--url', help='measure through the API of a running server instead')
+    parser.add_argument('--username', default='benchuser0')
+    parser.add_argument('--password', default='bench')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    if args.url:
+        run_http(args, random.Random(args.seed))
+        return
+
+    if args.dsn:
+        backend = SqlServerBackend(args.dsn)
+    else:
+        backend = SqliteBackend(os.path.join(tempfile.mkdtemp(), 'bench_item_import.db'))
+    conn = backend.connect()
+    for _ in apply_migrations(conn):
+        pass
+
+    catalog, records = price_list(random.Random(args.seed), args.rows, args.existing)
+    print(f"{args.rows} rows, {int(args.rows * args.existing)} of them existing items")
+
+    reset_items(conn, args.tenant_id, catalog)
+    sample = records[:min(args.per_item_rows, len(records))]
+    started = time.perf_counter()
+    load_per_item(conn, args.tenant_id, sample)
+    per_item_rate = len(sample) / (time.perf_counter() - started)
+    print(f"per-item  {per_item_rate:>10.0f} rows/s  ({len(sample)} rows; "
+          f"{args.rows / per_item_rate:.1f} s for all {args.rows})")
+
+    reset_items(conn, args.tenant_id, catalog)
+    started = time.perf_counter()
+    summary = load_bulk(conn, args.tenant_id, records)
+    elapsed = time.perf_counter() - started
+    print(f"bulk      {args.rows / elapsed:>10.0f} rows/s  ({elapsed:.2f} s; {summary['inserted']} inserted, "
+          f"{summary['updated']} updated, {summary['unchanged']} unchanged)")
+    print(f"speedup   {args.rows / elapsed / per_item_rate:>10.1f}x")
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
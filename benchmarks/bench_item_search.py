@@ -0,0 +1,97 @@
+"""Item search latency vs catalog size: in-process index vs a full linear scan.
+
+The linear scan is what the POS screen did client-side on every keystroke
+(lower-cased substring test of ItemName and Category over the whole catalog).
+For each catalog size this reports index build time, incremental update
+time, p50/p95 query latency for short prefixes, substrings and multi-word
+queries, and the JSON size of the full catalog each till used to download.
+
+    python benchmarks/bench_item_search.py --sizes 1000 10000 50000 100000
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from item_search import ItemIndex  # noqa: E402
+
+BRANDS = ['Acme', 'Golden Farm', 'Nordic', 'Sunrise', 'Valley', 'Harvest', 'Blue Ridge', 'Maple',
+          'Evergreen', 'Coastal', 'Highland', 'Prairie', 'Orchard', 'Riverbend', 'Summit', 'Meadow']
+ADJECTIVES = ['organic', 'fresh', 'whole', 'lite', 'classic', 'spicy', 'frozen', 'dark', 'sweet', 'sea salt',
+              'smoked', 'roasted', 'unsalted', 'low fat', 'gluten free', 'vanilla', 'honey', 'garlic']
+PRODUCTS = ['milk', 'bread', 'coffee beans', 'cheddar', 'yogurt', 'orange juice', 'pasta', 'rice',
+            'chocolate', 'almonds', 'granola', 'tomato sauce', 'butter', 'green tea', 'chips', 'salmon',
+            'bagels', 'oat cereal', 'peanut butter', 'lentils', 'olive oil', 'ice cream', 'mozzarella',
+            'crackers', 'apple cider', 'sparkling water', 'tortillas', 'hummus', 'sourdough', 'espresso']
+CATEGORIES = ['Dairy', 'Bakery', 'Beverages', 'Pantry', 'Snacks', 'Frozen', 'Produce', 'Deli', 'Seafood']
+QUERIES = ['m', 'co', 'mil', 'choc', 'ozza', 'juice', 'organic milk', 'nordic sea salt chips', 'sunrise froz', 'xyzzy']
+
+
+def catalog(size, rng):
+    for item_id in range(1, size + 1):
+        name = f"{rng.choice(BRANDS)} {rng.choice(ADJECTIVES)} {rng.choice(PRODUCTS)} {rng.randint(100, 999)}g".title()
+        yield item_id, name, rng.choice(CATEGORIES)
+
+
+def linear_scan(documents, query, limit):
+    query = query.lower()
+    matches = [item_id for item_id, name, category in documents
+               if query in name.lower() or query in category.lower()]
+    return matches[:limit]
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[int(len(samples) * 0.95)]
+
+
+def time_queries(search, repeat):
+    samples = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            start = time.perf_counter()
+            search(query)
+            samples.append((time.perf_counter() - start) * 1e6)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 50000, 100000])
+    parser.add_argument('--limit', type=int, default=20)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'items':>7} | {'build ms':>8} | {'update us':>9} | {'index p50/p95 us':>16} | "
+          f"{'scan p50/p95 us':>16} | {'catalog KiB':>11}")
+    for size in args.sizes:
+        rng = random.Random(size)
+        documents = list(catalog(size, rng))
+
+        start = time.perf_counter()
+        index = ItemIndex(documents)
+        build_ms = (time.perf_counter() - start) * 1e3
+
+        updates = [(rng.randint(1, size), f"Renamed Item {i}", 'Pantry') for i in range(200)]
+        start = time.perf_counter()
+        for item_id, name, category in updates:
+            index.add(item_id, name, category)
+        update_us = (time.perf_counter() - start) / len(updates) * 1e6
+
+        indexed = time_queries(lambda q: index.search(q, args.limit), args.repeat)
+        scanned = time_queries(lambda q: linear_scan(documents, q, args.limit), max(1, args.repeat // 5))
+        catalog_kib = len(json.dumps([
+            {'ItemID': item_id, 'ItemName': name, 'Category': category, 'Quantity': 10, 'Price': 1.99}
+            for item_id, name, category in documents
+        ])) / 1024
+        print(f"{size:>7} | {build_ms:>8.0f} | {update_us:>9.1f} | "
+              f"{indexed[0]:>7.0f}/{indexed[1]:<8.0f} | {scanned[0]:>7.0f}/{scanned[1]:<8.0f} | {catalog_kib:>11.0f}")
+
+
+if __name__ == '__main__':
+    main()
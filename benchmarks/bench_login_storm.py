@@ -0,0 +1,91 @@
+"""Login storm: hundreds of concurrent logins, as at a shift change.
+
+Every client logs in once, all at the same moment, as one of the seeded bench
+users (see seed_data.py); a share of them can use a wrong password. With
+--waves 2 the same clients log in again straight away, which is what the
+credential cache speeds up. Prints throughput, latency percentiles and the
+status of every answer (302 logged in, 200 wrong password, 429 rate limited,
+503 hash pool full) per wave.
+
+    python benchmarks/bench_login_storm.py --url http://localhost:5000 --logins 500 --concurrency 200
+"""
+import argparse
+import http.cookiejar
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+from loadtest import NoRedirect, percentile
+
+
+def login(url, username, password, timeout):
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(http.cookiejar.CookieJar()), NoRedirect)
+    data = urllib.parse.urlencode({'username': username, 'password': password}).encode()
+    request = urllib.request.Request(url.rstrip('/') + '/login', data=data, method='POST')
+    started = time.perf_counter()
+    try:
+        with opener.open(request, timeout=timeout) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as e:
+        status = e.code
+    except OSError as e:
+        status = type(e).__name__
+    return status, time.perf_counter() - started
+
+
+def run_wave(args, attempts):
+    # The first batch of logins is released together; the rest follow as threads free up
+    first = min(args.concurrency, len(attempts))
+    start = threading.Barrier(first)
+
+    def attempt(n):
+        username, password = attempts[n]
+        if n < first:
+            start.wait()
+        return login(args.url, username, password, args.timeout)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        results = list(executor.map(attempt, range(len(attempts))))
+    return results, time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--logins', type=int, default=500, help='logins per wave')
+    parser.add_argument('--concurrency', type=int, default=200, help='logins in flight at once')
+    parser.add_argument('--waves', type=int, default=2, help='times every client logs in')
+    parser.add_argument('--users', type=int, default=50, help='seeded bench users to log in as')
+    parser.add_argument('--user-prefix', default='benchuser')
+    parser.add_argument('--password', default='bench')
+    parser.add_argument('--wrong', type=float, default=0.0, help='share of logins with a wrong password')
+    parser.add_argument('--timeout', type=float, default=60)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    attempts = [(f'{args.user_prefix}{n % args.users}',
+                 args.password if rng.random() >= args.wrong else f'{args.password}-wrong')
+                for n in range(args.logins)]
+
+    print(f"{'wave':>4} {'logins':>7} {'secs':>7} {'logins/s':>9} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'max ms':>9}  statuses")
+    for wave in range(1, args.waves + 1):
+        results, elapsed = run_wave(args, attempts)
+        latencies = sorted(latency for _, latency in results)
+        statuses = Counter(status for status, _ in results)
+        print(f"{wave:>4} {len(results):>7} {elapsed:>7.2f} {len(results) / elapsed:>9.1f} "
+              f"{percentile(latencies, 0.50) * 1e3:>9.1f} {percentile(latencies, 0.95) * 1e3:>9.1f} "
+              f"{percentile(latencies, 0.99) * 1e3:>9.1f} {latencies[-1] * 1e3:>9.1f}  "
+              f"{', '.join(f'{status}: {count}' for status, count in sorted(statuses.items(), key=str))}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Per-request authorization overhead: permission list scan vs cached RBAC sets.
+
+Times, per check:
+- legacy: 'user' in session + linear scan of the permissions list in the cookie
+- rbac:   RBAC.allows() (memoised union of the user's roles, one set lookup)
+- decorated view: a no-op view wrapped in @rbac.requires(...) inside a Flask
+  request context, i.e. everything a request pays for authorization
+
+    python benchmarks/bench_rbac.py --permissions 40 --iterations 200000
+"""
+import argparse
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import Flask, session  # noqa: E402
+
+from rbac import RBAC  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--roles', type=int, default=3)
+    parser.add_argument('--permissions', type=int, default=40, help='permissions per role')
+    parser.add_argument('--iterations', type=int, default=200000)
+    args = parser.parse_args()
+
+    role_map = {
+        f'Role{r}': frozenset(f'Perm{r}_{p}' for p in range(args.permissions))
+        for r in range(args.roles)
+    }
+    roles = sorted(role_map)
+    permission_list = sorted(set().union(*role_map.values()))
+    # Worst case for the list scan: the permission checked is the last one
+    wanted = permission_list[-1]
+
+    rbac = RBAC(lambda: role_map, ttl=3600)
+
+    @rbac.requires(wanted)
+    def view():
+        return 'ok'
+
+    app = Flask(__name__)
+    app.secret_key = 'bench'
+
+    with app.test_request_context('/'):
+        session['user'] = {'roles': roles, 'permissions': permission_list}
+
+        def legacy():
+            if 'user' not in session:
+                return 401
+            if wanted not in session['user']['permissions']:
+                return 403
+            return 'ok'
+
+        results = {
+            'legacy list scan': timeit.timeit(legacy, number=args.iterations),
+            'rbac.allows': timeit.timeit(lambda: rbac.allows(roles, wanted), number=args.iterations),
+            '@rbac.requires view': timeit.timeit(view, number=args.iterations),
+        }
+
+    print(f"{len(roles)} roles, {len(permission_list)} distinct permissions, {args.iterations} checks")
+    for name, total in results.items():
+        print(f"{name:>22}: {total / args.iterations * 1e6:8.3f} us/check")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Render time and peak memory of detailed PDF reports at increasing row counts.
+
+Each size runs in a fresh process (so peak RSS is per render) and feeds
+reports.build_report a synthetic row generator, i.e. the same iterator shape
+the report worker gets from fetchmany. --legacy also renders the old
+one-giant-Table layout for sizes up to --legacy-max rows for comparison.
+
+    python benchmarks/bench_report_render.py --rows 10000 100000 1000000
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+
+def synthetic_rows(count):
+    start = datetime(2024, 1, 1)
+    for i in range(count):
+        total = 10 + (i % 500) / 4
+        discount = (i % 7) / 2
+        yield (count - i, start + timedelta(minutes=i), f'cashier{i % 25}', total, discount, total - discount)
+
+
+def render(rows, legacy, output):
+    from reportlab.platypus import SimpleDocTemplate, Table
+    from reportlab.lib.pagesizes import A4
+
+    from reports import DETAIL_COL_WIDTHS, DETAIL_HEADER, build_report, detail_row, detail_table_style
+
+    if legacy:
+        table_data = [DETAIL_HEADER] + [detail_row(row) for row in synthetic_rows(rows)]
+        table = Table(table_data, colWidths=DETAIL_COL_WIDTHS)
+        table.setStyle(detail_table_style)
+        SimpleDocTemplate(output, pagesize=A4).build([table])
+        return
+
+    meta = {
+        'username': 'bench', 'tenantName': 'Bench Store', 'generatedOn': datetime.now().isoformat(),
+        'start_date': None, 'end_date': None, 'username_filter': None,
+    }
+    summary = (rows, 0.0, 0.0, 0.0)
+    build_report(output, meta, summary, synthetic_rows(rows), 'detailed')
+
+
+def child(rows, legacy, queue):
+    with tempfile.NamedTemporaryFile(suffix='.pdf', delete=False) as f:
+        output = f.name
+    try:
+        start = time.perf_counter()
+        render(rows, legacy, output)
+        elapsed = time.perf_counter() - start
+        size = os.path.getsize(output)
+    finally:
+        os.remove(output)
+    # ru_maxrss is KiB on Linux
+    queue.put((elapsed, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, size))
+
+
+def run(rows, legacy):
+    ctx = multiprocessing.get_context('spawn')
+    queue = ctx.Queue()
+    process = ctx.Process(target=child, args=(rows, legacy, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 1000000])
+    parser.add_argument('--legacy', action='store_true', help='also render the single-table layout')
+    parser.add_argument('--legacy-max', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} | {'layout':>8} | {'seconds':>8} | {'us/row':>7} | {'peak RSS MiB':>12} | {'PDF MiB':>8}")
+    for rows in args.rows:
+        layouts = ['chunked']
+        if args.legacy and rows <= args.legacy_max:
+            layouts.append('legacy')
+        for layout in layouts:
+            elapsed, rss, size = run(rows, layout == 'legacy')
+            print(f"{rows:>9} | {layout:>8} | {elapsed:>8.1f} | {elapsed / rows * 1e6:>7.1f} | "
+                  f"{rss:>12.1f} | {size / 2**20:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
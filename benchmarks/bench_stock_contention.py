@@ -0,0 +1,312 @@
+"""Multi-threaded checkout load test: oversell protection and checkouts/second.
+
+Worker threads (split across --processes, each with its own ItemLocks as a
+separate web process would have) run checkout.checkout() with random
+baskets. Most baskets include one of a few hot SKUs that start with little
+stock, so many checkouts race for the last units.
+
+By default the database is simulated in-process: statements cost --rtt-ms,
+and the conditional stock UPDATE takes per-row locks that are held until
+commit or rollback, like SQL Server's row locks. --legacy runs the old
+unconditional decrement for comparison. --counters also updates the dashboard
+totals, sales rollups and catalog version the way the checkout route does
+(their upserts lock the counter rows they touch until commit, too). At the
+end, units sold are checked against starting stock; any negative stock is an
+oversell and fails the run.
+
+    python benchmarks/bench_stock_contention.py --threads 32 --seconds 10
+    python benchmarks/bench_stock_contention.py --threads 32 --legacy
+    python benchmarks/bench_stock_contention.py --threads 32 --counters
+
+--dsn runs the same load against a real SQL Server (a scratch database: it
+inserts LOADTEST items and transactions).
+"""
+import argparse
+import itertools
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from catalog import bump_catalog_version_after_commit  # noqa: E402
+from checkout import InsufficientStock, ItemLocks, ItemLockTimeout, checkout  # noqa: E402
+from sales_rollups import record_sale  # noqa: E402
+from stats import record_transaction  # noqa: E402
+
+DEADLOCK_TIMEOUT = 1.0
+# MERGE <table> ... USING (SELECT <expr> AS <column>, ...) AS s ON <key matches> WHEN
+_UPSERT = re.compile(r'MERGE (\w+) .*?USING \(SELECT (.*?)\) AS s\s+ON (.*?)\s+WHEN', re.S)
+
+
+class SimulatedDB:
+    def __init__(self, stock, rtt, names):
+        self.stock = dict(stock)
+        self.names = names
+        self.rtt = rtt
+        self.row_locks = {item_id: threading.Lock() for item_id in stock}
+        self.counters = Counter()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def counter_lock(self, key):
+        with self._lock:
+            return self.row_locks.setdefault(key, threading.Lock())
+
+    def connect(self):
+        return SimulatedConnection(self)
+
+
+class SimulatedConnection:
+    def __init__(self, db):
+        self.db = db
+        self.held = []
+        self.undo = []
+
+    def cursor(self):
+        return SimulatedCursor(self)
+
+    def lock_row(self, item_id):
+        lock = self.db.row_locks[item_id] if item_id in self.db.row_locks else self.db.counter_lock(item_id)
+        if lock not in self.held:
+            # A lock-order cycle stands in for SQL Server's deadlock monitor
+            if not lock.acquire(timeout=DEADLOCK_TIMEOUT):
+                raise Exception('40001', 'Simulated deadlock victim (1205)')
+            self.held.append(lock)
+
+    def _end(self):
+        for lock in reversed(self.held):
+            lock.release()
+        self.held = []
+        self.undo = []
+
+    def commit(self):
+        time.sleep(self.db.rtt)
+        self._end()
+
+    def rollback(self):
+        for item_id, quantity in reversed(self.undo):
+            self.db.stock[item_id] += quantity
+        self._end()
+
+    def close(self):
+        pass
+
+
+class SimulatedCursor:
+    def __init__(self, conn):
+        self.conn = conn
+        self.db = conn.db
+        self._result = []
+
+    def execute(self, sql, params=()):
+        time.sleep(self.db.rtt)
+        params = list(params)
+        if 'INSERT INTO TransactionMaster' in sql:
+            self._result = [(next(self.db._ids),)]
+        elif 'SELECT ItemID, ItemName FROM Items' in sql:
+            # Check of the basket's item ids: (ItemID, ...), after the TenantID
+            self._result = [(item_id, self.db.names[item_id]) for item_id in params[1:] if item_id in self.db.names]
+        elif 'UPDATE i' in sql:
+            # Conditional decrement: check and write under the row lock
+            self._result = []
+            # (ItemID, quantity) pairs, then the TenantID
+            for item_id, quantity in zip(params[:-1:2], params[1::2]):
+                self.conn.lock_row(item_id)
+                if self.db.stock[item_id] >= quantity:
+                    self.db.stock[item_id] -= quantity
+                    self.conn.undo.append((item_id, quantity))
+                    self._result.append((item_id, self.db.stock[item_id]))
+        elif _UPSERT.search(sql):
+            # Counter upsert: locks the (table, key) row it adds to until commit
+            table, source, match = _UPSERT.search(sql).groups()
+            key_sources = re.split(r' AS \w+(?:, |$)', source)[:match.count(' AND ') + 1]
+            key = (table, *params[:sum(expr.count('?') for expr in key_sources)])
+            self.conn.lock_row(key)
+            self.db.counters[key] += 1
+            self._result = [(self.db.counters[key],)]
+        elif 'UPDATE Items SET Quantity = Quantity - ?' in sql:
+            # Legacy unconditional decrement
+            quantity, item_id = params
+            self.conn.lock_row(item_id)
+            self.db.stock[item_id] -= quantity
+            self.conn.undo.append((item_id, quantity))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        time.sleep(self.db.rtt)
+
+    def fetchone(self):
+        return self._result[0]
+
+    def fetchall(self):
+        return self._result
+
+
+def legacy_checkout(conn, tenant_id, username, data, item_locks, after_write=None):
+    # The original write path: no stock check, one UPDATE per line
+    cursor = conn.cursor()
+    cursor.execute("INSERT INTO TransactionMaster ...", ())
+    cursor.execute("SELECT @@IDENTITY")
+    for line in data['items']:
+        cursor.execute("INSERT INTO TransactionDetails ...", ())
+        cursor.execute("UPDATE Items SET Quantity = Quantity - ? WHERE ItemID = ?",
+                       (line['quantity'], line['itemID']))
+    conn.commit()
+    return 0, {}
+
+
+def make_basket(rng, hot_ids, cold_ids, names):
+    lines = {}
+    if hot_ids and rng.random() < 0.6:
+        lines[rng.choice(hot_ids)] = rng.randint(1, 2)
+    for item_id in rng.sample(cold_ids, rng.randint(0, 4)):
+        lines[item_id] = rng.randint(1, 3)
+    if not lines:
+        lines[rng.choice(cold_ids)] = 1
+    items = [{'itemID': item_id, 'itemName': names[item_id], 'quantity': quantity,
+              'price': 1.0, 'amount': float(quantity)} for item_id, quantity in lines.items()]
+    total = sum(line['amount'] for line in items)
+    return {'transactionDate': '2024-01-15', 'totalAmount': total, 'discount': 0,
+            'netAmount': total, 'items': items}
+
+
+def seed_sql_server(dsn, tenant_id, stock):
+    import pyodbc
+    conn = pyodbc.connect(dsn)
+    cursor = conn.cursor()
+    ids = {}
+    for key, quantity in stock.items():
+        cursor.execute("""
+            INSERT INTO Items (TenantID, ItemName, Category, Quantity, Price)
+            OUTPUT INSERTED.ItemID
+            VALUES (?, ?, 'LOADTEST', ?, 1.0)
+        """, (tenant_id, f'LOADTEST {key}', quantity))
+        ids[key] = int(cursor.fetchone()[0])
+    conn.commit()
+
+    def read_stock():
+        cursor.execute("SELECT ItemID, Quantity FROM Items WHERE Category = 'LOADTEST'")
+        return {int(item_id): quantity for item_id, quantity in cursor.fetchall()}
+
+    def cleanup():
+        cursor.execute("DELETE FROM Items WHERE Category = 'LOADTEST'")
+        conn.commit()
+        conn.close()
+
+    return ids, (lambda: pyodbc.connect(dsn)), read_stock, cleanup
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--threads', type=int, default=32)
+    parser.add_argument('--processes', type=int, default=4, help='simulated web processes')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--hot-items', type=int, default=3)
+    parser.add_argument('--hot-stock', type=int, default=200)
+    parser.add_argument('--cold-items', type=int, default=500)
+    parser.add_argument('--cold-stock', type=int, default=1000)
+    parser.add_argument('--rtt-ms', type=float, default=1.0)
+    parser.add_argument('--legacy', action='store_true', help='unconditional decrement (the old path)')
+    parser.add_argument('--counters', action='store_true',
+                        help='also update the totals, rollups and catalog version like the checkout route')
+    parser.add_argument('--dsn', help='pyodbc connection string of a scratch SQL Server database')
+    parser.add_argument('--tenant-id', type=int, default=1, help='tenant that owns the test items')
+    args = parser.parse_args()
+
+    initial = {f'hot{i}': args.hot_stock for i in range(args.hot_items)}
+    initial.update({f'cold{i}': args.cold_stock for i in range(args.cold_items)})
+    if args.dsn:
+        ids, connect, read_stock, cleanup = seed_sql_server(args.dsn, args.tenant_id, initial)
+    else:
+        ids = {key: n for n, key in enumerate(initial, start=1)}
+        db = SimulatedDB({ids[key]: quantity for key, quantity in initial.items()}, args.rtt_ms / 1000.0,
+                         {ids[key]: f'LOADTEST {key}' for key in initial})
+        connect, read_stock, cleanup = db.connect, (lambda: dict(db.stock)), (lambda: None)
+    start_stock = {ids[key]: quantity for key, quantity in initial.items()}
+    names = {ids[key]: f'LOADTEST {key}' for key in initial}
+    hot_ids = [ids[key] for key in initial if key.startswith('hot')]
+    cold_ids = [ids[key] for key in initial if key.startswith('cold')]
+
+    write = legacy_checkout if args.legacy else checkout
+    process_locks = [ItemLocks() for _ in range(args.processes)]
+    stop = threading.Event()
+    outcomes = Counter()
+    sold = Counter()
+    latencies = []
+    lock = threading.Lock()
+
+    def after_write(cursor, basket):
+        # What the checkout route does in the sale's transaction
+        record_transaction(cursor, args.tenant_id, basket['transactionDate'], basket['netAmount'])
+        record_sale(cursor, args.tenant_id, 'loadtest', basket['transactionDate'],
+                    basket['totalAmount'], basket['discount'], basket['netAmount'])
+
+    def worker(n):
+        rng = random.Random(n)
+        conn = connect()
+        item_locks = process_locks[n % args.processes]
+        while not stop.is_set():
+            basket = make_basket(rng, hot_ids, cold_ids, names)
+            started = time.perf_counter()
+            try:
+                if args.counters:
+                    write(conn, args.tenant_id, 'loadtest', basket, item_locks,
+                          after_write=lambda cursor: after_write(cursor, basket))
+                    bump_catalog_version_after_commit(conn, args.tenant_id)
+                else:
+                    write(conn, args.tenant_id, 'loadtest', basket, item_locks)
+                outcome = 'committed'
+            except InsufficientStock:
+                outcome = 'rejected: insufficient stock'
+            except ItemLockTimeout:
+                outcome = 'rejected: items busy'
+            except Exception as e:
+                outcome = f'error: {type(e).__name__}'
+            elapsed = time.perf_counter() - started
+            with lock:
+                outcomes[outcome] += 1
+                if outcome == 'committed':
+                    latencies.append(elapsed)
+                    for line in basket['items']:
+                        sold[line['itemID']] += line['quantity']
+        conn.close()
+
+    threads = [threading.Thread(target=worker, args=(n,)) for n in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    final_stock = read_stock()
+    cleanup()
+
+    oversold = {item_id: -quantity for item_id, quantity in final_stock.items() if quantity < 0}
+    mismatched = [item_id for item_id in start_stock
+                  if start_stock[item_id] - sold[item_id] != final_stock.get(item_id)]
+    latencies.sort()
+
+    print(f"{'legacy' if args.legacy else 'conditional'} decrement{' with counters' if args.counters else ''}, "
+          f"{args.threads} threads in {args.processes} processes, {elapsed:.1f}s")
+    for outcome, count in sorted(outcomes.items()):
+        print(f"  {outcome}: {count}")
+    print(f"checkouts/second: {outcomes['committed'] / elapsed:.0f}")
+    if latencies:
+        print(f"commit latency p50 {latencies[len(latencies) // 2] * 1e3:.1f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1e3:.1f} ms")
+    print(f"hot items left: {[final_stock[item_id] for item_id in hot_ids]}")
+    print(f"oversold items: {len(oversold)} ({sum(oversold.values())} units)")
+    print(f"stock != start - sold: {len(mismatched)} items")
+    sys.exit(1 if oversold or mismatched else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Peak memory of buffered vs streamed JSON listings on a large synthetic table.
+
+Builds an in-memory SQLite Items table, then serializes it both the old way
+(fetchall -> list of dicts -> json.dumps) and through streaming.json_array_chunks /
+ndjson_chunks over fetchmany batches, recording tracemalloc peaks. The streamed
+peak should stay flat as the row count grows.
+
+    python benchmarks/bench_streaming_memory.py --rows 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from streaming import iter_rows, json_array_chunks, ndjson_chunks  # noqa: E402
+
+
+def item_to_dict(row):
+    return {
+        'ItemID': row[0],
+        'ItemName': row[1],
+        'Category': row[2],
+        'Quantity': row[3],
+        'Price': float(row[4])
+    }
+
+
+def make_table(rows):
+    conn = sqlite3.connect(':memory:')
+    conn.execute("CREATE TABLE Items (ItemID INTEGER PRIMARY KEY, ItemName TEXT, Category TEXT, Quantity INTEGER, Price REAL)")
+    conn.executemany(
+        "INSERT INTO Items (ItemID, ItemName, Category, Quantity, Price) VALUES (?, ?, ?, ?, ?)",
+        ((i, f'Synthetic item {i:08d}', f'Category {i % 40}', i % 500, (i % 1000) / 10) for i in range(1, rows + 1)),
+    )
+    conn.commit()
+    return conn
+
+
+def buffered(conn):
+    cursor = conn.execute("SELECT ItemID, ItemName, Category, Quantity, Price FROM Items")
+    body = json.dumps([item_to_dict(row) for row in cursor.fetchall()])
+    return len(body)
+
+
+def streamed(conn, chunks):
+    cursor = conn.execute("SELECT ItemID, ItemName, Category, Quantity, Price FROM Items")
+    size = 0
+    for chunk in chunks(iter_rows(cursor), item_to_dict):
+        size += len(chunk)  # what the WSGI server would write to the socket
+    return size
+
+
+def profile(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    size = fn(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[10000, 100000, 500000])
+    parser.add_argument('--max-stream-peak-mb', type=float, default=None,
+                        help='exit non-zero if a streamed peak exceeds this many MiB')
+    args = parser.parse_args()
+
+    failed = False
+    print(f"{'rows':>9} | {'mode':>9} | {'payload MiB':>11} | {'peak MiB':>9} | {'seconds':>7}")
+    for rows in args.rows:
+        conn = make_table(rows)
+        for mode, fn, extra in (
+            ('buffered', buffered, ()),
+            ('json', streamed, (json_array_chunks,)),
+            ('ndjson', streamed, (ndjson_chunks,)),
+        ):
+            size, peak, elapsed = profile(fn, conn, *extra)
+            print(f"{rows:>9} | {mode:>9} | {size / 2**20:>11.1f} | {peak / 2**20:>9.2f} | {elapsed:>7.2f}")
+            if mode != 'buffered' and args.max_stream_peak_mb and peak / 2**20 > args.max_stream_peak_mb:
+                failed = True
+        conn.close()
+
+    if failed:
+        print(f"Streamed peak exceeded {args.max_stream_peak_mb} MiB")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
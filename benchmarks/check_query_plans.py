@@ -0,0 +1,210 @@
+"""Query-plan regression check for the transaction filter queries.
+
+Builds the list, stream, report, export and invoice queries with the app's
+own query builders, asks the database for their plans without running them
+and fails if any plan scans TransactionMaster or TransactionDetails instead
+of seeking an index.
+
+SQL Server (SET SHOWPLAN_XML ON): plans depend on row counts, so point it at
+a database with realistic volumes (the optimizer happily scans a table of a
+few pages). On a scratch copy, --fake-rowcount makes the optimizer cost the
+tables as if they were that big.
+
+    python benchmarks/check_query_plans.py --dsn "Driver=...;Database=RBAC;..."
+
+SQLite (EXPLAIN QUERY PLAN): checks the given database file, or a freshly
+migrated scratch database when no path is given.
+
+    python benchmarks/check_query_plans.py --sqlite [pos.db]
+
+Exits 1 if any query scans. username_match=contains is reported but never
+fails the run: its leading wildcard can't seek.
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+import xml.etree.ElementTree as ET
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from db_backend import SQL_SERVER, SQLITE, SqliteBackend  # noqa: E402
+from exports import export_query  # noqa: E402
+from reports import fetch_summary, iter_transactions  # noqa: E402
+from schema import apply_migrations  # noqa: E402
+from transaction_queries import (  # noqa: E402
+    TRANSACTION_COLUMNS, TRANSACTION_LINES_QUERY, build_transaction_filters, encode_cursor,
+    keyset_page_query, where_sql,
+)
+
+SHOWPLAN_NS = {'p': 'http://schemas.microsoft.com/sqlserver/2004/07/showplan'}
+CHECKED_TABLES = ('[TransactionMaster]', '[TransactionDetails]')
+SCAN_OPS = ('Table Scan', 'Clustered Index Scan', 'Index Scan')
+# SQLite names a table by its alias in the plan ("SCAN tm USING INDEX ...")
+SQLITE_CHECKED_NAMES = {
+    'tm': 'TransactionMaster', 'TransactionMaster': 'TransactionMaster',
+    'td': 'TransactionDetails', 'TransactionDetails': 'TransactionDetails',
+}
+SQLITE_SCAN = re.compile(r'^SCAN (\w+)(?: USING (?:COVERING )?INDEX (\w+))?')
+
+# Every query is scoped to the signed-in user's tenant
+FILTER_CASES = {
+    'date range': {'tenant_id': 1, 'start_date': '2024-01-01', 'end_date': '2024-01-31'},
+    'username exact': {'tenant_id': 1, 'username': 'cashier1', 'username_match': 'exact'},
+    'username prefix': {'tenant_id': 1, 'username': 'cash', 'username_match': 'prefix'},
+    'date range + username prefix': {'tenant_id': 1, 'start_date': '2024-01-01', 'end_date': '2024-01-31',
+                                     'username': 'cash', 'username_match': 'prefix'},
+    'username contains': {'tenant_id': 1, 'username': 'shier', 'username_match': 'contains'},
+}
+
+
+class CapturingCursor:
+    """Records the statements the report helpers would run, without running them."""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=()):
+        self.statements.append((sql, list(params)))
+
+    def fetchone(self):
+        return (0, 0, 0, 0)
+
+    def fetchmany(self, size):
+        return []
+
+
+def report_statements(filters):
+    cursor = CapturingCursor()
+    fetch_summary(cursor, filters)
+    list(iter_transactions(cursor, filters))
+    return cursor.statements
+
+
+def queries(dialect=SQL_SERVER):
+    """(name, sql, params, may_scan) for every filtered query the app runs."""
+    for case, filters in FILTER_CASES.items():
+        may_scan = filters.get('username_match') == 'contains'
+        clauses, params = build_transaction_filters(**filters)
+        yield f'list page: {case}', *keyset_page_query(clauses, params, 50, dialect=dialect), may_scan
+        next_page = encode_cursor(datetime(2024, 1, 15, 12, 0), 1000)
+        yield (f'list next page: {case}', *keyset_page_query(clauses, params, 50, next_page, dialect=dialect),
+               may_scan)
+        yield f'list stream: {case}', f"""
+            SELECT {TRANSACTION_COLUMNS}
+            FROM TransactionMaster tm
+            {where_sql(clauses)}
+            ORDER BY tm.TransactionDate DESC, tm.TransactionID DESC
+        """, params, may_scan
+        summary, details = report_statements(filters)
+        yield f'report summary: {case}', *summary, may_scan
+        yield f'report details: {case}', *details, may_scan
+        yield f'export: {case}', *export_query(filters), may_scan
+    yield 'invoice lines', TRANSACTION_LINES_QUERY, [1000], False
+
+
+def scans(plan_xml):
+    """(physical op, table, index) for every scan of a checked table in the plan."""
+    found = []
+    for rel_op in ET.fromstring(plan_xml).iter(f"{{{SHOWPLAN_NS['p']}}}RelOp"):
+        if rel_op.get('PhysicalOp') not in SCAN_OPS:
+            continue
+        # The operator's own object, not ones from nested operators
+        for child in rel_op:
+            obj = child.find('p:Object', SHOWPLAN_NS)
+            if obj is not None and obj.get('Table') in CHECKED_TABLES:
+                found.append((rel_op.get('PhysicalOp'), obj.get('Table'), obj.get('Index')))
+    return found
+
+
+def sqlite_scans(plan_rows):
+    """(op, table, index) for every scan of a checked table in an EXPLAIN QUERY PLAN."""
+    found = []
+    for row in plan_rows:
+        match = SQLITE_SCAN.match(row[3])
+        if match and match.group(1) in SQLITE_CHECKED_NAMES:
+            found.append(('SCAN', SQLITE_CHECKED_NAMES[match.group(1)], match.group(2)))
+    return found
+
+
+def fake_rowcount(cursor, rows):
+    # Scratch databases only: overwrites the optimizer's row/page counts
+    for table in ('TransactionMaster', 'TransactionDetails'):
+        cursor.execute(f"UPDATE STATISTICS {table} WITH ROWCOUNT = {int(rows)}, PAGECOUNT = {int(rows) // 50}")
+
+
+def report(name, found, may_scan):
+    """Print one query's result; True if it is an unexpected scan."""
+    if not found:
+        print(f"ok    {name}")
+    elif may_scan:
+        print(f"scan  {name} (expected: leading wildcard)")
+    else:
+        print(f"FAIL  {name}: " + '; '.join(f"{op} on {table}.{index or ''}" for op, table, index in found))
+        return True
+    return False
+
+
+def check_sql_server(dsn, rowcount=None):
+    # Imported here so the SQLite check doesn't need an ODBC driver
+    import pyodbc
+
+    conn = pyodbc.connect(dsn, autocommit=True)
+    cursor = conn.cursor()
+    if rowcount:
+        fake_rowcount(cursor, rowcount)
+
+    failures = 0
+    cursor.execute("SET SHOWPLAN_XML ON")
+    try:
+        for name, sql, params, may_scan in queries(SQL_SERVER):
+            cursor.execute(sql, params)
+            found = scans(cursor.fetchone()[0])
+            while cursor.nextset():
+                pass
+            failures += report(name, found, may_scan)
+    finally:
+        cursor.execute("SET SHOWPLAN_XML OFF")
+        conn.close()
+    return failures
+
+
+def check_sqlite(path):
+    failures = 0
+    with tempfile.TemporaryDirectory() as scratch:
+        conn = SqliteBackend(path or os.path.join(scratch, 'plans.db')).connect()
+        try:
+            if not path:
+                apply_migrations(conn)
+            cursor = conn.cursor()
+            for name, sql, params, may_scan in queries(SQLITE):
+                cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+                failures += report(name, sqlite_scans(cursor.fetchall()), may_scan)
+        finally:
+            conn.close()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--dsn', help='pyodbc connection string (SQL Server)')
+    target.add_argument('--sqlite', nargs='?', const='', metavar='PATH',
+                        help='SQLite database file (default: a freshly migrated scratch database)')
+    parser.add_argument('--fake-rowcount', type=int,
+                        help='SQL Server only: cost the tables as if they had this many rows')
+    args = parser.parse_args()
+
+    if args.dsn:
+        failures = check_sql_server(args.dsn, args.fake_rowcount)
+    else:
+        failures = check_sqlite(args.sqlite)
+
+    print(f"{failures} queries fall back to a scan" if failures else "no unexpected scans")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
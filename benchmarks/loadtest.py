@@ -0,0 +1,318 @@
+"""HTTP load test for the API with per-endpoint throughput and latency percentiles.
+
+Concurrent clients log in as the seeded bench users (see seed_data.py) and
+run a weighted mix of flows against a running server:
+
+    login      POST /login
+    items      GET  /api/items
+    history    GET  /api/transactions (first page, sometimes filtered)
+    checkout   POST /api/transactions
+    invoice    GET  /api/generate-invoice/<id>
+    report     POST /api/generate-report, poll the job, download the PDF
+
+    python benchmarks/loadtest.py --url http://localhost:5000 --clients 20 --seconds 60 \\
+        --save-baseline baselines/main.json
+    python benchmarks/loadtest.py --url http://localhost:5000 --clients 20 --seconds 60 \\
+        --compare baselines/main.json
+
+--compare exits 1 when an endpoint's p95 grows, or its throughput drops, by
+more than --tolerance. Compare runs made with the same seed data, client
+count and mix on the same machine.
+"""
+import argparse
+import http.cookiejar
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from datetime import datetime
+
+DEFAULT_MIX = 'items=30,history=30,checkout=20,invoice=10,login=5,report=5'
+REPORT_TIMEOUT = 120
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Login answers with a redirect; time the login, not the dashboard page
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Client:
+    def __init__(self, base_url, username, password, rng, timeout):
+        self.base_url = base_url.rstrip('/')
+        self.username = username
+        self.password = password
+        self.rng = rng
+        self.timeout = timeout
+        self.item_ids = []
+        self.transaction_ids = []
+        self._new_session()
+
+    def _new_session(self):
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(self.cookies), NoRedirect)
+
+    def request(self, method, path, body=None, form=None):
+        headers = {}
+        data = None
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif body is not None:
+            data = json.dumps(body).encode()
+            headers['Content-Type'] = 'application/json'
+        request = urllib.request.Request(self.base_url + path, data=data, method=method, headers=headers)
+        try:
+            with self.opener.open(request, timeout=self.timeout) as response:
+                return response.status, response.read()
+        except urllib.error.HTTPError as e:
+            return e.code, e.read()
+
+    def json(self, method, path, body=None):
+        status, payload = self.request(method, path, body)
+        if status >= 400:
+            raise RuntimeError(f'{method} {path} -> {status}')
+        return json.loads(payload)
+
+    def login(self):
+        self._new_session()
+        status, _ = self.request('POST', '/login', form={'username': self.username, 'password': self.password})
+        if status != 302 or not any(cookie.name == 'session' for cookie in self.cookies):
+            raise RuntimeError(f'login as {self.username} failed ({status})')
+
+    def items(self):
+        items = self.json('GET', '/api/items')
+        if items:
+            self.item_ids = [(item['ItemID'], item['ItemName'], item['Price']) for item in items]
+
+    def history(self):
+        params = {'limit': 50}
+        roll = self.rng.random()
+        if roll < 0.2:
+            params['username'] = self.username
+            params['username_match'] = 'exact'
+        elif roll < 0.4:
+            day = self.rng.randint(1, 28)
+            params['start_date'] = f'2024-{self.rng.randint(1, 12):02d}-{day:02d}'
+        page = self.json('GET', f'/api/transactions?{urllib.parse.urlencode(params)}')
+        ids = [t['TransactionID'] for t in page['transactions']]
+        if ids:
+            self.transaction_ids = ids
+
+    def checkout(self):
+        if not self.item_ids:
+            self.items()
+        lines = []
+        for item_id, name, price in self.rng.sample(self.item_ids, min(len(self.item_ids), self.rng.randint(1, 5))):
+            quantity = self.rng.randint(1, 3)
+            lines.append({'itemID': item_id, 'itemName': name, 'quantity': quantity,
+                          'price': price, 'amount': round(price * quantity, 2)})
+        total = round(sum(line['amount'] for line in lines), 2)
+        result = self.json('POST', '/api/transactions', {
+            'transactionDate': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'totalAmount': total, 'discount': 0, 'netAmount': total, 'items': lines,
+        })
+        self.transaction_ids.append(result['transactionID'])
+
+    def invoice(self):
+        if not self.transaction_ids:
+            self.history()
+        transaction_id = self.rng.choice(self.transaction_ids)
+        status, _ = self.request('GET', f'/api/generate-invoice/{transaction_id}')
+        if status != 200:
+            raise RuntimeError(f'invoice {transaction_id} -> {status}')
+
+    def report(self):
+        month = self.rng.randint(1, 12)
+        job = self.json('POST', '/api/generate-report', {
+            'start_date': f'2024-{month:02d}-01', 'end_date': f'2024-{month:02d}-28',
+            'report_type': self.rng.choice(('summary', 'summary', 'detailed')),
+        })
+        deadline = time.monotonic() + REPORT_TIMEOUT
+        while job['status'] in ('queued', 'running'):
+            if time.monotonic() > deadline:
+                raise RuntimeError('report timed out')
+            time.sleep(0.2)
+            job = self.json('GET', f"/api/reports/{job['jobId']}")
+        if job['status'] != 'done':
+            raise RuntimeError(f"report {job['status']}")
+        status, _ = self.request('GET', job['downloadUrl'])
+        if status != 200:
+            raise RuntimeError(f'report download -> {status}')
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(','):
+        name, _, weight = part.partition('=')
+        if name not in ('login', 'items', 'history', 'checkout', 'invoice', 'report'):
+            raise SystemExit(f'unknown flow in --mix: {name}')
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def summarize(samples, errors, elapsed):
+    results = {}
+    for flow in sorted(set(samples) | set(errors)):
+        latencies = sorted(samples.get(flow, []))
+        results[flow] = {
+            'count': len(latencies),
+            'errors': errors.get(flow, 0),
+            'rps': len(latencies) / elapsed,
+            'p50': percentile(latencies, 0.50),
+            'p95': percentile(latencies, 0.95),
+            'p99': percentile(latencies, 0.99),
+        }
+    return results
+
+
+def print_results(results):
+    print(f"{'flow':<10} {'count':>8} {'errors':>7} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for flow, r in results.items():
+        print(f"{flow:<10} {r['count']:>8} {r['errors']:>7} {r['rps']:>9.1f} "
+              f"{r['p50'] * 1e3:>9.1f} {r['p95'] * 1e3:>9.1f} {r['p99'] * 1e3:>9.1f}")
+
+
+def compare(results, baseline, tolerance):
+    """Print per-flow changes against ``baseline``; returns the flows that regressed."""
+    regressed = []
+    print(f"\n{'flow':<10} {'p95 base':>9} {'p95 now':>9} {'change':>8} {'req/s base':>11} {'req/s now':>10} {'change':>8}")
+    for flow, base in baseline['results'].items():
+        now = results.get(flow)
+        if not now or not base['count']:
+            continue
+        p95_change = now['p95'] / base['p95'] - 1 if base['p95'] else 0.0
+        rps_change = now['rps'] / base['rps'] - 1 if base['rps'] else 0.0
+        flag = ''
+        if p95_change > tolerance or rps_change < -tolerance:
+            regressed.append(flow)
+            flag = '  REGRESSED'
+        print(f"{flow:<10} {base['p95'] * 1e3:>9.1f} {now['p95'] * 1e3:>9.1f} {p95_change:>+8.0%} "
+              f"{base['rps']:>11.1f} {now['rps']:>10.1f} {rps_change:>+8.0%}{flag}")
+    return regressed
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:5000')
+    parser.add_argument('--clients', type=int, default=10)
+    parser.add_argument('--seconds', type=float, default=30)
+    parser.add_argument('--warmup', type=float, default=5, help='seconds run before measuring')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='flow=weight,...')
+    parser.add_argument('--users', type=int, default=50, help='seeded bench users to log in as')
+    parser.add_argument('--user-prefix', default='benchuser')
+    parser.add_argument('--password', default='bench')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--save-baseline', help='write the results to this JSON file')
+    parser.add_argument('--compare', help='compare against a saved baseline JSON file')
+    parser.add_argument('--tolerance', type=float, default=0.15, help='allowed p95/throughput change')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    flows, weights = list(mix), list(mix.values())
+    samples = defaultdict(list)
+    errors = defaultdict(int)
+    first_errors = {}
+    lock = threading.Lock()
+    stop = threading.Event()
+    measuring = threading.Event()
+
+    def record(flow, elapsed, error=None):
+        if not measuring.is_set():
+            return
+        with lock:
+            if error is None:
+                samples[flow].append(elapsed)
+            else:
+                errors[flow] += 1
+                first_errors.setdefault(flow, error)
+
+    def run_client(n):
+        rng = random.Random(args.seed * 1000 + n)
+        client = Client(args.url, f'{args.user_prefix}{n % args.users}', args.password, rng, args.timeout)
+        try:
+            client.login()
+        except Exception as e:
+            record('login', 0.0, str(e))
+            return
+        while not stop.is_set():
+            flow = rng.choices(flows, weights)[0]
+            started = time.perf_counter()
+            try:
+                getattr(client, flow)()
+                record(flow, time.perf_counter() - started)
+            except Exception as e:
+                record(flow, time.perf_counter() - started, str(e))
+                if flow == 'login' or 'login' in str(e):
+                    try:
+                        client.login()
+                    except Exception:
+                        pass
+
+    threads = [threading.Thread(target=run_client, args=(n,), daemon=True) for n in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.warmup)
+    measuring.set()
+    started = time.perf_counter()
+    time.sleep(args.seconds)
+    measuring.clear()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in threads:
+        thread.join(args.timeout)
+
+    results = summarize(samples, errors, elapsed)
+    print(f"{args.clients} clients, {elapsed:.0f}s against {args.url}")
+    print_results(results)
+    for flow, error in first_errors.items():
+        print(f"first {flow} error: {error}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.save_baseline)), exist_ok=True)
+        with open(args.save_baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'meta': {
+                    'url': args.url, 'clients': args.clients, 'seconds': args.seconds, 'mix': args.mix,
+                    'revision': git_revision(), 'recordedAt': datetime.now().isoformat(timespec='seconds'),
+                },
+                'results': results,
+            }, f, indent=2)
+        print(f"baseline saved to {args.save_baseline}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        meta = baseline.get('meta', {})
+        if (meta.get('clients'), meta.get('mix')) != (args.clients, args.mix):
+            print("warning: baseline was recorded with a different client count or mix")
+        regressed = compare(results, baseline, args.tolerance)
+        if regressed:
+            print(f"regressions: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,250 @@
+"""Seed a database with reproducible synthetic data for load tests.
+
+Creates tenants, users (benchuser0..N, password "bench") with a BenchAdmin
+role that holds every item permission, a catalog of items for each tenant and
+a history of transactions with their lines. The same --seed always produces the same data.
+
+    python benchmarks/seed_data.py --dsn "Driver=...;Database=RBAC_bench;..." --transactions 1e6
+    python benchmarks/seed_data.py --sqlite /tmp/bench.db --transactions 1e5
+
+--dsn seeds SQL Server; --create-schema creates the base tables in an empty
+scratch database first. --sqlite seeds a SQLite file (the app's DB_BACKEND=sqlite
+store), creating it if needed. Either way the migrations are applied first and
+the dashboard stats and sales rollups are rebuilt after seeding.
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from werkzeug.security import generate_password_hash  # noqa: E402
+
+BENCH_USER_PREFIX = 'benchuser'
+BENCH_PASSWORD = 'bench'
+BENCH_ROLE = 'BenchAdmin'
+BENCH_PERMISSIONS = ('Create_Item', 'Read_Item', 'Update_Item', 'Delete_Item')
+CATEGORIES = ('Dairy', 'Bakery', 'Produce', 'Meat', 'Frozen', 'Beverages', 'Snacks', 'Household',
+              'Pantry', 'Personal Care')
+WORDS = ('organic', 'fresh', 'whole', 'large', 'classic', 'family', 'light', 'extra', 'mini', 'premium',
+         'milk', 'bread', 'apple', 'cheese', 'rice', 'pasta', 'juice', 'coffee', 'tea', 'butter',
+         'yogurt', 'chicken', 'beef', 'salmon', 'tomato', 'onion', 'soap', 'chips', 'cereal', 'eggs')
+BATCH_SIZE = 10000
+
+SQL_SERVER_SCHEMA = [
+    """IF OBJECT_ID('Tenants') IS NULL CREATE TABLE Tenants (
+        TenantID INT IDENTITY PRIMARY KEY, TenantName NVARCHAR(100) NOT NULL)""",
+    """IF OBJECT_ID('Users') IS NULL CREATE TABLE Users (
+        UserID INT IDENTITY PRIMARY KEY, Username NVARCHAR(100) NOT NULL UNIQUE,
+        PasswordHash NVARCHAR(255) NOT NULL, TenantID INT NOT NULL REFERENCES Tenants (TenantID))""",
+    """IF OBJECT_ID('Roles') IS NULL CREATE TABLE Roles (
+        RoleID INT IDENTITY PRIMARY KEY, RoleName NVARCHAR(50) NOT NULL UNIQUE)""",
+    """IF OBJECT_ID('Permissions') IS NULL CREATE TABLE Permissions (
+        PermissionID INT IDENTITY PRIMARY KEY, PermissionName NVARCHAR(100) NOT NULL UNIQUE)""",
+    """IF OBJECT_ID('RolePermissions') IS NULL CREATE TABLE RolePermissions (
+        RoleID INT NOT NULL, PermissionID INT NOT NULL, PRIMARY KEY (RoleID, PermissionID))""",
+    """IF OBJECT_ID('UserRoles') IS NULL CREATE TABLE UserRoles (
+        UserID INT NOT NULL, RoleID INT NOT NULL, PRIMARY KEY (UserID, RoleID))""",
+    """IF OBJECT_ID('Items') IS NULL CREATE TABLE Items (
+        ItemID INT IDENTITY PRIMARY KEY, ItemName NVARCHAR(200) NOT NULL, Category NVARCHAR(100),
+        Quantity INT NOT NULL DEFAULT 0, Price DECIMAL(10, 2) NOT NULL)""",
+    """IF OBJECT_ID('TransactionMaster') IS NULL CREATE TABLE TransactionMaster (
+        TransactionID INT IDENTITY PRIMARY KEY, TransactionDate DATETIME NOT NULL,
+        Username NVARCHAR(100) NOT NULL, TotalAmount DECIMAL(12, 2), Discount DECIMAL(12, 2),
+        NetAmount DECIMAL(12, 2))""",
+    """IF OBJECT_ID('TransactionDetails') IS NULL CREATE TABLE TransactionDetails (
+        DetailID INT IDENTITY PRIMARY KEY, TransactionID INT NOT NULL, ItemName NVARCHAR(200) NOT NULL,
+        Quantity INT NOT NULL, Price DECIMAL(10, 2) NOT NULL, Amount DECIMAL(12, 2) NOT NULL)""",
+]
+
+def count(value):
+    # Accepts 1e6 as well as 1000000
+    return int(float(value))
+
+
+class Seeder:
+    def __init__(self, conn, sql_server):
+        self.conn = conn
+        self.sql_server = sql_server
+        self.cursor = conn.cursor()
+        if sql_server:
+            self.cursor.fast_executemany = True
+
+    def scalar(self, sql, params=()):
+        self.cursor.execute(sql, params)
+        row = self.cursor.fetchone()
+        return row[0] if row else None
+
+    def insert_rows(self, table, columns, rows, explicit_ids=False):
+        """Insert ``rows`` in committed batches; returns the number inserted."""
+        sql = f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})"
+        if explicit_ids and self.sql_server:
+            self.cursor.execute(f"SET IDENTITY_INSERT {table} ON")
+        inserted = 0
+        batch = []
+        try:
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= BATCH_SIZE:
+                    self.cursor.executemany(sql, batch)
+                    self.conn.commit()
+                    inserted += len(batch)
+                    batch = []
+            if batch:
+                self.cursor.executemany(sql, batch)
+                self.conn.commit()
+                inserted += len(batch)
+        finally:
+            if explicit_ids and self.sql_server:
+                self.cursor.execute(f"SET IDENTITY_INSERT {table} OFF")
+        return inserted
+
+    def get_or_create(self, table, id_column, name_column, name):
+        row_id = self.scalar(f"SELECT {id_column} FROM {table} WHERE {name_column} = ?", (name,))
+        if row_id is None:
+            self.cursor.execute(f"INSERT INTO {table} ({name_column}) VALUES (?)", (name,))
+            row_id = self.scalar(f"SELECT {id_column} FROM {table} WHERE {name_column} = ?", (name,))
+        return row_id
+
+
+def seed(seeder, args):
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+
+    tenant_ids = [seeder.get_or_create('Tenants', 'TenantID', 'TenantName', f'Bench Tenant {n}')
+                  for n in range(args.tenants)]
+    role_id = seeder.get_or_create('Roles', 'RoleID', 'RoleName', BENCH_ROLE)
+    for permission in BENCH_PERMISSIONS:
+        permission_id = seeder.get_or_create('Permissions', 'PermissionID', 'PermissionName', permission)
+        if not seeder.scalar("SELECT COUNT(*) FROM RolePermissions WHERE RoleID = ? AND PermissionID = ?",
+                             (role_id, permission_id)):
+            seeder.cursor.execute("INSERT INTO RolePermissions (RoleID, PermissionID) VALUES (?, ?)",
+                                  (role_id, permission_id))
+    seeder.conn.commit()
+
+    usernames = [f'{BENCH_USER_PREFIX}{n}' for n in range(args.users)]
+    existing = seeder.scalar("SELECT COUNT(*) FROM Users WHERE Username LIKE ?", (f'{BENCH_USER_PREFIX}%',))
+    if existing:
+        sys.exit(f"{existing} bench users already exist; seed into an empty database")
+    # One hash shared by every bench user keeps seeding fast; logins still pay a full check
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+    seeder.insert_rows('Users', ['Username', 'PasswordHash', 'TenantID'],
+                       ((name, password_hash, tenant_ids[n % len(tenant_ids)]) for n, name in enumerate(usernames)))
+    seeder.cursor.execute("""
+        INSERT INTO UserRoles (UserID, RoleID)
+        SELECT UserID, ? FROM Users WHERE Username LIKE ?
+    """, (role_id, f'{BENCH_USER_PREFIX}%'))
+    seeder.conn.commit()
+    print(f"{args.users} users in {args.tenants} tenants")
+
+    # Every tenant stocks the same catalog, each in its own rows
+    catalog = [(f"{rng.choice(WORDS).title()} {rng.choice(WORDS)} {n}", rng.choice(CATEGORIES),
+                rng.randint(args.stock // 2, args.stock), round(rng.uniform(0.5, 50), 2))
+               for n in range(args.items)]
+    first_item = (seeder.scalar("SELECT MAX(ItemID) FROM Items") or 0) + 1
+    items = [(first_item + n * len(catalog) + i, tenant_id, *item)
+             for n, tenant_id in enumerate(tenant_ids) for i, item in enumerate(catalog)]
+    seeder.insert_rows('Items', ['ItemID', 'TenantID', 'ItemName', 'Category', 'Quantity', 'Price'], items,
+                       explicit_ids=True)
+    print(f"{args.items} items per tenant")
+
+    first_transaction = (seeder.scalar("SELECT MAX(TransactionID) FROM TransactionMaster") or 0) + 1
+    end = datetime.fromisoformat(args.end_date)
+    span = args.days * 86400
+    # Popular items sell more often (Zipf-like), as in a real catalog
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(catalog))))
+    user_tenants = [tenant_ids[n % len(tenant_ids)] for n in range(len(usernames))]
+    details = []
+
+    def masters():
+        for n in range(args.transactions):
+            transaction_id = first_transaction + n
+            when = end - timedelta(seconds=rng.randrange(span))
+            user = rng.randrange(len(usernames))
+            total = 0.0
+            for item in rng.choices(catalog, cum_weights=cum_weights, k=rng.randint(1, 2 * args.lines - 1)):
+                quantity = rng.randint(1, 3)
+                amount = round(item[3] * quantity, 2)
+                total += amount
+                details.append((transaction_id, item[0], quantity, item[3], amount))
+            discount = round(total * rng.choice((0, 0, 0, 0.05, 0.1)), 2)
+            yield (transaction_id, user_tenants[user], when.replace(microsecond=0), usernames[user],
+                   round(total, 2), discount, round(total - discount, 2))
+
+    def batches():
+        # Masters and their lines go in together so the tables never disagree for long
+        batch = []
+        for master in masters():
+            batch.append(master)
+            if len(batch) >= BATCH_SIZE:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    written = lines = 0
+    for batch in batches():
+        seeder.insert_rows('TransactionMaster',
+                           ['TransactionID', 'TenantID', 'TransactionDate', 'Username', 'TotalAmount', 'Discount',
+                            'NetAmount'],
+                           batch, explicit_ids=True)
+        lines += seeder.insert_rows('TransactionDetails',
+                                    ['TransactionID', 'ItemName', 'Quantity', 'Price', 'Amount'], details)
+        details.clear()
+        written += len(batch)
+        elapsed = time.perf_counter() - started
+        print(f"\r{written}/{args.transactions} transactions, {lines} lines ({written / elapsed:.0f}/s)",
+              end='', flush=True)
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--dsn', help='pyodbc connection string of a scratch SQL Server database')
+    target.add_argument('--sqlite', help='SQLite database file to create or extend')
+    parser.add_argument('--create-schema', action='store_true', help='create the base tables (SQL Server)')
+    parser.add_argument('--tenants', type=count, default=2)
+    parser.add_argument('--users', type=count, default=50)
+    parser.add_argument('--items', type=count, default=5000)
+    parser.add_argument('--stock', type=count, default=1000000, help='max starting quantity per item')
+    parser.add_argument('--transactions', type=count, default=100000, help='1e3 .. 1e7')
+    parser.add_argument('--lines', type=int, default=3, help='average lines per transaction')
+    parser.add_argument('--days', type=int, default=365, help='history length')
+    parser.add_argument('--end-date', default='2024-12-31T23:59:59')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from db_backend import SqliteBackend, SqlServerBackend
+    from sales_rollups import backfill_sales
+    from schema import apply_migrations
+    from stats import rebuild_stats
+
+    backend = SqliteBackend(args.sqlite) if args.sqlite else SqlServerBackend(args.dsn)
+    conn = backend.connect()
+    if args.create_schema and not args.sqlite:
+        cursor = conn.cursor()
+        for statement in SQL_SERVER_SCHEMA:
+            cursor.execute(statement)
+        conn.commit()
+    for name in apply_migrations(conn):
+        print(f"Applied {name}")
+    seed(Seeder(conn, sql_server=not args.sqlite), args)
+
+    cursor = conn.cursor()
+    rebuild_stats(cursor)
+    conn.commit()
+    for month in backfill_sales(conn):
+        print(f"\rSales rollups rebuilt through {month:%Y-%m}", end='', flush=True)
+    print()
+    cursor.execute("ANALYZE" if args.sqlite else "EXEC sp_updatestats")
+    conn.commit()
+    conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import json
+import threading
+from collections import OrderedDict
+
+from db_backend import dialect_of
+
+CATALOG_CACHE_MAX_BYTES = 16 * 1024 * 1024
+
+
+def bump_catalog_version(cursor, tenant_id):
+    """Increment the tenant's catalog version and return it (caller commits)."""
+    cursor.execute(dialect_of(cursor).upsert(
+        'CatalogVersions', keys=[('TenantID', '?')], increments=[('Version', '1')], returning='Version',
+    ), (tenant_id,))
+    return int(cursor.fetchone()[0])
+
+
+def bump_catalog_version_after_commit(conn, tenant_id):
+    """Bump the tenant's catalog version in a transaction of its own and return it.
+
+    Checkouts call this right after they commit, so the version row is locked
+    for one statement rather than for the whole sale. Until the bump, other
+    processes may serve their cached catalog without the sale's stock; the bump
+    then makes them reload. Returns None if the bump fails; the sale is
+    committed anyway and the caller drops its cached catalog.
+    """
+    try:
+        version = bump_catalog_version(conn.cursor(), tenant_id)
+        conn.commit()
+        return version
+    except Exception as e:
+        conn.rollback()
+        print(f"Error bumping catalog version: {e}")
+        return None
+
+
+def read_catalog_version(cursor, tenant_id):
+    cursor.execute("SELECT Version FROM CatalogVersions WHERE TenantID = ?", (tenant_id,))
+    row = cursor.fetchone()
+    return int(row[0]) if row else 0
+
+
+def catalog_etag(tenant_id, version):
+    return f'catalog-{tenant_id}-{version}'
+
+
+# Per-item cost of a fragment's bytes object, its list slot and its index entry
+_ITEM_OVERHEAD = 150
+
+
+class _Entry:
+    """A catalog kept as one JSON fragment per item (indexed by ItemID) plus the joined body.
+
+    A checkout rewrites only the fragments of the items it sold; the body is
+    joined again on the next read. ``size`` counts all of it.
+    """
+    __slots__ = ('version', 'item_version', 'fragments', 'index', 'fragment_bytes', 'body', 'size')
+
+    def __init__(self, version, items, item_version):
+        self.version = version
+        self.item_version = item_version
+        self.fragments = [json.dumps(item).encode('utf-8') for item in items]
+        self.index = {item['ItemID']: position for position, item in enumerate(items)}
+        self.fragment_bytes = sum(len(fragment) for fragment in self.fragments)
+        self.join()
+
+    def join(self):
+        # Same bytes as json.dumps(items)
+        self.body = b'[' + b', '.join(self.fragments) + b']'
+        self._measure()
+
+    def patch(self, quantities):
+        for item_id, quantity in quantities.items():
+            position = self.index.get(item_id)
+            if position is None:
+                continue
+            item = json.loads(self.fragments[position])
+            item['Quantity'] = quantity
+            fragment = json.dumps(item).encode('utf-8')
+            self.fragment_bytes += len(fragment) - len(self.fragments[position])
+            self.fragments[position] = fragment
+        self.body = None
+        self._measure()
+
+    def _measure(self):
+        self.size = (self.fragment_bytes + len(self.fragments) * _ITEM_OVERHEAD
+                     + (len(self.body) if self.body is not None else 0))
+
+
+class CatalogCache:
+    """Per-tenant serialized item catalogs, keyed by catalog version and LRU-bounded by size.
+
+    ``max_bytes`` bounds everything the entries hold: the JSON body and the
+    per-item fragments and index kept for stock patches.
+
+    An entry is only served for the version it was loaded at, so a write in any
+    process (which bumps CatalogVersions) makes every process reload. The
+    process that sold stock patches its own entry forward instead.
+    """
+
+    def __init__(self, max_bytes=CATALOG_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # tenant_id -> _Entry
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.patches = 0
+
+    def get(self, tenant_id, version):
+        """(JSON body, item change-feed version) cached for ``version``, or None."""
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(tenant_id)
+            self.hits += 1
+            if entry.body is None:
+                size = entry.size
+                entry.join()
+                self._resized(entry, size)
+            return entry.body, entry.item_version
+
+    def put(self, tenant_id, version, items, item_version):
+        """Cache ``items`` (list of item dicts) as ``version`` and return (body, item_version).
+
+        ``item_version`` is the Items change-feed version read before ``items``
+        were loaded, so clients can sync changes from there.
+        """
+        entry = _Entry(version, items, item_version)
+        if entry.size > self.max_bytes:
+            return entry.body, item_version
+        with self._lock:
+            current = self._entries.get(tenant_id)
+            # A slower request may finish after a newer version was cached
+            if current is not None and current.version > version:
+                return entry.body, item_version
+            self._drop(tenant_id)
+            self._entries[tenant_id] = entry
+            self._size += entry.size
+            self._evict()
+        return entry.body, item_version
+
+    def patch_stock(self, tenant_id, version, quantities):
+        """Apply a checkout's new stock levels ({ItemID: Quantity}) committed as ``version``.
+
+        Only an entry at the immediately preceding version can be moved forward;
+        anything else means another write happened in between, so it is dropped.
+        """
+        with self._lock:
+            entry = self._entries.get(tenant_id)
+            if entry is None:
+                return
+            if entry.version != version - 1:
+                self._drop(tenant_id)
+                return
+            # Only the sold items' fragments are rewritten; the body is joined
+            # on the next read, not on the checkout request
+            size = entry.size
+            entry.patch(quantities)
+            # item_version is left behind on purpose: a client syncing from it
+            # is only re-sent changes it already has
+            entry.version = version
+            self.patches += 1
+            self._resized(entry, size)
+
+    def invalidate(self, tenant_id):
+        with self._lock:
+            self._drop(tenant_id)
+
+    def _drop(self, tenant_id):
+        entry = self._entries.pop(tenant_id, None)
+        if entry is not None:
+            self._size -= entry.size
+
+    def _resized(self, entry, old_size):
+        self._size += entry.size - old_size
+        self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._size -= entry.size
+
+    def stats(self):
+        with self._lock:
+            return {
+                'tenants': len(self._entries),
+                'bytes': self._size,
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'patches': self.patches,
+            }
@@ -0,0 +1,403 @@
+import random
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+from db_backend import dialect_of
+
+# SQL Server allows 2100 parameters per statement; two per VALUES row
+STOCK_UPDATE_CHUNK = 500
+# Seconds a checkout waits for the in-process locks of the items it sells
+ITEM_LOCK_TIMEOUT = 2.0
+ITEM_LOCK_STRIPES = 1024
+# Whole-checkout retries after SQL Server picks it as a deadlock victim
+DEADLOCK_RETRIES = 3
+# Queued sales accepted per batch upload, and the longest client idempotency key
+MAX_BATCH_SALES = 100
+IDEMPOTENCY_KEY_MAX_LENGTH = 64
+
+
+class InsufficientStock(Exception):
+    """Raised when one or more items don't have enough stock for the basket."""
+
+    def __init__(self, item_ids):
+        super().__init__(f"Insufficient stock for items {sorted(item_ids)}")
+        self.item_ids = sorted(item_ids)
+
+
+class ItemLockTimeout(Exception):
+    """Raised when the items' locks can't be taken within ITEM_LOCK_TIMEOUT."""
+
+
+class ItemLocks:
+    """Striped per-item locks that queue this process's checkouts of the same items.
+
+    Concurrent baskets sharing a hot SKU wait here, briefly and in order, instead
+    of piling up on the same row locks in SQL Server. Stripes are always taken
+    in ascending order, so two baskets can't deadlock on each other.
+    """
+
+    def __init__(self, stripes=ITEM_LOCK_STRIPES, timeout=ITEM_LOCK_TIMEOUT):
+        self._locks = [threading.Lock() for _ in range(stripes)]
+        self.timeout = timeout
+
+    @contextmanager
+    def hold(self, item_ids):
+        stripes = sorted({item_id % len(self._locks) for item_id in item_ids})
+        deadline = time.monotonic() + self.timeout
+        held = []
+        try:
+            for stripe in stripes:
+                lock = self._locks[stripe]
+                if not lock.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                    raise ItemLockTimeout("Timed out waiting for item stock locks")
+                held.append(lock)
+            yield
+        finally:
+            for lock in reversed(held):
+                lock.release()
+
+
+def is_deadlock(error):
+    # pyodbc puts the SQLSTATE first; 40001 is "chosen as deadlock victim" (1205).
+    # SQLite gives up on another connection's write lock after busy_timeout
+    if isinstance(error, sqlite3.OperationalError):
+        return 'locked' in str(error) or 'busy' in str(error)
+    args = getattr(error, 'args', ())
+    return bool(args) and args[0] == '40001'
+
+
+def is_duplicate_key(error):
+    # 23000 with 2601/2627 is a unique index violation (here: an idempotency key
+    # another request wrote first)
+    if isinstance(error, sqlite3.IntegrityError):
+        return 'UNIQUE' in str(error)
+    args = getattr(error, 'args', ())
+    return bool(args) and args[0] == '23000' and ('2601' in str(error) or '2627' in str(error))
+
+
+def find_transaction_ids(cursor, username, keys):
+    """{idempotencyKey: TransactionID} for the keys this user has already written."""
+    if not keys:
+        return {}
+    placeholders = ', '.join('?' * len(keys))
+    cursor.execute(f"""
+        SELECT IdempotencyKey, TransactionID FROM TransactionMaster
+        WHERE Username = ? AND IdempotencyKey IN ({placeholders})
+    """, [username, *keys])
+    return {key: int(transaction_id) for key, transaction_id in cursor.fetchall()}
+
+
+def checkout(conn, tenant_id, username, data, item_locks, after_write=None, retries=DEADLOCK_RETRIES):
+    """Write a checkout of the tenant's items with oversell protection and commit it.
+
+    Stock is taken with a conditional decrement while this process holds the
+    basket's item locks, which are released right after the commit.
+    ``after_write(cursor)`` runs in the same transaction just before the commit
+    (running totals, catalog version). Raises InsufficientStock (nothing is
+    written) when any item is short, ValueError when a line is malformed or
+    names an item the tenant doesn't have, ItemLockTimeout when the items stay busy,
+    and retries the whole checkout if SQL Server picks it as a deadlock victim.
+
+    A sale whose ``idempotencyKey`` this user already wrote is not written
+    again. Returns (TransactionID, {ItemID: new Quantity}), or (the existing
+    TransactionID, None) for such a repeat.
+    """
+    key = data.get('idempotencyKey')
+    for attempt in range(retries + 1):
+        cursor = conn.cursor()
+        try:
+            existing = find_transaction_ids(cursor, username, [key] if key else [])
+            if key in existing:
+                conn.rollback()
+                return existing[key], None
+            validate_lines(data.get('items'))
+            item_ids = resolve_item_ids(cursor, tenant_id, data['items'])
+            with item_locks.hold(stock_deltas(data['items'], item_ids)):
+                result = write_transaction(cursor, tenant_id, username, data, item_ids)
+                if after_write:
+                    after_write(cursor)
+                conn.commit()
+            return result
+        except Exception as e:
+            conn.rollback()
+            if attempt < retries and (is_deadlock(e) or (key and is_duplicate_key(e))):
+                # Jittered backoff so the retrying checkouts don't collide again;
+                # a duplicate key finds the other request's sale on the retry
+                time.sleep(random.uniform(0.01, 0.05) * (attempt + 1))
+                continue
+            raise
+
+
+def _rejected(key, error, item_ids=None):
+    result = {'idempotencyKey': key, 'status': 'rejected', 'error': error}
+    if item_ids:
+        result['itemIDs'] = item_ids
+    return result
+
+
+def _valid_key(key):
+    return isinstance(key, str) and 0 < len(key) <= IDEMPOTENCY_KEY_MAX_LENGTH
+
+
+def checkout_batch(conn, tenant_id, username, sales, item_locks, after_write=None, retries=DEADLOCK_RETRIES):
+    """Write a till's queued sales in one database transaction, each at most once.
+
+    Every sale carries a client-generated ``idempotencyKey``. Keys this user
+    already wrote (an earlier upload whose response was lost) come back as
+    'duplicate' with the original TransactionID. New sales are written under
+    their own savepoint, so a short item or a bad line only rejects that sale.
+    The item locks of the whole batch are held until the commit.
+    ``after_write(cursor, written)`` gets the (sale, TransactionID) pairs
+    written and runs just before the commit.
+
+    Returns ([{'idempotencyKey', 'status', ...} per sale, in order],
+    {ItemID: new Quantity}).
+    """
+    for attempt in range(retries + 1):
+        cursor = conn.cursor()
+        dialect = dialect_of(cursor)
+        try:
+            results = [None] * len(sales)
+            keys = [sale.get('idempotencyKey') if isinstance(sale, dict) else None for sale in sales]
+            existing = find_transaction_ids(cursor, username, sorted({key for key in keys if _valid_key(key)}))
+
+            pending = []
+            first_index = {}
+            for index, (sale, key) in enumerate(zip(sales, keys)):
+                if not _valid_key(key):
+                    results[index] = _rejected(key, f'idempotencyKey must be 1-{IDEMPOTENCY_KEY_MAX_LENGTH} characters')
+                elif key in existing:
+                    results[index] = {'idempotencyKey': key, 'status': 'duplicate', 'transactionID': existing[key]}
+                elif key in first_index:
+                    # Filled in from the first copy once it is written
+                    results[index] = first_index[key]
+                elif any(field not in sale for field in ('transactionDate', 'totalAmount', 'discount', 'netAmount')):
+                    results[index] = _rejected(key, 'Sale is missing its date or amounts')
+                else:
+                    try:
+                        # Before any lookup, so one malformed sale can't fail the batch
+                        validate_lines(sale.get('items'))
+                    except ValueError as e:
+                        results[index] = _rejected(key, str(e))
+                        continue
+                    first_index[key] = index
+                    pending.append((index, sale))
+
+            item_ids = resolve_item_ids(cursor, tenant_id, [line for _, sale in pending for line in sale['items']])
+            locked = set()
+            for index, sale in list(pending):
+                try:
+                    locked.update(stock_deltas(sale['items'], item_ids))
+                except (KeyError, TypeError, ValueError) as e:
+                    results[index] = _rejected(sale['idempotencyKey'], str(e) if isinstance(e, ValueError)
+                                               else 'Invalid sale line')
+                    pending.remove((index, sale))
+
+            stock = {}
+            written = []
+            with item_locks.hold(locked):
+                if pending and dialect.begin_write():
+                    cursor.execute(dialect.begin_write())
+                for index, sale in pending:
+                    key = sale['idempotencyKey']
+                    cursor.execute(dialect.savepoint('sale'))
+                    try:
+                        transaction_id, sale_stock = write_transaction(cursor, tenant_id, username, sale, item_ids)
+                    except InsufficientStock as e:
+                        cursor.execute(dialect.rollback_to_savepoint('sale'))
+                        results[index] = _rejected(key, 'Insufficient stock', e.item_ids)
+                        continue
+                    except Exception as e:
+                        if not is_duplicate_key(e):
+                            raise
+                        # Another upload of the same sale committed while this one waited
+                        cursor.execute(dialect.rollback_to_savepoint('sale'))
+                        transaction_id = find_transaction_ids(cursor, username, [key])[key]
+                        results[index] = {'idempotencyKey': key, 'status': 'duplicate',
+                                          'transactionID': transaction_id}
+                        continue
+                    stock.update(sale_stock)
+                    written.append((sale, transaction_id))
+                    results[index] = {'idempotencyKey': key, 'status': 'created', 'transactionID': transaction_id}
+                if after_write and written:
+                    after_write(cursor, written)
+                conn.commit()
+
+            for index, result in enumerate(results):
+                if isinstance(result, int):
+                    first = results[result]
+                    results[index] = first if first['status'] == 'rejected' else {
+                        'idempotencyKey': first['idempotencyKey'], 'status': 'duplicate',
+                        'transactionID': first['transactionID'],
+                    }
+            return results, stock
+        except Exception as e:
+            conn.rollback()
+            if attempt < retries and is_deadlock(e):
+                time.sleep(random.uniform(0.01, 0.05) * (attempt + 1))
+                continue
+            raise
+
+
+def write_transaction(cursor, tenant_id, username, data, item_ids=None):
+    """Write a checkout in a handful of round trips, independent of basket size.
+
+    1. INSERT master row and return its id (OUTPUT INSERTED / RETURNING)
+    2. check the client's ItemIDs and resolve the rest by ItemName (a query
+       or two, skipped when ``item_ids`` is passed in)
+    3. INSERT every detail line in one executemany batch
+    4. decrement stock with one set-based conditional UPDATE keyed by ItemID;
+       raises InsufficientStock if any item is short (or not the tenant's),
+       and ValueError if a line's item name doesn't resolve to an item
+
+    Stock is decremented last so the item rows are locked for as little of the
+    transaction as possible. Returns (TransactionID, {ItemID: new Quantity}).
+    The caller owns the transaction and commits it (or rolls it back).
+    """
+    lines = data['items']
+
+    dialect = dialect_of(cursor)
+    cursor.execute(dialect.insert_returning(
+        'TransactionMaster',
+        ['TenantID', 'TransactionDate', 'Username', 'TotalAmount', 'Discount', 'NetAmount', 'IdempotencyKey'],
+        'TransactionID', values=['?', dialect.timestamp('?'), '?', '?', '?', '?', '?'],
+    ), (tenant_id, data['transactionDate'], username,
+          data['totalAmount'], data['discount'], data['netAmount'], data.get('idempotencyKey')))
+    transaction_id = int(cursor.fetchone()[0])
+
+    if item_ids is None:
+        item_ids = resolve_item_ids(cursor, tenant_id, lines)
+
+    if lines:
+        _enable_fast_executemany(cursor)
+        cursor.executemany("""
+            INSERT INTO TransactionDetails (TransactionID, ItemName, Quantity, Price, Amount)
+            VALUES (?, ?, ?, ?, ?)
+        """, [(transaction_id, line['itemName'], line['quantity'], line['price'], line['amount'])
+              for line in lines])
+
+    stock = decrement_stock(cursor, tenant_id, stock_deltas(lines, item_ids))
+    return transaction_id, stock
+
+
+def validate_lines(lines):
+    """Raise ValueError unless ``lines`` is a non-empty list of well-formed sale lines."""
+    if not isinstance(lines, list) or not lines:
+        raise ValueError('items must be a non-empty list')
+    for line in lines:
+        if not isinstance(line, dict) or not isinstance(line.get('itemName'), str) or not line['itemName']:
+            raise ValueError('Every line needs an itemName')
+        for field, number in (('quantity', int), ('price', float), ('amount', float), ('itemID', int)):
+            if field == 'itemID' and not line.get(field):
+                continue
+            try:
+                number(line[field])
+            except (KeyError, TypeError, ValueError):
+                raise ValueError(f"{field} for {line['itemName']} must be a number")
+
+
+def resolve_item_ids(cursor, tenant_id, lines):
+    """Return {itemName: ItemID} for the tenant's items.
+
+    An itemID sent by the client is used when it is the tenant's item of that
+    name; other lines (and stale or mismatched ids) are looked up by name.
+    """
+    item_ids = {}
+    claimed = {}
+    for line in lines:
+        if line.get('itemID'):
+            claimed.setdefault(line['itemName'], int(line['itemID']))
+
+    if claimed:
+        ids = sorted(set(claimed.values()))
+        placeholders = ', '.join('?' * len(ids))
+        cursor.execute(
+            f"SELECT ItemID, ItemName FROM Items WHERE TenantID = ? AND ItemID IN ({placeholders})",
+            [tenant_id, *ids],
+        )
+        names = {int(item_id): name for item_id, name in cursor.fetchall()}
+        item_ids = {name: item_id for name, item_id in claimed.items() if names.get(item_id) == name}
+
+    missing = []
+    for line in lines:
+        if line['itemName'] not in item_ids and line['itemName'] not in missing:
+            missing.append(line['itemName'])
+
+    if missing:
+        placeholders = ', '.join('?' * len(missing))
+        cursor.execute(
+            f"SELECT ItemName, ItemID FROM Items WHERE TenantID = ? AND ItemName IN ({placeholders})",
+            [tenant_id, *missing],
+        )
+        for name, item_id in cursor.fetchall():
+            item_ids.setdefault(name, int(item_id))
+
+    return item_ids
+
+
+def stock_deltas(lines, item_ids):
+    # Several cart lines may sell the same item; fold them into one row per ItemID
+    deltas = OrderedDict()
+    for line in lines:
+        item_id = item_ids.get(line['itemName'])
+        if item_id is None:
+            # Renamed or deleted since the till loaded it: selling it would skip the stock check
+            raise ValueError(f"Unknown item: {line['itemName']}")
+        quantity = int(line['quantity'])
+        if quantity <= 0:
+            raise ValueError(f"Quantity for {line['itemName']} must be positive")
+        deltas[item_id] = deltas.get(item_id, 0) + quantity
+    return deltas
+
+
+_STOCK_UPDATE = """
+    UPDATE i
+    SET i.Quantity = i.Quantity - v.Qty
+    OUTPUT INSERTED.ItemID, INSERTED.Quantity
+    FROM Items i
+    JOIN (VALUES {values}) AS v(ItemID, Qty) ON i.ItemID = v.ItemID
+    WHERE i.Quantity >= v.Qty AND i.TenantID = ?
+"""
+
+_SQLITE_STOCK_UPDATE = """
+    WITH v(ItemID, Qty) AS (VALUES {values})
+    UPDATE Items
+    SET Quantity = Items.Quantity - v.Qty
+    FROM v
+    WHERE Items.ItemID = v.ItemID AND Items.Quantity >= v.Qty AND Items.TenantID = ?
+    RETURNING ItemID, Quantity
+"""
+
+
+def decrement_stock(cursor, tenant_id, deltas):
+    """Apply {ItemID: quantity sold} and return {ItemID: new Quantity}.
+
+    Each row is only updated if it belongs to the tenant and still has enough
+    stock (checked and written atomically under the row's update lock); any
+    row that wasn't updated means the basket can't be filled and
+    InsufficientStock is raised.
+    """
+    stock = {}
+    rows = sorted(deltas.items())
+    sql = _SQLITE_STOCK_UPDATE if dialect_of(cursor).name == 'sqlite' else _STOCK_UPDATE
+    for start in range(0, len(rows), STOCK_UPDATE_CHUNK):
+        chunk = rows[start:start + STOCK_UPDATE_CHUNK]
+        values = ', '.join('(?, ?)' for _ in chunk)
+        params = [value for row in chunk for value in row] + [tenant_id]
+        cursor.execute(sql.format(values=values), params)
+        stock.update((int(item_id), quantity) for item_id, quantity in cursor.fetchall())
+    short = set(deltas) - set(stock)
+    if short:
+        raise InsufficientStock(short)
+    return stock
+
+
+def _enable_fast_executemany(cursor):
+    # pyodbc sends the whole parameter array in one round trip with this set
+    try:
+        cursor.fast_executemany = True
+    except AttributeError:
+        pass
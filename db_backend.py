@@ -0,0 +1,220 @@
+import os
+import random
+import sqlite3
+from datetime import date, datetime
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+
+BACKENDS = ('mssql', 'sqlite')
+DEFAULT_SQLITE_PATH = 'rbac_pos.db'
+# Seconds a SQLite writer waits for another connection's write lock
+SQLITE_BUSY_TIMEOUT = 5.0
+# Counters every checkout adds to are split over this many rows per key, so
+# concurrent checkouts rarely wait on the same row lock; readers sum them
+COUNTER_SHARDS = 16
+
+
+def counter_shard():
+    return random.randrange(COUNTER_SHARDS)
+
+
+class SqlServerDialect:
+    """SQL fragments for SQL Server (T-SQL)."""
+
+    name = 'mssql'
+    migrations_dir = MIGRATIONS_DIR
+
+    def top(self, count):
+        return f'TOP ({int(count)})'
+
+    def limit(self, count):
+        return ''
+
+    def now(self):
+        return 'SYSUTCDATETIME()'
+
+    def timestamp(self, expr):
+        return expr
+
+    def to_date(self, expr):
+        return f'CAST({expr} AS DATE)'
+
+    def month_start(self, expr):
+        return f'DATEFROMPARTS(YEAR({expr}), MONTH({expr}), 1)'
+
+    def table_hint(self, *hints):
+        return f" WITH ({', '.join(hints)})"
+
+    def rowversion(self, column):
+        return f'CAST({column} AS BIGINT)'
+
+    def rowversion_param(self):
+        return 'CONVERT(BINARY(8), CAST(? AS BIGINT))'
+
+    def committed_rowversion(self):
+        # Versions at or above MIN_ACTIVE_ROWVERSION may belong to transactions
+        # that have not committed yet
+        return 'CAST(MIN_ACTIVE_ROWVERSION() AS BIGINT) - 1'
+
+    def begin_write(self):
+        # The driver already runs every statement in a transaction
+        return ''
+
+    def savepoint(self, name):
+        return f'SAVE TRANSACTION {name}'
+
+    def rollback_to_savepoint(self, name):
+        return f'ROLLBACK TRANSACTION {name}'
+
+    def insert_returning(self, table, columns, key, values=None):
+        values = values or ['?'] * len(columns)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) OUTPUT INSERTED.{key} "
+                f"VALUES ({', '.join(values)})")
+
+    def upsert(self, table, keys, increments, sets=(), returning=None):
+        """Insert a row or add to an existing one, in one statement.
+
+        ``keys`` and ``increments`` are (column, SQL expression) pairs; parameters
+        bind keys first, then increments, in both dialects. ``sets`` are extra
+        (column, SQL expression) assignments made only when the row exists.
+        """
+        source = ', '.join(f'{expr} AS {column}' for column, expr in [*keys, *increments])
+        match = ' AND '.join(f't.{column} = s.{column}' for column, _ in keys)
+        updates = [f'{column} = t.{column} + s.{column}' for column, _ in increments]
+        updates += [f'{column} = {expr}' for column, expr in sets]
+        columns = [column for column, _ in [*keys, *increments]]
+        output = f' OUTPUT INSERTED.{returning}' if returning else ''
+        return f"""
+            MERGE {table} WITH (HOLDLOCK) AS t
+            USING (SELECT {source}) AS s
+            ON {match}
+            WHEN MATCHED THEN
+                UPDATE SET {', '.join(updates)}
+            WHEN NOT MATCHED THEN
+                INSERT ({', '.join(columns)})
+                VALUES ({', '.join(f's.{column}' for column in columns)}){output};
+        """
+
+
+class SqliteDialect:
+    """SQL fragments for SQLite 3.35+ (RETURNING, UPSERT, UPDATE ... FROM)."""
+
+    name = 'sqlite'
+    migrations_dir = os.path.join(MIGRATIONS_DIR, 'sqlite')
+
+    def top(self, count):
+        return ''
+
+    def limit(self, count):
+        return f'LIMIT {int(count)}'
+
+    def now(self):
+        return 'CURRENT_TIMESTAMP'
+
+    def timestamp(self, expr):
+        # Stored as 'YYYY-MM-DD HH:MM:SS' text so ranges compare and sort correctly
+        return f'datetime({expr})'
+
+    def to_date(self, expr):
+        return f'date({expr})'
+
+    def month_start(self, expr):
+        return f"date({expr}, 'start of month')"
+
+    def table_hint(self, *hints):
+        # One writer at a time: every write transaction already locks the database
+        return ''
+
+    def rowversion(self, column):
+        return column
+
+    def rowversion_param(self):
+        return '?'
+
+    def committed_rowversion(self):
+        # Triggers stamp rows from this counter; readers only see committed values
+        return '(SELECT Value FROM RowVersionCounter)'
+
+    def begin_write(self):
+        # Explicitly, before a savepoint would start a deferred transaction
+        # that can't wait for the write lock
+        return 'BEGIN IMMEDIATE'
+
+    def savepoint(self, name):
+        return f'SAVEPOINT {name}'
+
+    def rollback_to_savepoint(self, name):
+        return f'ROLLBACK TO {name}'
+
+    def insert_returning(self, table, columns, key, values=None):
+        values = values or ['?'] * len(columns)
+        return (f"INSERT INTO {table} ({', '.join(columns)}) "
+                f"VALUES ({', '.join(values)}) RETURNING {key}")
+
+    def upsert(self, table, keys, increments, sets=(), returning=None):
+        columns = [column for column, _ in [*keys, *increments]]
+        values = [expr for _, expr in [*keys, *increments]]
+        updates = [f'{column} = {table}.{column} + excluded.{column}' for column, _ in increments]
+        updates += [f'{column} = {expr}' for column, expr in sets]
+        returning = f' RETURNING {returning}' if returning else ''
+        return f"""
+            INSERT INTO {table} ({', '.join(columns)})
+            VALUES ({', '.join(values)})
+            ON CONFLICT ({', '.join(column for column, _ in keys)}) DO UPDATE
+            SET {', '.join(updates)}{returning}
+        """
+
+
+SQL_SERVER = SqlServerDialect()
+SQLITE = SqliteDialect()
+
+
+def dialect_of(cursor):
+    """The dialect of the connection ``cursor`` belongs to (SQL Server unless it is SQLite)."""
+    return SQLITE if isinstance(getattr(cursor, 'connection', None), sqlite3.Connection) else SQL_SERVER
+
+
+class SqlServerBackend:
+    dialect = SQL_SERVER
+
+    def __init__(self, conn_str):
+        self.conn_str = conn_str
+
+    def connect(self):
+        # Imported here so SQLite-only installs don't need an ODBC driver
+        import pyodbc
+        return pyodbc.connect(self.conn_str)
+
+
+# Dates and timestamps are stored as ISO text and parsed back by declared column type
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('TIMESTAMP', lambda value: datetime.fromisoformat(value.decode()))
+sqlite3.register_converter('DATE', lambda value: date.fromisoformat(value.decode()))
+
+
+class SqliteBackend:
+    """A local SQLite file in WAL mode: readers never block the (single) writer."""
+
+    dialect = SQLITE
+
+    def __init__(self, path=DEFAULT_SQLITE_PATH, busy_timeout=SQLITE_BUSY_TIMEOUT):
+        self.path = path
+        self.busy_timeout = busy_timeout
+
+    def connect(self):
+        # IMMEDIATE takes the write lock at a transaction's first write, so
+        # writers queue on busy_timeout instead of failing to upgrade a read
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, isolation_level='IMMEDIATE',
+                               detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+
+def create_backend(name, conn_str=None, sqlite_path=DEFAULT_SQLITE_PATH):
+    if name == 'mssql':
+        return SqlServerBackend(conn_str)
+    if name == 'sqlite':
+        return SqliteBackend(sqlite_path)
+    raise ValueError(f"DB_BACKEND must be one of: {', '.join(BACKENDS)}")
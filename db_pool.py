@@ -0,0 +1,241 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class _PooledConnection:
+    __slots__ = ('conn', 'created_at', 'last_used')
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.last_used = now
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pool of DB-API connections.
+
+    ``connect`` is any zero-argument callable returning a DB-API connection
+    (``pyodbc.connect`` with a bound connection string, ``sqlite3.connect``...),
+    so the pool can be exercised against a local stand-in database.
+    """
+
+    def __init__(self, connect, max_size=10, timeout=5.0, max_idle=300.0,
+                 max_lifetime=3600.0, health_check_after=30.0,
+                 health_check_sql='SELECT 1', recycle_interval=60.0):
+        self._connect = connect
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.health_check_after = health_check_after
+        self.health_check_sql = health_check_sql
+        self.recycle_interval = recycle_interval
+        self._last_recycle = time.monotonic()
+
+        self._idle = deque()
+        self._in_use = 0
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._closed = False
+
+        # Metrics
+        self._acquired = 0
+        self._created = 0
+        self._discarded = 0
+        self._timeouts = 0
+        self._waits = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._peak_in_use = 0
+
+    @property
+    def size(self):
+        return self._in_use + len(self._idle)
+
+    def acquire(self):
+        start = time.monotonic()
+        deadline = start + self.timeout
+        waited = False
+
+        with self._available:
+            while True:
+                if self._closed:
+                    raise RuntimeError('Connection pool is closed')
+                if self._idle:
+                    pooled = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.max_size:
+                    # Reserve the slot now and open the connection outside the lock
+                    pooled = None
+                    self._in_use += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f'Timed out after {self.timeout}s waiting for a database connection'
+                    )
+                waited = True
+                self._available.wait(remaining)
+
+            wait_time = time.monotonic() - start
+            self._acquired += 1
+            self._wait_total += wait_time
+            if waited:
+                self._waits += 1
+            if wait_time > self._wait_max:
+                self._wait_max = wait_time
+            if self._in_use > self._peak_in_use:
+                self._peak_in_use = self._in_use
+
+        try:
+            if pooled is not None and not self._is_usable(pooled):
+                self._close_quietly(pooled)
+                pooled = None
+            if pooled is None:
+                pooled = _PooledConnection(self._connect())
+                with self._lock:
+                    self._created += 1
+        except Exception:
+            self._release_slot()
+            raise
+        return pooled
+
+    def release(self, pooled, discard=False):
+        now = time.monotonic()
+        if not discard and now - pooled.created_at > self.max_lifetime:
+            discard = True
+
+        if not discard:
+            try:
+                # Never hand out a connection with an open transaction
+                pooled.conn.rollback()
+            except Exception:
+                discard = True
+
+        if discard:
+            self._close_quietly(pooled)
+            self._release_slot()
+            return
+
+        pooled.last_used = now
+        with self._available:
+            self._in_use -= 1
+            closed = self._closed
+            if not closed:
+                self._idle.append(pooled)
+            self._available.notify()
+            sweep = now - self._last_recycle > self.recycle_interval
+            if sweep:
+                self._last_recycle = now
+        if closed:
+            self._close_quietly(pooled)
+        elif sweep:
+            self.recycle_idle()
+
+    @contextmanager
+    def connection(self):
+        pooled = self.acquire()
+        broken = False
+        try:
+            yield pooled.conn
+        except BaseException:
+            broken = not self._ping(pooled.conn)
+            raise
+        finally:
+            self.release(pooled, discard=broken)
+
+    def recycle_idle(self):
+        """Close idle connections that have outlived ``max_idle``."""
+        now = time.monotonic()
+        expired = []
+        with self._lock:
+            keep = deque()
+            for pooled in self._idle:
+                if now - pooled.last_used > self.max_idle:
+                    expired.append(pooled)
+                else:
+                    keep.append(pooled)
+            self._idle = keep
+        for pooled in expired:
+            self._close_quietly(pooled)
+        return len(expired)
+
+    def close(self):
+        with self._available:
+            self._closed = True
+            idle, self._idle = list(self._idle), deque()
+            self._available.notify_all()
+        for pooled in idle:
+            self._close_quietly(pooled)
+
+    def reset(self):
+        """Drop every idle connection and reopen the pool (e.g. after fork)."""
+        with self._available:
+            idle, self._idle = list(self._idle), deque()
+            self._in_use = 0
+            self._closed = False
+        for pooled in idle:
+            self._close_quietly(pooled)
+
+    def stats(self):
+        with self._lock:
+            in_use = self._in_use
+            idle = len(self._idle)
+            return {
+                'maxSize': self.max_size,
+                'size': in_use + idle,
+                'inUse': in_use,
+                'idle': idle,
+                'saturation': in_use / self.max_size if self.max_size else 0.0,
+                'peakInUse': self._peak_in_use,
+                'acquired': self._acquired,
+                'created': self._created,
+                'discarded': self._discarded,
+                'timeouts': self._timeouts,
+                'waits': self._waits,
+                'waitTimeTotal': self._wait_total,
+                'waitTimeAvg': self._wait_total / self._acquired if self._acquired else 0.0,
+                'waitTimeMax': self._wait_max,
+            }
+
+    def _is_usable(self, pooled):
+        now = time.monotonic()
+        if now - pooled.created_at > self.max_lifetime:
+            return False
+        if now - pooled.last_used > self.max_idle:
+            return False
+        if now - pooled.last_used > self.health_check_after:
+            return self._ping(pooled.conn)
+        return True
+
+    def _ping(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute(self.health_check_sql)
+            cursor.fetchall()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _release_slot(self):
+        with self._available:
+            self._in_use -= 1
+            self._available.notify()
+
+    def _close_quietly(self, pooled):
+        with self._lock:
+            self._discarded += 1
+        try:
+            pooled.conn.close()
+        except Exception:
+            pass
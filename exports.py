@@ -0,0 +1,142 @@
+import csv
+import io
+import zlib
+
+from transaction_queries import build_transaction_filters, where_sql
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional; CSV needs only the stdlib
+    pa = pq = None
+
+CSV_BATCH_SIZE = 1000
+# Parquet rows per row group: one group is buffered before it can be written
+PARQUET_ROW_GROUP_SIZE = 10000
+
+EXPORT_COLUMNS = [
+    'TransactionID', 'TransactionDate', 'Username', 'TotalAmount', 'Discount', 'NetAmount',
+    'ItemName', 'Quantity', 'Price', 'Amount',
+]
+
+EXPORT_FORMATS = {
+    # format: (mimetype, file extension)
+    'csv': ('application/gzip', 'csv.gz'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def parquet_available():
+    return pq is not None
+
+
+def export_query(filters):
+    """One row per transaction line (transactions without lines get one empty line)."""
+    clauses, params = build_transaction_filters(**filters)
+    query = f"""
+        SELECT tm.TransactionID, tm.TransactionDate, tm.Username,
+               tm.TotalAmount, tm.Discount, tm.NetAmount,
+               td.ItemName, td.Quantity, td.Price, td.Amount
+        FROM TransactionMaster tm
+        LEFT JOIN TransactionDetails td ON td.TransactionID = tm.TransactionID
+        {where_sql(clauses)}
+        ORDER BY tm.TransactionDate DESC, tm.TransactionID DESC
+    """
+    return query, params
+
+
+def csv_gzip_chunks(rows, batch_size=CSV_BATCH_SIZE):
+    """Encode rows as gzip-compressed CSV, one compressed chunk per batch of rows."""
+    # wbits=31 writes a gzip header/trailer, so the output is a valid .csv.gz file
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_size:
+            chunk = compressor.compress(buffer.getvalue().encode('utf-8'))
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+            if chunk:
+                yield chunk
+    yield compressor.compress(buffer.getvalue().encode('utf-8')) + compressor.flush()
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands out whatever was written since the last drain."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def _parquet_schema():
+    return pa.schema([
+        ('TransactionID', pa.int64()),
+        ('TransactionDate', pa.timestamp('ms')),
+        ('Username', pa.string()),
+        ('TotalAmount', pa.float64()),
+        ('Discount', pa.float64()),
+        ('NetAmount', pa.float64()),
+        ('ItemName', pa.string()),
+        ('Quantity', pa.int64()),
+        ('Price', pa.float64()),
+        ('Amount', pa.float64()),
+    ])
+
+
+def _optional_float(value):
+    return float(value) if value is not None else None
+
+
+def _parquet_batch(rows, schema):
+    columns = list(zip(*rows))
+    converters = [None, None, None, _optional_float, _optional_float, _optional_float,
+                  None, None, _optional_float, _optional_float]
+    arrays = []
+    for values, convert, field in zip(columns, converters, schema):
+        if convert:
+            values = [convert(v) for v in values]
+        arrays.append(pa.array(values, type=field.type))
+    return pa.Table.from_arrays(arrays, schema=schema)
+
+
+def parquet_chunks(rows, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    """Encode rows as a Parquet file, yielding each row group as soon as it is written."""
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression='snappy')
+    batch = []
+    for row in rows:
+        batch.append(tuple(row))
+        if len(batch) >= row_group_size:
+            writer.write_table(_parquet_batch(batch, schema))
+            batch = []
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    if batch:
+        writer.write_table(_parquet_batch(batch, schema))
+    # The footer (schema and row group offsets) is written on close
+    writer.close()
+    yield sink.drain()
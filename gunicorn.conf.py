@@ -0,0 +1,50 @@
+# Production serving: gunicorn -c gunicorn.conf.py app:app
+#
+# Each worker is a separate process with its own connection pool, caches,
+# item feed and report process pool; the threads inside a worker share them.
+# Handlers block on the database, so a worker runs several requests at once
+# on threads (the GIL is released while pyodbc/sqlite3 wait), and more worker
+# processes let CPU-bound work such as invoice PDFs use more cores.
+import multiprocessing
+import os
+
+bind = os.environ.get('WEB_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_WORKERS', str(multiprocessing.cpu_count())))
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', '16'))
+# Every open /api/items/changes/stream connection holds one of these threads
+# for up to ITEM_STREAM_MAX_SECONDS. Streams get at most a quarter of them,
+# so each worker serves `threads` requests at once, of which at most
+# ITEM_STREAM_LIMIT are streams, and dashboards beyond that poll instead.
+# (An async worker would free the threads, but pyodbc calls block its loop.)
+os.environ.setdefault('ITEM_STREAM_LIMIT', str(max(1, threads // 4)))
+# Every other thread may need a database connection
+os.environ.setdefault('DB_POOL_SIZE', str(threads))
+# Report PDFs and CSV/Parquet exports can stream for a while
+timeout = int(os.environ.get('WEB_TIMEOUT', '120'))
+graceful_timeout = 30
+keepalive = 5
+
+# Import the app once in the master so workers fork with it already loaded
+# (and share one secret key when SECRET_KEY isn't set)
+preload_app = True
+
+# In-memory sessions are only visible to the worker that created them
+if workers > 1:
+    os.environ.setdefault('SESSION_STORE', 'sqlite')
+
+# Recycle workers now and then to bound memory growth
+max_requests = int(os.environ.get('WEB_MAX_REQUESTS', '10000'))
+max_requests_jitter = max_requests // 10
+
+accesslog = None  # app.py already logs one JSON line per request
+errorlog = '-'
+
+
+def post_fork(server, worker):
+    # Connections must not be shared across processes; anything the master
+    # opened while loading the app is dropped and each worker opens its own
+    from app import db_pool, tenant_pools
+    db_pool.reset()
+    for pool in tenant_pools.values():
+        pool.reset()
@@ -0,0 +1,328 @@
+import json
+import re
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import g, request, session
+
+# Statements slower than this are logged with their SQL
+SLOW_QUERY_SECONDS = 0.5
+
+DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+ROW_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+
+_SQL_OPERATION = re.compile(r'\s*(\w+)')
+_WHITESPACE = re.compile(r'\s+')
+
+_local = threading.local()
+
+
+class Metrics:
+    """In-process counters and histograms, rendered in the Prometheus text format.
+
+    Each web worker process keeps its own registry; scrape every worker (or
+    sum them in the scraper) for totals.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._help = {}
+        self._buckets = {}
+        self._counters = {}     # (name, labels) -> value
+        self._histograms = {}   # (name, labels) -> [bucket counts..., sum, count]
+
+    def counter(self, name, help_text):
+        self._help[name] = ('counter', help_text)
+
+    def histogram(self, name, help_text, buckets=DURATION_BUCKETS):
+        self._help[name] = ('histogram', help_text)
+        self._buckets[name] = buckets
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        buckets = self._buckets[name]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [0] * (len(buckets) + 2)
+            index = bisect_left(buckets, value)
+            if index < len(buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self, gauges=None):
+        """Prometheus text exposition; ``gauges`` adds {name: (help, value)} read at scrape time.
+
+        A gauge's value may also be a list of (labels, value) samples, labels
+        being ((key, value), ...) pairs.
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = {key: list(series) for key, series in self._histograms.items()}
+
+        lines = []
+        for name, (kind, help_text) in sorted(self._help.items()):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+            if kind == 'counter':
+                for (series_name, labels), value in sorted(counters.items()):
+                    if series_name == name:
+                        lines.append(f'{name}{_labels(labels)} {_number(value)}')
+                continue
+            for (series_name, labels), series in sorted(histograms.items()):
+                if series_name != name:
+                    continue
+                cumulative = 0
+                for bound, count in zip(self._buckets[name], series):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{_labels(labels + (("le", _number(bound)),))} {cumulative}')
+                lines.append(f'{name}_bucket{_labels(labels + (("le", "+Inf"),))} {series[-1]}')
+                lines.append(f'{name}_sum{_labels(labels)} {_number(series[-2])}')
+                lines.append(f'{name}_count{_labels(labels)} {series[-1]}')
+        for name, (help_text, value) in sorted((gauges or {}).items()):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} gauge')
+            for labels, sample in (value if isinstance(value, list) else [((), value)]):
+                lines.append(f'{name}{_labels(labels)} {_number(sample)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels) + '}'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def define_metrics(metrics):
+    metrics.counter('http_requests_total', 'Requests handled, by route, method and status.')
+    metrics.histogram('http_request_duration_seconds', 'Time from request start to the last byte sent.')
+    metrics.histogram('http_response_size_bytes', 'Response body size (when known up front).', SIZE_BUCKETS)
+    metrics.histogram('db_connection_acquire_seconds', 'Time waiting for a pooled database connection.')
+    metrics.histogram('db_query_duration_seconds', 'cursor.execute/executemany time, by route and statement type.')
+    metrics.histogram('db_request_rows', 'Rows fetched per request.', ROW_BUCKETS)
+    metrics.counter('db_rows_fetched_total', 'Rows fetched from the database.')
+    metrics.counter('db_slow_queries_total', 'Statements slower than the slow-query threshold.')
+    metrics.histogram('pdf_build_seconds', 'ReportLab doc.build time, by document kind.')
+    metrics.histogram('pdf_size_bytes', 'Rendered PDF size, by document kind.', SIZE_BUCKETS)
+    metrics.histogram('report_job_seconds', 'Report job time by phase (query, render).')
+    return metrics
+
+
+class RequestStats:
+    """Database work done on behalf of one request (or one background job)."""
+
+    __slots__ = ('route', 'started', 'db_time', 'queries', 'rows', 'acquire_time', 'slow_queries')
+
+    def __init__(self, route):
+        self.route = route
+        self.started = time.perf_counter()
+        self.db_time = 0.0
+        self.queries = 0
+        self.rows = 0
+        self.acquire_time = 0.0
+        self.slow_queries = 0
+
+
+def current_stats():
+    return getattr(_local, 'stats', None)
+
+
+@contextmanager
+def track(route):
+    """Collect the database work of the enclosed block into a fresh RequestStats."""
+    previous = current_stats()
+    _local.stats = stats = RequestStats(route)
+    try:
+        yield stats
+    finally:
+        _local.stats = previous
+
+
+def log_event(event, **fields):
+    print(json.dumps({'event': event, **fields}, default=str, separators=(',', ':')))
+
+
+class InstrumentedConnection:
+    """DB-API connection wrapper whose cursors time every statement and count rows."""
+
+    def __init__(self, conn, metrics=None, slow_query_seconds=SLOW_QUERY_SECONDS):
+        self._conn = conn
+        self._metrics = metrics
+        self._slow_query_seconds = slow_query_seconds
+
+    def cursor(self):
+        return InstrumentedCursor(self._conn.cursor(), self._metrics, self._slow_query_seconds)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class InstrumentedCursor:
+    # Work is charged to the request that opened the cursor, so rows streamed
+    # after the view returned still count towards it
+
+    def __init__(self, cursor, metrics, slow_query_seconds):
+        object.__setattr__(self, '_cursor', cursor)
+        object.__setattr__(self, '_metrics', metrics)
+        object.__setattr__(self, '_slow_query_seconds', slow_query_seconds)
+        object.__setattr__(self, '_stats', current_stats())
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __setattr__(self, name, value):
+        # e.g. fast_executemany goes to the driver cursor
+        setattr(self._cursor, name, value)
+
+    def __iter__(self):
+        for row in self._cursor:
+            self._add_rows(1, 0.0)
+            yield row
+
+    def _route(self):
+        return self._stats.route if self._stats else 'background'
+
+    def _timed_statement(self, method, sql, args):
+        start = time.perf_counter()
+        try:
+            method(sql, *args)
+        finally:
+            elapsed = time.perf_counter() - start
+            stats = self._stats
+            if stats:
+                stats.db_time += elapsed
+                stats.queries += 1
+            operation = _SQL_OPERATION.match(sql)
+            operation = operation.group(1).upper() if operation else 'OTHER'
+            if self._metrics:
+                self._metrics.observe('db_query_duration_seconds', elapsed,
+                                      route=self._route(), operation=operation)
+            if elapsed >= self._slow_query_seconds:
+                if stats:
+                    stats.slow_queries += 1
+                if self._metrics:
+                    self._metrics.inc('db_slow_queries_total', route=self._route())
+                log_event('slow_query', route=self._route(), operation=operation,
+                          durationMs=round(elapsed * 1000, 1), sql=_WHITESPACE.sub(' ', sql).strip()[:500])
+        return self
+
+    def execute(self, sql, *args):
+        return self._timed_statement(self._cursor.execute, sql, args)
+
+    def executemany(self, sql, *args):
+        return self._timed_statement(self._cursor.executemany, sql, args)
+
+    def _add_rows(self, count, elapsed):
+        stats = self._stats
+        if stats:
+            stats.rows += count
+            stats.db_time += elapsed
+        if self._metrics and count:
+            self._metrics.inc('db_rows_fetched_total', count, route=self._route())
+
+    def _timed_fetch(self, method, *args):
+        start = time.perf_counter()
+        result = method(*args)
+        return result, time.perf_counter() - start
+
+    def fetchone(self):
+        row, elapsed = self._timed_fetch(self._cursor.fetchone)
+        self._add_rows(1 if row is not None else 0, elapsed)
+        return row
+
+    def fetchmany(self, *args):
+        rows, elapsed = self._timed_fetch(self._cursor.fetchmany, *args)
+        self._add_rows(len(rows), elapsed)
+        return rows
+
+    def fetchall(self):
+        rows, elapsed = self._timed_fetch(self._cursor.fetchall)
+        self._add_rows(len(rows), elapsed)
+        return rows
+
+
+@contextmanager
+def timed_acquire(metrics, connection):
+    """Enter ``connection`` (a pool checkout) and charge the wait to the current request."""
+    start = time.perf_counter()
+    with connection as conn:
+        elapsed = time.perf_counter() - start
+        stats = current_stats()
+        if stats:
+            stats.acquire_time += elapsed
+        metrics.observe('db_connection_acquire_seconds', elapsed,
+                        route=stats.route if stats else 'background')
+        yield conn
+
+
+def instrument_app(app, metrics, log_requests=True):
+    """Time every request, record its database work, and log one JSON line per request.
+
+    Streamed responses are recorded when the last chunk has been sent.
+    """
+
+    @app.before_request
+    def start_request_stats():
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        g.request_stats = RequestStats(route)
+        _local.stats = g.request_stats
+
+    @app.after_request
+    def record_request_stats(response):
+        stats = g.pop('request_stats', None)
+        if stats is None or request.endpoint == 'static':
+            return response
+        method = request.method
+        user = session.get('user', {}).get('username') if 'user' in session else None
+
+        def finish():
+            elapsed = time.perf_counter() - stats.started
+            size = response.content_length
+            metrics.inc('http_requests_total', route=stats.route, method=method,
+                        status=str(response.status_code))
+            metrics.observe('http_request_duration_seconds', elapsed, route=stats.route, method=method)
+            metrics.observe('db_request_rows', stats.rows, route=stats.route)
+            if size is not None:
+                metrics.observe('http_response_size_bytes', size, route=stats.route)
+            if log_requests:
+                log_event(
+                    'request', route=stats.route, method=method, status=response.status_code,
+                    durationMs=round(elapsed * 1000, 1), dbMs=round(stats.db_time * 1000, 1),
+                    acquireMs=round(stats.acquire_time * 1000, 1), queries=stats.queries,
+                    rows=stats.rows, slowQueries=stats.slow_queries, bytes=size, user=user,
+                )
+
+        if response.is_streamed:
+            response.call_on_close(finish)
+        else:
+            finish()
+        return response
+
+    @app.teardown_request
+    def clear_request_stats(exc):
+        _local.stats = None
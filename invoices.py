@@ -0,0 +1,243 @@
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+# Bump when the invoice layout changes so cached PDFs are not reused
+INVOICE_TEMPLATE_VERSION = 2
+
+# Styles are immutable once built, so build them once per process
+styles = getSampleStyleSheet()
+
+title_style = ParagraphStyle(
+    'InvoiceTitle',
+    parent=styles['Heading1'],
+    fontSize=24,
+    spaceAfter=30,
+    alignment=1,  # Center alignment
+    textColor=colors.darkblue
+)
+
+header_style = ParagraphStyle(
+    'HeaderStyle',
+    parent=styles['Normal'],
+    fontSize=12,
+    spaceAfter=10,
+    textColor=colors.darkblue
+)
+
+invoice_title_style = ParagraphStyle(
+    'InvoiceNumber',
+    parent=styles['Heading2'],
+    fontSize=18,
+    spaceAfter=20,
+    alignment=1
+)
+
+details_table_style = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+])
+
+items_table_style = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 12),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTSIZE', (0, 1), (-1, -1), 10),
+    ('ALIGN', (1, 1), (-1, -1), 'CENTER'),  # Align numbers to center
+    ('ALIGN', (0, 1), (0, -1), 'LEFT'),     # Align item names to left
+])
+
+totals_table_style = TableStyle([
+    ('ALIGN', (0, 0), (-1, -1), 'RIGHT'),
+    ('FONTNAME', (0, 0), (-1, 1), 'Helvetica'),
+    ('FONTNAME', (0, 2), (-1, 2), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 1), 12),
+    ('FONTSIZE', (0, 2), (-1, 2), 14),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 2), (-1, 2), 12),
+    ('LINEABOVE', (0, 2), (-1, 2), 2, colors.black),
+    ('BACKGROUND', (0, 2), (-1, 2), colors.lightblue),
+])
+
+
+def _money(value):
+    return f'${float(value):.2f}' if value else '$0.00'
+
+
+def render_invoice(transaction, transaction_items, tenant_name):
+    """Render an invoice PDF and return its bytes.
+
+    ``transaction`` is (TransactionID, TransactionDate, Username, TotalAmount,
+    Discount, NetAmount); ``transaction_items`` are (ItemName, Quantity, Price, Amount).
+    """
+    buffer = io.BytesIO()
+    # invariant: no creation timestamp or random document id, so the same
+    # transaction always renders to the same bytes
+    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=1*inch, invariant=1)
+    story = []
+
+    # Company Header
+    story.append(Paragraph("RBAC POS SYSTEM", title_style))
+    story.append(Paragraph(f"<b>Tenant:</b> {tenant_name}", header_style))
+    story.append(Spacer(1, 20))
+
+    # Invoice Title and Number
+    story.append(Paragraph(f"INVOICE #{transaction[0]:06d}", invoice_title_style))
+    story.append(Spacer(1, 20))
+
+    # Invoice Details Table
+    invoice_details = [
+        ['Invoice Date:', transaction[1].strftime('%Y-%m-%d %H:%M:%S') if transaction[1] else ''],
+        ['Served By:', transaction[2] or ''],
+        ['Transaction ID:', str(transaction[0])]
+    ]
+    details_table = Table(invoice_details, colWidths=[2*inch, 3*inch])
+    details_table.setStyle(details_table_style)
+    story.append(details_table)
+    story.append(Spacer(1, 30))
+
+    # Items Table
+    story.append(Paragraph("ITEMS PURCHASED", styles['Heading3']))
+    story.append(Spacer(1, 10))
+
+    items_data = [['Item Name', 'Quantity', 'Unit Price', 'Amount']]
+    for item in transaction_items:
+        items_data.append([
+            item[0] or '',  # ItemName
+            str(item[1]) if item[1] else '0',  # Quantity
+            _money(item[2]),  # Price
+            _money(item[3])   # Amount
+        ])
+    items_table = Table(items_data, colWidths=[3*inch, 1*inch, 1.5*inch, 1.5*inch])
+    items_table.setStyle(items_table_style)
+    story.append(items_table)
+    story.append(Spacer(1, 30))
+
+    # Totals Table
+    totals_data = [
+        ['Subtotal:', _money(transaction[3])],
+        ['Discount:', _money(transaction[4])],
+        ['TOTAL AMOUNT:', _money(transaction[5])]
+    ]
+    totals_table = Table(totals_data, colWidths=[4*inch, 2*inch])
+    totals_table.setStyle(totals_table_style)
+    story.append(totals_table)
+    story.append(Spacer(1, 40))
+
+    # Footer
+    footer_text = """
+    <para align="center">
+    <b>Thank you for your business!</b><br/>
+    System: RBAC POS
+    </para>
+    """
+    story.append(Paragraph(footer_text, styles['Normal']))
+
+    doc.build(story)
+    return buffer.getvalue()
+
+
+def invoice_cache_key(transaction_id, row_version, tenant_name):
+    """Content address of an invoice: everything that changes the rendered PDF."""
+    source = f"{INVOICE_TEMPLATE_VERSION}:{transaction_id}:{row_version}:{tenant_name}"
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()
+
+
+class InvoiceCache:
+    """Size-bounded LRU of rendered invoices, held in memory or in ``directory``."""
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, directory=None):
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._entries = OrderedDict()  # key -> bytes (memory) or size (disk)
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            # Re-adopt PDFs left by a previous run, oldest first
+            files = []
+            for name in os.listdir(directory):
+                if name.endswith('.pdf'):
+                    path = os.path.join(directory, name)
+                    files.append((os.path.getmtime(path), name[:-4], os.path.getsize(path)))
+            for _, key, size in sorted(files):
+                self._entries[key] = size
+                self._size += size
+            self._evict()
+
+    def _path(self, key):
+        return os.path.join(self.directory, f'{key}.pdf')
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        if not self.directory:
+            return entry
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            with self._lock:
+                if self._entries.pop(key, None) is not None:
+                    self._size -= entry
+            return None
+
+    def put(self, key, data):
+        size = len(data)
+        if size > self.max_bytes:
+            return
+        if self.directory:
+            tmp_path = f'{self._path(key)}.{threading.get_ident()}.tmp'
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, self._path(key))
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= previous if self.directory else len(previous)
+            self._entries[key] = size if self.directory else data
+            self._size += size
+            self._evict()
+
+    def _evict(self):
+        while self._size > self.max_bytes and self._entries:
+            key, entry = self._entries.popitem(last=False)
+            self._size -= entry if self.directory else len(entry)
+            if self.directory:
+                try:
+                    os.remove(self._path(key))
+                except OSError:
+                    pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'maxBytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+from bisect import bisect_right
+
+from db_backend import dialect_of
+
+DEFAULT_CHANGES_LIMIT = 1000
+MAX_CHANGES_LIMIT = 5000
+# How often the shared watcher polls Items for changes
+ITEM_FEED_INTERVAL = 2.0
+# Recent changes kept in memory to answer pollers without a query
+ITEM_FEED_HISTORY = 5000
+# The watcher stops (and forgets its history) after this long without clients
+ITEM_FEED_IDLE_TIMEOUT = 60.0
+# Open SSE streams per process; each one holds a request thread while open
+ITEM_STREAM_LIMIT = 4
+# A stream ends after this long and EventSource reconnects with Last-Event-ID
+ITEM_STREAM_MAX_SECONDS = 300
+# How long EventSource waits before reconnecting
+ITEM_STREAM_RETRY_MS = 3000
+
+
+def parse_since(value):
+    try:
+        since = int(value) if value not in (None, '') else 0
+    except (TypeError, ValueError):
+        raise ValueError('since must be an integer version')
+    return max(since, 0)
+
+
+def parse_changes_limit(value):
+    try:
+        limit = int(value) if value not in (None, '') else DEFAULT_CHANGES_LIMIT
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    return max(1, min(limit, MAX_CHANGES_LIMIT))
+
+
+def record_item_deletion(cursor, tenant_id, item_id):
+    """Leave a tombstone so change-feed clients learn about the delete (caller commits)."""
+    cursor.execute("INSERT INTO ItemTombstones (ItemID, TenantID) VALUES (?, ?)", (item_id, tenant_id))
+
+
+def current_item_version(cursor):
+    # Only versions every reader can already see: a client moved past an
+    # uncommitted version could miss that row
+    cursor.execute(f"SELECT {dialect_of(cursor).committed_rowversion()}")
+    return int(cursor.fetchone()[0])
+
+
+def fetch_item_changes(cursor, tenant_id, since, limit=DEFAULT_CHANGES_LIMIT):
+    """The tenant's items changed and deleted after version ``since``, oldest first.
+
+    Returns {'version', 'items', 'deleted', 'hasMore'}; pass 'version' back as
+    ``since`` to continue. ``since`` 0 is a full snapshot (no tombstones).
+    """
+    upto = current_item_version(cursor)
+    dialect = dialect_of(cursor)
+    version = dialect.rowversion('RowVersion')
+    after, upto_param = dialect.rowversion_param(), dialect.rowversion_param()
+    cursor.execute(f"""
+        SELECT {dialect.top(limit + 1)} c.ItemID, c.ItemName, c.Category, c.Quantity, c.Price, c.Version
+        FROM (
+            SELECT ItemID, ItemName, Category, Quantity, Price, {version} AS Version
+            FROM Items
+            WHERE TenantID = ? AND RowVersion > {after} AND RowVersion <= {upto_param}
+            UNION ALL
+            SELECT ItemID, NULL, NULL, NULL, NULL, {version}
+            FROM ItemTombstones
+            WHERE ? > 0
+              AND TenantID = ? AND RowVersion > {after} AND RowVersion <= {upto_param}
+        ) AS c
+        ORDER BY c.Version
+        {dialect.limit(limit + 1)}
+    """, (tenant_id, since, upto, since, tenant_id, since, upto))
+    rows = cursor.fetchall()
+
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    changes = [(int(row[5]), _change(row)) for row in rows]
+    version = changes[-1][0] if has_more else max(upto, since)
+    return changes_to_dict(version, changes, has_more)
+
+
+def _change(row):
+    if row[1] is None:
+        return {'ItemID': row[0], 'Deleted': True}
+    return {
+        'ItemID': row[0],
+        'ItemName': row[1],
+        'Category': row[2],
+        'Quantity': row[3],
+        'Price': float(row[4]),
+    }
+
+
+def changes_to_dict(version, changes, has_more=False):
+    # Later changes to the same item win; a delete is final
+    latest = {}
+    for _, change in changes:
+        latest[change['ItemID']] = change
+    return {
+        'version': version,
+        'items': [change for change in latest.values() if not change.get('Deleted')],
+        'deleted': [item_id for item_id, change in latest.items() if change.get('Deleted')],
+        'hasMore': has_more,
+    }
+
+
+class ItemChangeFeed:
+    """One watcher thread per process (and tenant) that polls the Items change feed.
+
+    Pollers and SSE clients are answered from the watcher's recent history
+    (and woken when it moves), so N connected terminals cost one change query
+    per interval instead of N. Requests that reach further back than the
+    history return None from changes_since() and should query the database.
+    """
+
+    def __init__(self, current_version, fetch_changes, interval=ITEM_FEED_INTERVAL,
+                 history=ITEM_FEED_HISTORY, idle_timeout=ITEM_FEED_IDLE_TIMEOUT):
+        self._current_version = current_version
+        self._fetch_changes = fetch_changes
+        self.interval = interval
+        self.history = history
+        self.idle_timeout = idle_timeout
+        self._cond = threading.Condition()
+        self._thread = None
+        self._thread_pid = None
+        self._poked = False
+        self._last_used = 0.0
+        self.polls = 0
+        self._reset()
+
+    def _reset(self):
+        self._version = None   # newest version the watcher has seen
+        self._start = None     # history covers versions in (_start, _version]
+        self._versions = []
+        self._changes = []
+
+    def poke(self):
+        """Poll now instead of at the next interval (call after committing an item write)."""
+        with self._cond:
+            self._poked = True
+            self._cond.notify_all()
+
+    def changes_since(self, since, limit=DEFAULT_CHANGES_LIMIT):
+        with self._cond:
+            self._ensure_running()
+            if self._version is None or since < self._start:
+                return None
+            if since >= self._version:
+                # Clients can be slightly ahead after reading the database
+                # directly; nothing newer is known yet
+                return changes_to_dict(since, [])
+            position = bisect_right(self._versions, since)
+            if len(self._versions) - position > limit:
+                return None
+            return changes_to_dict(self._version, self._changes[position:])
+
+    def wait(self, since, timeout):
+        """Block until the watcher has seen a version above ``since``; returns its version."""
+        with self._cond:
+            self._ensure_running()
+            self._cond.wait_for(lambda: self._version is not None and self._version > since, timeout)
+            self._last_used = time.monotonic()
+            return self._version
+
+    def stats(self):
+        with self._cond:
+            return {
+                'version': self._version,
+                'historySize': len(self._changes),
+                'polls': self.polls,
+                'running': self._thread is not None and self._thread_pid == os.getpid(),
+            }
+
+    def _ensure_running(self):
+        # Called with the condition held; restarts after idling out or a fork
+        self._last_used = time.monotonic()
+        if self._thread is None or self._thread_pid != os.getpid():
+            self._reset()
+            self._thread = threading.Thread(target=self._run, name='item-change-feed', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                if time.monotonic() - self._last_used > self.idle_timeout:
+                    self._thread = None
+                    self._reset()
+                    return
+                if self._version is not None:
+                    self._cond.wait_for(lambda: self._poked, self.interval)
+                self._poked = False
+                since = self._version
+            try:
+                if since is None:
+                    version = self._current_version()
+                    with self._cond:
+                        self._version = self._start = version
+                        self._cond.notify_all()
+                    continue
+                self._poll(since)
+            except Exception as e:
+                print(f"Error polling item changes: {e}")
+                time.sleep(self.interval)
+
+    def _poll(self, since):
+        while True:
+            page = self._fetch_changes(since, DEFAULT_CHANGES_LIMIT)
+            entries = [(page['version'], change) for change in page['items']]
+            entries += [(page['version'], {'ItemID': item_id, 'Deleted': True}) for item_id in page['deleted']]
+            with self._cond:
+                self.polls += 1
+                if page['version'] > self._version:
+                    self._versions.extend(version for version, _ in entries)
+                    self._changes.extend(entries)
+                    overflow = len(self._changes) - self.history
+                    if overflow > 0:
+                        self._start = self._versions[overflow - 1]
+                        del self._versions[:overflow]
+                        del self._changes[:overflow]
+                    self._version = page['version']
+                    self._cond.notify_all()
+            if not page['hasMore']:
+                return
+            since = page['version']
@@ -0,0 +1,260 @@
+import csv
+import io
+import json
+import random
+import time
+from decimal import Decimal, InvalidOperation
+
+from checkout import DEADLOCK_RETRIES, is_deadlock
+from db_backend import dialect_of
+
+IMPORT_FORMATS = ('csv', 'jsonl')
+# Rows validated and written per transaction
+ITEM_IMPORT_CHUNK = 2000
+# SQL Server allows 2100 parameters per statement; four per VALUES row
+ITEM_UPSERT_ROWS = 400
+# Per-row errors listed in the response; the rest are only counted
+MAX_REPORTED_ERRORS = 1000
+ITEM_NAME_MAX_LENGTH = 200
+CATEGORY_MAX_LENGTH = 100
+MAX_QUANTITY = 2 ** 31 - 1
+MAX_PRICE = Decimal('99999999.99')   # DECIMAL(10, 2)
+CENTS = Decimal('0.01')
+
+
+def import_format(requested, content_type):
+    """The upload format: ``format`` if given, else guessed from the Content-Type."""
+    if requested:
+        if requested not in IMPORT_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(IMPORT_FORMATS)}")
+        return requested
+    return 'csv' if 'csv' in (content_type or '') else 'jsonl'
+
+
+class UploadStream(io.RawIOBase):
+    """A WSGI input stream (gunicorn's isn't an io object) as something TextIOWrapper can read."""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._stream.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+
+def _text(stream, newline=None):
+    return io.TextIOWrapper(io.BufferedReader(UploadStream(stream)), encoding='utf-8-sig', newline=newline)
+
+
+def iter_csv_records(stream):
+    """(line number, {column: value}) for each row of a CSV upload with a header row."""
+    reader = csv.DictReader(_text(stream, newline=''))
+    for record in reader:
+        yield reader.line_num, record
+
+
+def iter_jsonl_records(stream):
+    """(line number, object) for each non-blank line of a JSON-lines upload (None if not JSON)."""
+    for line_number, line in enumerate(_text(stream), start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError:
+            yield line_number, None
+
+
+def validate_item(record):
+    """(ItemName, Category, Quantity, Price) from an uploaded row, or ValueError.
+
+    Category and quantity may be left out: existing items keep theirs, new ones
+    get no category and no stock. Columns are matched case-insensitively.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Row is not a JSON object")
+    fields = {str(key).strip().lower(): value for key, value in record.items() if key is not None}
+
+    name = fields.get('itemname')
+    name = name.strip() if isinstance(name, str) else ''
+    if not name:
+        raise ValueError("itemName is required")
+    if len(name) > ITEM_NAME_MAX_LENGTH:
+        raise ValueError(f"itemName is longer than {ITEM_NAME_MAX_LENGTH} characters")
+
+    category = fields.get('category')
+    if category is not None and not isinstance(category, str):
+        raise ValueError("category must be text")
+    category = (category or '').strip() or None
+    if category and len(category) > CATEGORY_MAX_LENGTH:
+        raise ValueError(f"category is longer than {CATEGORY_MAX_LENGTH} characters")
+
+    quantity = fields.get('quantity')
+    if quantity is not None and quantity != '':
+        if isinstance(quantity, bool) or isinstance(quantity, float):
+            raise ValueError("quantity must be a whole number")
+        try:
+            quantity = int(str(quantity).strip())
+        except ValueError:
+            raise ValueError("quantity must be a whole number")
+        if not 0 <= quantity <= MAX_QUANTITY:
+            raise ValueError("quantity is out of range")
+    else:
+        quantity = None
+
+    price = fields.get('price')
+    if price is None or price == '' or isinstance(price, bool):
+        raise ValueError("price is required")
+    try:
+        price = Decimal(str(price).strip()).quantize(CENTS)
+    except (InvalidOperation, ValueError):
+        raise ValueError("price must be a number")
+    if not 0 <= price <= MAX_PRICE:
+        raise ValueError("price is out of range")
+
+    return name, category, quantity, float(price)
+
+
+_ITEM_MERGE = """
+    MERGE Items WITH (HOLDLOCK) AS t
+    USING (VALUES {values}) AS s (ItemName, Category, Quantity, Price)
+    ON t.TenantID = ? AND t.ItemName = s.ItemName
+    WHEN MATCHED AND (t.Price <> s.Price
+                      OR (s.Quantity IS NOT NULL AND t.Quantity <> s.Quantity)
+                      OR (s.Category IS NOT NULL AND (t.Category IS NULL OR t.Category <> s.Category))) THEN
+        UPDATE SET Category = COALESCE(s.Category, t.Category),
+                   Quantity = COALESCE(s.Quantity, t.Quantity),
+                   Price = s.Price
+    WHEN NOT MATCHED THEN
+        INSERT (TenantID, ItemName, Category, Quantity, Price)
+        VALUES (?, s.ItemName, s.Category, COALESCE(s.Quantity, 0), s.Price)
+    OUTPUT $action;
+"""
+_ITEM_MERGE_ROW = '(?, CAST(? AS NVARCHAR(100)), CAST(? AS INT), CAST(? AS DECIMAL(10, 2)))'
+
+# SQLite has no MERGE: update the rows that exist, then insert the rest
+_SQLITE_ITEM_UPDATE = """
+    WITH s (ItemName, Category, Quantity, Price) AS (VALUES {values})
+    UPDATE Items
+    SET Category = COALESCE(s.Category, Items.Category),
+        Quantity = COALESCE(s.Quantity, Items.Quantity),
+        Price = s.Price
+    FROM s
+    WHERE Items.TenantID = ? AND Items.ItemName = s.ItemName
+      AND (Items.Price <> s.Price
+           OR (s.Quantity IS NOT NULL AND Items.Quantity <> s.Quantity)
+           OR (s.Category IS NOT NULL AND Items.Category IS NOT s.Category))
+    RETURNING ItemID
+"""
+_SQLITE_ITEM_INSERT = """
+    WITH s (ItemName, Category, Quantity, Price) AS (VALUES {values})
+    INSERT INTO Items (TenantID, ItemName, Category, Quantity, Price)
+    SELECT ?, s.ItemName, s.Category, COALESCE(s.Quantity, 0), s.Price
+    FROM s
+    WHERE NOT EXISTS (SELECT 1 FROM Items i WHERE i.TenantID = ? AND i.ItemName = s.ItemName)
+    RETURNING ItemID
+"""
+
+
+def upsert_items(cursor, tenant_id, rows):
+    """Insert or update (ItemName, Category, Quantity, Price) rows matched by name.
+
+    Set-based: one statement per ITEM_UPSERT_ROWS rows (two on SQLite).
+    Rows whose values already match are left alone, so they don't show up
+    in the item change feed. Returns (inserted, updated); the caller owns
+    the transaction.
+    """
+    inserted = updated = 0
+    sqlite = dialect_of(cursor).name == 'sqlite'
+    for start in range(0, len(rows), ITEM_UPSERT_ROWS):
+        chunk = rows[start:start + ITEM_UPSERT_ROWS]
+        params = [value for row in chunk for value in row]
+        if sqlite:
+            values = ', '.join('(?, ?, ?, ?)' for _ in chunk)
+            # rowcount isn't reported for statements that start with WITH
+            cursor.execute(_SQLITE_ITEM_UPDATE.format(values=values), params + [tenant_id])
+            updated += len(cursor.fetchall())
+            cursor.execute(_SQLITE_ITEM_INSERT.format(values=values), params + [tenant_id, tenant_id])
+            inserted += len(cursor.fetchall())
+        else:
+            values = ', '.join(_ITEM_MERGE_ROW for _ in chunk)
+            cursor.execute(_ITEM_MERGE.format(values=values), params + [tenant_id, tenant_id])
+            actions = [row[0] for row in cursor.fetchall()]
+            inserted += actions.count('INSERT')
+            updated += actions.count('UPDATE')
+    return inserted, updated
+
+
+class ItemImport:
+    """Validates uploaded item rows and writes them in chunked transactions.
+
+    A row that fails validation, or a chunk that can't be written, is
+    reported with its line number and the rest of the upload carries on.
+    Within a chunk, a later row for the same item name replaces an earlier one.
+    ``after_write(cursor, inserted, updated)`` runs inside each chunk's
+    transaction.
+    """
+
+    def __init__(self, conn, tenant_id, after_write=None, chunk_size=ITEM_IMPORT_CHUNK,
+                 retries=DEADLOCK_RETRIES):
+        self.conn = conn
+        self.tenant_id = tenant_id
+        self.after_write = after_write
+        self.chunk_size = chunk_size
+        self.retries = retries
+        # SQL Server compares names case-insensitively
+        sqlite = dialect_of(conn.cursor()).name == 'sqlite'
+        self._name_key = (lambda name: name) if sqlite else str.casefold
+        self.summary = {'received': 0, 'inserted': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'errors': []}
+
+    def run(self, records):
+        """Import (line number, record) pairs; returns the summary."""
+        chunk = {}
+        for line, record in records:
+            self.summary['received'] += 1
+            try:
+                row = validate_item(record)
+            except ValueError as e:
+                self._fail(line, str(e))
+                continue
+            key = self._name_key(row[0])
+            if key in chunk:
+                self._fail(chunk[key][0], f"Replaced by line {line}")
+            chunk[key] = (line, row)
+            if len(chunk) >= self.chunk_size:
+                self._write(list(chunk.values()))
+                chunk = {}
+        if chunk:
+            self._write(list(chunk.values()))
+        return self.summary
+
+    def _fail(self, line, error):
+        self.summary['failed'] += 1
+        if len(self.summary['errors']) < MAX_REPORTED_ERRORS:
+            self.summary['errors'].append({'line': line, 'error': error})
+
+    def _write(self, chunk):
+        rows = [row for _, row in chunk]
+        for attempt in range(self.retries + 1):
+            try:
+                cursor = self.conn.cursor()
+                inserted, updated = upsert_items(cursor, self.tenant_id, rows)
+                if self.after_write:
+                    self.after_write(cursor, inserted, updated)
+                self.conn.commit()
+                break
+            except Exception as e:
+                self.conn.rollback()
+                if attempt < self.retries and is_deadlock(e):
+                    time.sleep(random.uniform(0.01, 0.05) * (attempt + 1))
+                    continue
+                print(f"Error importing items: {e}")
+                for line, _ in chunk:
+                    self._fail(line, "Could not be saved")
+                return
+        self.summary['inserted'] += inserted
+        self.summary['updated'] += updated
+        self.summary['unchanged'] += max(len(rows) - inserted - updated, 0)
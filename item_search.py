@@ -0,0 +1,234 @@
+import heapq
+import threading
+import time
+from bisect import bisect_left, insort
+
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+ITEM_INDEX_TTL = 300
+# Upper bound for prefix range scans over sorted text
+_MAX_CHAR = chr(0x10FFFF)
+
+
+def normalize(text):
+    return ' '.join((text or '').lower().split())
+
+
+def trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def parse_search_limit(value):
+    try:
+        limit = int(value) if value not in (None, '') else DEFAULT_SEARCH_LIMIT
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    return max(1, min(limit, MAX_SEARCH_LIMIT))
+
+
+def fetch_item_documents(cursor, tenant_id):
+    """(ItemID, ItemName, Category) for every item of the tenant, for building its search index."""
+    cursor.execute("SELECT ItemID, ItemName, Category FROM Items WHERE TenantID = ?", (tenant_id,))
+    return cursor.fetchall()
+
+
+class ItemIndex:
+    """Trigram + word-prefix index over ItemName and Category.
+
+    Terms of three or more characters match anywhere in the name or category
+    (trigram postings narrow the candidates, a substring check confirms them);
+    shorter terms match the start of a word. Names starting with the query rank
+    first (alphabetically), then names whose words start with every term, then
+    the remaining matches, shorter names first. Not thread-safe; see ItemSearch.
+    """
+
+    def __init__(self, documents=()):
+        self._docs = {}        # item_id -> (normalized name, normalized category)
+        self._sort_keys = {}   # item_id -> (len(name), name, item_id)
+        self._postings = {}    # trigram -> set(item_id)
+        # Sorted (text, item_id) lists, searched by prefix with bisect
+        self._names = []
+        self._name_words = []
+        self._words = []       # name and category words
+        # Bulk load (ids are unique): index everything, then sort each list once
+        for item_id, name, category in documents:
+            self._index_doc(item_id, name, category, list.append)
+        for entries in (self._names, self._name_words, self._words):
+            entries.sort()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _entries(self, item_id, doc):
+        name_words = set(doc[0].split())
+        yield self._names, (doc[0], item_id)
+        for word in name_words:
+            yield self._name_words, (word, item_id)
+        for word in name_words | set(doc[1].split()):
+            yield self._words, (word, item_id)
+
+    def _index_doc(self, item_id, name, category, insert):
+        doc = (normalize(name), normalize(category))
+        self._docs[item_id] = doc
+        self._sort_keys[item_id] = (len(doc[0]), doc[0], item_id)
+        for gram in trigrams(doc[0]) | trigrams(doc[1]):
+            self._postings.setdefault(gram, set()).add(item_id)
+        for entries, entry in self._entries(item_id, doc):
+            insert(entries, entry)
+
+    def add(self, item_id, name, category):
+        self.remove(item_id)
+        self._index_doc(item_id, name, category, insort)
+
+    def remove(self, item_id):
+        doc = self._docs.pop(item_id, None)
+        if doc is None:
+            return
+        del self._sort_keys[item_id]
+        for gram in trigrams(doc[0]) | trigrams(doc[1]):
+            ids = self._postings[gram]
+            ids.discard(item_id)
+            if not ids:
+                del self._postings[gram]
+        for entries, entry in self._entries(item_id, doc):
+            del entries[bisect_left(entries, entry)]
+
+    @staticmethod
+    def _prefixed(entries, prefix):
+        low = bisect_left(entries, (prefix,))
+        high = bisect_left(entries, (prefix + _MAX_CHAR,))
+        return {item_id for _, item_id in entries[low:high]}
+
+    def _term_matches(self, term):
+        if len(term) < 3:
+            return self._prefixed(self._words, term)
+        postings = [self._postings.get(gram) for gram in trigrams(term)]
+        if not all(postings):
+            return set()
+        postings.sort(key=len)
+        candidates = postings[0].intersection(*postings[1:])
+        if len(term) == 3:
+            return candidates
+        # Sharing all trigrams does not guarantee the term occurs contiguously
+        docs = self._docs
+        return {item_id for item_id in candidates
+                if term in docs[item_id][0] or term in docs[item_id][1]}
+
+    def _has_term(self, item_id, term):
+        name, category = self._docs[item_id]
+        if len(term) >= 3:
+            return term in name or term in category
+        return any(word.startswith(term) for word in f'{name} {category}'.split())
+
+    def _name_has_word_prefix(self, item_id, term):
+        return any(word.startswith(term) for word in self._docs[item_id][0].split())
+
+    def search(self, query, limit=DEFAULT_SEARCH_LIMIT):
+        """Item ids matching every term of ``query``, best match first."""
+        query = normalize(query)
+        terms = query.split()
+        if not terms:
+            return []
+
+        # A name starting with the query matches every term. Names are sorted,
+        # so when there are enough of those the first ``limit`` are the answer
+        # (an exact match sorts first) and the full match set is never built
+        low = bisect_left(self._names, (query,))
+        high = bisect_left(self._names, (query + _MAX_CHAR,))
+        if high - low >= limit:
+            return [item_id for _, item_id in self._names[low:low + limit]]
+        results = [item_id for _, item_id in self._names[low:high]]
+
+        # Candidates come from the longest (most selective) term; the others filter them
+        first, *rest = sorted(set(terms), key=len, reverse=True)
+        matches = self._term_matches(first)
+        for term in rest:
+            matches = {item_id for item_id in matches if self._has_term(item_id, term)}
+        matches.difference_update(results)
+
+        word_prefix = matches & self._prefixed(self._name_words, first)
+        for term in rest:
+            word_prefix = {item_id for item_id in word_prefix if self._name_has_word_prefix(item_id, term)}
+        for tier in (word_prefix, matches - word_prefix):
+            if len(results) >= limit:
+                break
+            results.extend(heapq.nsmallest(limit - len(results), tier, key=self._sort_keys.__getitem__))
+        return results
+
+
+class ItemSearch:
+    """Process-wide ItemIndex, updated as items change and rebuilt after ``ttl`` seconds.
+
+    Writes made by this process are applied immediately with upsert()/remove();
+    the periodic rebuild from ``load`` picks up changes made by other processes.
+    """
+
+    def __init__(self, load, ttl=ITEM_INDEX_TTL):
+        self._load = load
+        self.ttl = ttl
+        self._index = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        # Changes made while a rebuild is loading, replayed onto the new index
+        self._pending = None
+
+    def invalidate(self):
+        with self._lock:
+            self._expires_at = 0.0
+
+    def search(self, query, limit=DEFAULT_SEARCH_LIMIT):
+        if time.monotonic() >= self._expires_at:
+            self._rebuild()
+        with self._lock:
+            return self._index.search(query, limit)
+
+    def upsert(self, item_id, name, category):
+        with self._lock:
+            if self._index is not None:
+                self._index.add(item_id, name, category)
+            if self._pending is not None:
+                self._pending.append((item_id, name, category))
+
+    def remove(self, item_id):
+        with self._lock:
+            if self._index is not None:
+                self._index.remove(item_id)
+            if self._pending is not None:
+                self._pending.append((item_id, None, None))
+
+    def stats(self):
+        with self._lock:
+            return {'items': len(self._index) if self._index is not None else 0}
+
+    def _rebuild(self):
+        # Only the first search waits for a build; later ones keep using the
+        # current index while another thread loads the new one
+        if not self._rebuild_lock.acquire(blocking=self._index is None):
+            return
+        try:
+            if time.monotonic() < self._expires_at:
+                return
+            with self._lock:
+                self._pending = []
+            try:
+                index = ItemIndex(self._load())
+            except Exception:
+                with self._lock:
+                    self._pending = None
+                if self._index is None:
+                    raise
+                print("Item index rebuild failed; serving the previous index")
+                self._expires_at = time.monotonic() + min(self.ttl, 30)
+                return
+            with self._lock:
+                for item_id, name, category in self._pending:
+                    if name is None:
+                        index.remove(item_id)
+                    else:
+                        index.add(item_id, name, category)
+                self._pending = None
+                self._index = index
+                self._expires_at = time.monotonic() + self.ttl
+        finally:
+            self._rebuild_lock.release()
@@ -0,0 +1,20 @@
+-- Running dashboard totals, maintained in the same transaction as the writes
+-- that change them. Rebuild from base tables with: flask --app app rebuild-stats
+
+CREATE TABLE TenantStats (
+    TenantID INT NOT NULL PRIMARY KEY,
+    TotalItems INT NOT NULL DEFAULT 0,
+    TotalTransactions BIGINT NOT NULL DEFAULT 0,
+    TotalRevenue DECIMAL(19, 4) NOT NULL DEFAULT 0,
+    UpdatedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+);
+GO
+
+CREATE TABLE DailyTenantStats (
+    TenantID INT NOT NULL,
+    StatDate DATE NOT NULL,
+    TransactionCount INT NOT NULL DEFAULT 0,
+    Revenue DECIMAL(19, 4) NOT NULL DEFAULT 0,
+    CONSTRAINT PK_DailyTenantStats PRIMARY KEY (TenantID, StatDate)
+);
+GO
@@ -0,0 +1,3 @@
+-- Changes whenever a TransactionMaster row is written; keys the invoice PDF cache
+ALTER TABLE TransactionMaster ADD RowVersion ROWVERSION;
+GO
@@ -0,0 +1,18 @@
+-- Change feed for Items: every insert/update bumps RowVersion, deletes leave a
+-- tombstone stamped from the same database-wide counter. GET /api/items/changes
+-- returns rows with a version above the client's.
+
+ALTER TABLE Items ADD RowVersion ROWVERSION;
+GO
+
+CREATE INDEX IX_Items_RowVersion ON Items (RowVersion);
+GO
+
+CREATE TABLE ItemTombstones (
+    ItemID INT NOT NULL PRIMARY KEY,
+    RowVersion ROWVERSION NOT NULL
+);
+GO
+
+CREATE INDEX IX_ItemTombstones_RowVersion ON ItemTombstones (RowVersion);
+GO
@@ -0,0 +1,21 @@
+-- Indexes for the transaction list, report, export and invoice queries.
+-- Both TransactionMaster indexes carry every column those queries select, so
+-- a filtered view is a range seek with no key lookups back to the table.
+
+-- Date ranges, and the newest-first keyset paging order
+CREATE INDEX IX_TransactionMaster_Date
+    ON TransactionMaster (TransactionDate DESC, TransactionID DESC)
+    INCLUDE (Username, TotalAmount, Discount, NetAmount);
+GO
+
+-- Exact and prefix username filters (username_match=exact|prefix)
+CREATE INDEX IX_TransactionMaster_Username
+    ON TransactionMaster (Username, TransactionDate DESC, TransactionID DESC)
+    INCLUDE (TotalAmount, Discount, NetAmount);
+GO
+
+-- Invoice lines and the export's join to TransactionDetails
+CREATE INDEX IX_TransactionDetails_TransactionID
+    ON TransactionDetails (TransactionID)
+    INCLUDE (ItemName, Quantity, Price, Amount);
+GO
@@ -0,0 +1,28 @@
+-- Sales totals per tenant, user and day/month, kept current by checkouts.
+-- Summary reports are answered from these instead of TransactionMaster.
+-- Fill them for existing history with: flask --app app backfill-sales
+
+CREATE TABLE SalesDaily (
+    SaleDate DATE NOT NULL,
+    TenantID INT NOT NULL,
+    Username NVARCHAR(100) NOT NULL,
+    TransactionCount INT NOT NULL DEFAULT 0,
+    TotalAmount DECIMAL(19, 4) NOT NULL DEFAULT 0,
+    Discount DECIMAL(19, 4) NOT NULL DEFAULT 0,
+    NetAmount DECIMAL(19, 4) NOT NULL DEFAULT 0,
+    CONSTRAINT PK_SalesDaily PRIMARY KEY (SaleDate, TenantID, Username)
+);
+GO
+
+-- SaleMonth is the first day of the month
+CREATE TABLE SalesMonthly (
+    SaleMonth DATE NOT NULL,
+    TenantID INT NOT NULL,
+    Username NVARCHAR(100) NOT NULL,
+    TransactionCount INT NOT NULL DEFAULT 0,
+    TotalAmount DECIMAL(19, 4) NOT NULL DEFAULT 0,
+    Discount DECIMAL(19, 4) NOT NULL DEFAULT 0,
+    NetAmount DECIMAL(19, 4) NOT NULL DEFAULT 0,
+    CONSTRAINT PK_SalesMonthly PRIMARY KEY (SaleMonth, TenantID, Username)
+);
+GO
@@ -0,0 +1,10 @@
+-- Client-generated key per sale, so a till can resend a batch after a timeout
+-- without writing the sale twice. Scoped per user; older rows have none.
+
+ALTER TABLE TransactionMaster ADD IdempotencyKey NVARCHAR(64) NULL;
+GO
+
+CREATE UNIQUE INDEX UX_TransactionMaster_IdempotencyKey
+    ON TransactionMaster (Username, IdempotencyKey)
+    WHERE IdempotencyKey IS NOT NULL;
+GO
@@ -0,0 +1,86 @@
+-- Items and transactions belong to a tenant. Every query filters on TenantID
+-- and the indexes lead with it, so a tenant's queries touch only its rows.
+-- The catalog was shared by every tenant: the first tenant keeps the existing
+-- items with their stock, and each other tenant gets its own copy with no
+-- stock, so no physical unit can be sold by two tenants.
+-- Transactions go to their user's tenant; those whose Username matches no
+-- user go to the first tenant, like the stock they were sold from.
+-- Afterwards run: flask --app app rebuild-stats, flask --app app backfill-sales,
+-- and resync terminals (since=0).
+
+ALTER TABLE Items ADD TenantID INT NOT NULL CONSTRAINT DF_Items_TenantID DEFAULT 0;
+GO
+
+INSERT INTO Items (TenantID, ItemName, Category, Quantity, Price)
+SELECT t.TenantID, i.ItemName, i.Category, 0, i.Price
+FROM Items i
+CROSS JOIN Tenants t
+WHERE i.TenantID = 0 AND t.TenantID > (SELECT MIN(TenantID) FROM Tenants);
+GO
+
+UPDATE Items SET TenantID = (SELECT MIN(TenantID) FROM Tenants)
+WHERE TenantID = 0 AND EXISTS (SELECT 1 FROM Tenants);
+GO
+
+DROP INDEX IX_Items_RowVersion ON Items;
+GO
+
+-- Change feed per tenant
+CREATE INDEX IX_Items_Tenant_RowVersion ON Items (TenantID, RowVersion);
+GO
+
+-- Catalog loads, search index builds and checkout's name lookups
+CREATE INDEX IX_Items_Tenant_Name ON Items (TenantID, ItemName)
+    INCLUDE (Category, Quantity, Price);
+GO
+
+-- Deletes made before this migration stay with no tenant
+ALTER TABLE ItemTombstones ADD TenantID INT NOT NULL CONSTRAINT DF_ItemTombstones_TenantID DEFAULT 0;
+GO
+
+DROP INDEX IX_ItemTombstones_RowVersion ON ItemTombstones;
+GO
+
+CREATE INDEX IX_ItemTombstones_Tenant_RowVersion ON ItemTombstones (TenantID, RowVersion);
+GO
+
+ALTER TABLE TransactionMaster ADD TenantID INT NOT NULL CONSTRAINT DF_TransactionMaster_TenantID DEFAULT 0;
+GO
+
+UPDATE tm SET tm.TenantID = u.TenantID
+FROM TransactionMaster tm
+JOIN Users u ON u.Username = tm.Username;
+GO
+
+UPDATE TransactionMaster SET TenantID = (SELECT MIN(TenantID) FROM Tenants)
+WHERE TenantID = 0 AND EXISTS (SELECT 1 FROM Tenants);
+GO
+
+DROP INDEX IX_TransactionMaster_Date ON TransactionMaster;
+GO
+
+DROP INDEX IX_TransactionMaster_Username ON TransactionMaster;
+GO
+
+CREATE INDEX IX_TransactionMaster_Tenant_Date
+    ON TransactionMaster (TenantID, TransactionDate DESC, TransactionID DESC)
+    INCLUDE (Username, TotalAmount, Discount, NetAmount);
+GO
+
+CREATE INDEX IX_TransactionMaster_Tenant_Username
+    ON TransactionMaster (TenantID, Username, TransactionDate DESC, TransactionID DESC)
+    INCLUDE (TotalAmount, Discount, NetAmount);
+GO
+
+-- Summary reports read one tenant's date range
+ALTER TABLE SalesDaily DROP CONSTRAINT PK_SalesDaily;
+GO
+
+ALTER TABLE SalesDaily ADD CONSTRAINT PK_SalesDaily PRIMARY KEY (TenantID, SaleDate, Username);
+GO
+
+ALTER TABLE SalesMonthly DROP CONSTRAINT PK_SalesMonthly;
+GO
+
+ALTER TABLE SalesMonthly ADD CONSTRAINT PK_SalesMonthly PRIMARY KEY (TenantID, SaleMonth, Username);
+GO
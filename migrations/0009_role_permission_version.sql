@@ -0,0 +1,26 @@
+-- Bumped whenever role permissions change, by the triggers below or by
+-- POST /api/rbac/invalidate. Every web worker compares it with the version its
+-- cached role permissions were loaded at, so a revoke reaches all of them.
+
+CREATE TABLE RolePermissionVersion (
+    ID INT NOT NULL PRIMARY KEY,
+    Version BIGINT NOT NULL DEFAULT 0
+);
+GO
+
+INSERT INTO RolePermissionVersion (ID, Version) VALUES (1, 0);
+GO
+
+CREATE TRIGGER TR_RolePermissions_Version ON RolePermissions
+AFTER INSERT, UPDATE, DELETE
+AS
+    SET NOCOUNT ON;
+    UPDATE RolePermissionVersion SET Version = Version + 1 WHERE ID = 1;
+GO
+
+CREATE TRIGGER TR_Roles_Version ON Roles
+AFTER UPDATE, DELETE
+AS
+    SET NOCOUNT ON;
+    UPDATE RolePermissionVersion SET Version = Version + 1 WHERE ID = 1;
+GO
@@ -0,0 +1,27 @@
+-- Every checkout adds to its tenant's TenantStats and DailyTenantStats rows,
+-- so concurrent checkouts of a tenant queued on those two rows. Each total is
+-- now spread over Shard 0-15 (COUNTER_SHARDS); a checkout adds to a random
+-- shard and readers sum them. Existing totals stay in shard 0.
+
+-- TenantStats' primary key was created without a name
+DECLARE @sql NVARCHAR(400) = N'ALTER TABLE TenantStats DROP CONSTRAINT ' + QUOTENAME((
+    SELECT name FROM sys.key_constraints
+    WHERE parent_object_id = OBJECT_ID('TenantStats') AND type = 'PK'
+));
+EXEC sp_executesql @sql;
+GO
+
+ALTER TABLE TenantStats ADD Shard TINYINT NOT NULL CONSTRAINT DF_TenantStats_Shard DEFAULT 0;
+GO
+
+ALTER TABLE TenantStats ADD CONSTRAINT PK_TenantStats PRIMARY KEY (TenantID, Shard);
+GO
+
+ALTER TABLE DailyTenantStats DROP CONSTRAINT PK_DailyTenantStats;
+GO
+
+ALTER TABLE DailyTenantStats ADD Shard TINYINT NOT NULL CONSTRAINT DF_DailyTenantStats_Shard DEFAULT 0;
+GO
+
+ALTER TABLE DailyTenantStats ADD CONSTRAINT PK_DailyTenantStats PRIMARY KEY (TenantID, StatDate, Shard);
+GO
@@ -0,0 +1,22 @@
+-- Every checkout adds to the seller's SalesDaily and SalesMonthly rows, so
+-- concurrent sales by the same user (a shared till login) queued on them.
+-- Each rollup row is now spread over Shard 0-15 (COUNTER_SHARDS); summaries
+-- already sum every matching row. Existing and backfilled totals use shard 0.
+
+ALTER TABLE SalesDaily DROP CONSTRAINT PK_SalesDaily;
+GO
+
+ALTER TABLE SalesDaily ADD Shard TINYINT NOT NULL CONSTRAINT DF_SalesDaily_Shard DEFAULT 0;
+GO
+
+ALTER TABLE SalesDaily ADD CONSTRAINT PK_SalesDaily PRIMARY KEY (TenantID, SaleDate, Username, Shard);
+GO
+
+ALTER TABLE SalesMonthly DROP CONSTRAINT PK_SalesMonthly;
+GO
+
+ALTER TABLE SalesMonthly ADD Shard TINYINT NOT NULL CONSTRAINT DF_SalesMonthly_Shard DEFAULT 0;
+GO
+
+ALTER TABLE SalesMonthly ADD CONSTRAINT PK_SalesMonthly PRIMARY KEY (TenantID, SaleMonth, Username, Shard);
+GO
@@ -0,0 +1,72 @@
+-- Base tables for a new SQLite store database (SQL Server databases already
+-- have them). One statement per batch: sqlite3 runs a single statement at a time.
+-- AUTOINCREMENT keeps ids from being reused after a delete, as IDENTITY does.
+
+CREATE TABLE Tenants (
+    TenantID INTEGER PRIMARY KEY AUTOINCREMENT,
+    TenantName TEXT NOT NULL
+);
+GO
+
+CREATE TABLE Users (
+    UserID INTEGER PRIMARY KEY AUTOINCREMENT,
+    Username TEXT NOT NULL UNIQUE,
+    PasswordHash TEXT NOT NULL,
+    TenantID INTEGER NOT NULL REFERENCES Tenants (TenantID)
+);
+GO
+
+CREATE TABLE Roles (
+    RoleID INTEGER PRIMARY KEY AUTOINCREMENT,
+    RoleName TEXT NOT NULL UNIQUE
+);
+GO
+
+CREATE TABLE Permissions (
+    PermissionID INTEGER PRIMARY KEY AUTOINCREMENT,
+    PermissionName TEXT NOT NULL UNIQUE
+);
+GO
+
+CREATE TABLE RolePermissions (
+    RoleID INTEGER NOT NULL,
+    PermissionID INTEGER NOT NULL,
+    PRIMARY KEY (RoleID, PermissionID)
+);
+GO
+
+CREATE TABLE UserRoles (
+    UserID INTEGER NOT NULL,
+    RoleID INTEGER NOT NULL,
+    PRIMARY KEY (UserID, RoleID)
+);
+GO
+
+CREATE TABLE Items (
+    ItemID INTEGER PRIMARY KEY AUTOINCREMENT,
+    ItemName TEXT NOT NULL,
+    Category TEXT,
+    Quantity INTEGER NOT NULL DEFAULT 0,
+    Price NUMERIC NOT NULL
+);
+GO
+
+CREATE TABLE TransactionMaster (
+    TransactionID INTEGER PRIMARY KEY AUTOINCREMENT,
+    TransactionDate TIMESTAMP NOT NULL,
+    Username TEXT NOT NULL,
+    TotalAmount NUMERIC,
+    Discount NUMERIC,
+    NetAmount NUMERIC
+);
+GO
+
+CREATE TABLE TransactionDetails (
+    DetailID INTEGER PRIMARY KEY AUTOINCREMENT,
+    TransactionID INTEGER NOT NULL,
+    ItemName TEXT NOT NULL,
+    Quantity INTEGER NOT NULL,
+    Price NUMERIC NOT NULL,
+    Amount NUMERIC NOT NULL
+);
+GO
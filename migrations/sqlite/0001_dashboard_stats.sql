@@ -0,0 +1,20 @@
+-- Running dashboard totals, maintained in the same transaction as the writes
+-- that change them. Rebuild from base tables with: flask --app app rebuild-stats
+
+CREATE TABLE TenantStats (
+    TenantID INTEGER NOT NULL PRIMARY KEY,
+    TotalItems INTEGER NOT NULL DEFAULT 0,
+    TotalTransactions INTEGER NOT NULL DEFAULT 0,
+    TotalRevenue NUMERIC NOT NULL DEFAULT 0,
+    UpdatedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+);
+GO
+
+CREATE TABLE DailyTenantStats (
+    TenantID INTEGER NOT NULL,
+    StatDate DATE NOT NULL,
+    TransactionCount INTEGER NOT NULL DEFAULT 0,
+    Revenue NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (TenantID, StatDate)
+);
+GO
@@ -0,0 +1,38 @@
+-- Changes whenever a TransactionMaster row is written; keys the invoice PDF cache.
+-- SQLite has no ROWVERSION type: triggers stamp rows from a database-wide
+-- counter instead, which later tables share (see 0004).
+
+CREATE TABLE RowVersionCounter (
+    Value INTEGER NOT NULL
+);
+GO
+
+INSERT INTO RowVersionCounter (Value) VALUES (0);
+GO
+
+ALTER TABLE TransactionMaster ADD COLUMN RowVersion INTEGER NOT NULL DEFAULT 0;
+GO
+
+UPDATE TransactionMaster SET RowVersion = TransactionID;
+GO
+
+UPDATE RowVersionCounter SET Value = COALESCE((SELECT MAX(TransactionID) FROM TransactionMaster), 0);
+GO
+
+CREATE TRIGGER TR_TransactionMaster_Insert_RowVersion AFTER INSERT ON TransactionMaster
+BEGIN
+    UPDATE RowVersionCounter SET Value = Value + 1;
+    UPDATE TransactionMaster SET RowVersion = (SELECT Value FROM RowVersionCounter)
+    WHERE TransactionID = NEW.TransactionID;
+END;
+GO
+
+-- Skips the trigger's own stamping update above
+CREATE TRIGGER TR_TransactionMaster_Update_RowVersion AFTER UPDATE ON TransactionMaster
+WHEN NEW.RowVersion = OLD.RowVersion
+BEGIN
+    UPDATE RowVersionCounter SET Value = Value + 1;
+    UPDATE TransactionMaster SET RowVersion = (SELECT Value FROM RowVersionCounter)
+    WHERE TransactionID = NEW.TransactionID;
+END;
+GO
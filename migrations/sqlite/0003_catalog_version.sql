@@ -0,0 +1,9 @@
+-- Bumped in the same transaction as every write to a tenant's Items (including
+-- stock decrements at checkout); keys the in-process catalog cache and its ETag.
+-- Kept out of TenantStats so rebuild-stats never resets it.
+
+CREATE TABLE CatalogVersions (
+    TenantID INTEGER NOT NULL PRIMARY KEY,
+    Version INTEGER NOT NULL DEFAULT 0
+);
+GO
@@ -0,0 +1,47 @@
+-- Change feed for Items: every insert/update bumps RowVersion, deletes leave a
+-- tombstone stamped from the same database-wide counter. GET /api/items/changes
+-- returns rows with a version above the client's.
+
+ALTER TABLE Items ADD COLUMN RowVersion INTEGER NOT NULL DEFAULT 0;
+GO
+
+-- Existing items get versions above everything stamped so far
+UPDATE Items SET RowVersion = ItemID + (SELECT Value FROM RowVersionCounter);
+GO
+
+UPDATE RowVersionCounter SET Value = Value + COALESCE((SELECT MAX(ItemID) FROM Items), 0);
+GO
+
+CREATE INDEX IX_Items_RowVersion ON Items (RowVersion);
+GO
+
+CREATE TRIGGER TR_Items_Insert_RowVersion AFTER INSERT ON Items
+BEGIN
+    UPDATE RowVersionCounter SET Value = Value + 1;
+    UPDATE Items SET RowVersion = (SELECT Value FROM RowVersionCounter) WHERE ItemID = NEW.ItemID;
+END;
+GO
+
+CREATE TRIGGER TR_Items_Update_RowVersion AFTER UPDATE ON Items
+WHEN NEW.RowVersion = OLD.RowVersion
+BEGIN
+    UPDATE RowVersionCounter SET Value = Value + 1;
+    UPDATE Items SET RowVersion = (SELECT Value FROM RowVersionCounter) WHERE ItemID = NEW.ItemID;
+END;
+GO
+
+CREATE TABLE ItemTombstones (
+    ItemID INTEGER NOT NULL PRIMARY KEY,
+    RowVersion INTEGER NOT NULL DEFAULT 0
+);
+GO
+
+CREATE INDEX IX_ItemTombstones_RowVersion ON ItemTombstones (RowVersion);
+GO
+
+CREATE TRIGGER TR_ItemTombstones_Insert_RowVersion AFTER INSERT ON ItemTombstones
+BEGIN
+    UPDATE RowVersionCounter SET Value = Value + 1;
+    UPDATE ItemTombstones SET RowVersion = (SELECT Value FROM RowVersionCounter) WHERE ItemID = NEW.ItemID;
+END;
+GO
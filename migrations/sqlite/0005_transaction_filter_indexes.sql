@@ -0,0 +1,17 @@
+-- Indexes for the transaction list, report, export and invoice queries.
+-- SQLite has no INCLUDE columns; the range seek looks the rest up by rowid.
+
+-- Date ranges, and the newest-first keyset paging order
+CREATE INDEX IX_TransactionMaster_Date
+    ON TransactionMaster (TransactionDate DESC, TransactionID DESC);
+GO
+
+-- Exact username filters (LIKE is case-insensitive here, so prefix filters scan)
+CREATE INDEX IX_TransactionMaster_Username
+    ON TransactionMaster (Username, TransactionDate DESC, TransactionID DESC);
+GO
+
+-- Invoice lines and the export's join to TransactionDetails
+CREATE INDEX IX_TransactionDetails_TransactionID
+    ON TransactionDetails (TransactionID);
+GO
@@ -0,0 +1,28 @@
+-- Sales totals per tenant, user and day/month, kept current by checkouts.
+-- Summary reports are answered from these instead of TransactionMaster.
+-- Fill them for existing history with: flask --app app backfill-sales
+
+CREATE TABLE SalesDaily (
+    SaleDate DATE NOT NULL,
+    TenantID INTEGER NOT NULL,
+    Username TEXT NOT NULL,
+    TransactionCount INTEGER NOT NULL DEFAULT 0,
+    TotalAmount NUMERIC NOT NULL DEFAULT 0,
+    Discount NUMERIC NOT NULL DEFAULT 0,
+    NetAmount NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (SaleDate, TenantID, Username)
+);
+GO
+
+-- SaleMonth is the first day of the month
+CREATE TABLE SalesMonthly (
+    SaleMonth DATE NOT NULL,
+    TenantID INTEGER NOT NULL,
+    Username TEXT NOT NULL,
+    TransactionCount INTEGER NOT NULL DEFAULT 0,
+    TotalAmount NUMERIC NOT NULL DEFAULT 0,
+    Discount NUMERIC NOT NULL DEFAULT 0,
+    NetAmount NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (SaleMonth, TenantID, Username)
+);
+GO
@@ -0,0 +1,117 @@
+-- Items and transactions belong to a tenant. Every query filters on TenantID
+-- and the indexes lead with it, so a tenant's queries touch only its rows.
+-- The catalog was shared by every tenant: the first tenant keeps the existing
+-- items with their stock, and each other tenant gets its own copy with no
+-- stock, so no physical unit can be sold by two tenants.
+-- Transactions go to their user's tenant; those whose Username matches no
+-- user go to the first tenant, like the stock they were sold from.
+-- Afterwards run: flask --app app rebuild-stats, flask --app app backfill-sales,
+-- and resync terminals (since=0).
+
+ALTER TABLE Items ADD COLUMN TenantID INTEGER NOT NULL DEFAULT 0;
+GO
+
+INSERT INTO Items (TenantID, ItemName, Category, Quantity, Price)
+SELECT t.TenantID, i.ItemName, i.Category, 0, i.Price
+FROM Items i
+CROSS JOIN Tenants t
+WHERE i.TenantID = 0 AND t.TenantID > (SELECT MIN(TenantID) FROM Tenants);
+GO
+
+UPDATE Items SET TenantID = (SELECT MIN(TenantID) FROM Tenants)
+WHERE TenantID = 0 AND EXISTS (SELECT 1 FROM Tenants);
+GO
+
+DROP INDEX IX_Items_RowVersion;
+GO
+
+-- Change feed per tenant
+CREATE INDEX IX_Items_Tenant_RowVersion ON Items (TenantID, RowVersion);
+GO
+
+-- Catalog loads, search index builds and checkout's name lookups
+CREATE INDEX IX_Items_Tenant_Name ON Items (TenantID, ItemName);
+GO
+
+-- Deletes made before this migration stay with no tenant
+ALTER TABLE ItemTombstones ADD COLUMN TenantID INTEGER NOT NULL DEFAULT 0;
+GO
+
+DROP INDEX IX_ItemTombstones_RowVersion;
+GO
+
+CREATE INDEX IX_ItemTombstones_Tenant_RowVersion ON ItemTombstones (TenantID, RowVersion);
+GO
+
+ALTER TABLE TransactionMaster ADD COLUMN TenantID INTEGER NOT NULL DEFAULT 0;
+GO
+
+UPDATE TransactionMaster
+SET TenantID = (SELECT u.TenantID FROM Users u WHERE u.Username = TransactionMaster.Username)
+WHERE EXISTS (SELECT 1 FROM Users u WHERE u.Username = TransactionMaster.Username);
+GO
+
+UPDATE TransactionMaster SET TenantID = (SELECT MIN(TenantID) FROM Tenants)
+WHERE TenantID = 0 AND EXISTS (SELECT 1 FROM Tenants);
+GO
+
+DROP INDEX IX_TransactionMaster_Date;
+GO
+
+DROP INDEX IX_TransactionMaster_Username;
+GO
+
+CREATE INDEX IX_TransactionMaster_Tenant_Date
+    ON TransactionMaster (TenantID, TransactionDate DESC, TransactionID DESC);
+GO
+
+CREATE INDEX IX_TransactionMaster_Tenant_Username
+    ON TransactionMaster (TenantID, Username, TransactionDate DESC, TransactionID DESC);
+GO
+
+-- Summary reports read one tenant's date range. SQLite can't change a primary
+-- key in place, so the rollup tables are rebuilt with TenantID first.
+CREATE TABLE SalesDaily_New (
+    TenantID INTEGER NOT NULL,
+    SaleDate DATE NOT NULL,
+    Username TEXT NOT NULL,
+    TransactionCount INTEGER NOT NULL DEFAULT 0,
+    TotalAmount NUMERIC NOT NULL DEFAULT 0,
+    Discount NUMERIC NOT NULL DEFAULT 0,
+    NetAmount NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (TenantID, SaleDate, Username)
+);
+GO
+
+INSERT INTO SalesDaily_New (TenantID, SaleDate, Username, TransactionCount, TotalAmount, Discount, NetAmount)
+SELECT TenantID, SaleDate, Username, TransactionCount, TotalAmount, Discount, NetAmount FROM SalesDaily;
+GO
+
+DROP TABLE SalesDaily;
+GO
+
+ALTER TABLE SalesDaily_New RENAME TO SalesDaily;
+GO
+
+-- SaleMonth is the first day of the month
+CREATE TABLE SalesMonthly_New (
+    TenantID INTEGER NOT NULL,
+    SaleMonth DATE NOT NULL,
+    Username TEXT NOT NULL,
+    TransactionCount INTEGER NOT NULL DEFAULT 0,
+    TotalAmount NUMERIC NOT NULL DEFAULT 0,
+    Discount NUMERIC NOT NULL DEFAULT 0,
+    NetAmount NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (TenantID, SaleMonth, Username)
+);
+GO
+
+INSERT INTO SalesMonthly_New (TenantID, SaleMonth, Username, TransactionCount, TotalAmount, Discount, NetAmount)
+SELECT TenantID, SaleMonth, Username, TransactionCount, TotalAmount, Discount, NetAmount FROM SalesMonthly;
+GO
+
+DROP TABLE SalesMonthly;
+GO
+
+ALTER TABLE SalesMonthly_New RENAME TO SalesMonthly;
+GO
@@ -0,0 +1,42 @@
+-- Bumped whenever role permissions change, by the triggers below or by
+-- POST /api/rbac/invalidate. Every web worker compares it with the version its
+-- cached role permissions were loaded at, so a revoke reaches all of them.
+
+CREATE TABLE RolePermissionVersion (
+    ID INTEGER NOT NULL PRIMARY KEY,
+    Version INTEGER NOT NULL DEFAULT 0
+);
+GO
+
+INSERT INTO RolePermissionVersion (ID, Version) VALUES (1, 0);
+GO
+
+CREATE TRIGGER TR_RolePermissions_Insert_Version AFTER INSERT ON RolePermissions
+BEGIN
+    UPDATE RolePermissionVersion SET Version = Version + 1 WHERE ID = 1;
+END;
+GO
+
+CREATE TRIGGER TR_RolePermissions_Update_Version AFTER UPDATE ON RolePermissions
+BEGIN
+    UPDATE RolePermissionVersion SET Version = Version + 1 WHERE ID = 1;
+END;
+GO
+
+CREATE TRIGGER TR_RolePermissions_Delete_Version AFTER DELETE ON RolePermissions
+BEGIN
+    UPDATE RolePermissionVersion SET Version = Version + 1 WHERE ID = 1;
+END;
+GO
+
+CREATE TRIGGER TR_Roles_Update_Version AFTER UPDATE ON Roles
+BEGIN
+    UPDATE RolePermissionVersion SET Version = Version + 1 WHERE ID = 1;
+END;
+GO
+
+CREATE TRIGGER TR_Roles_Delete_Version AFTER DELETE ON Roles
+BEGIN
+    UPDATE RolePermissionVersion SET Version = Version + 1 WHERE ID = 1;
+END;
+GO
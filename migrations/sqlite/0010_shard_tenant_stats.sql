@@ -0,0 +1,44 @@
+-- Each running total is spread over Shard 0-15 (COUNTER_SHARDS); a checkout
+-- adds to a random shard and readers sum them. Existing totals stay in shard 0.
+-- SQLite can't change a primary key in place, so both tables are rebuilt.
+
+CREATE TABLE TenantStats_New (
+    TenantID INTEGER NOT NULL,
+    Shard INTEGER NOT NULL DEFAULT 0,
+    TotalItems INTEGER NOT NULL DEFAULT 0,
+    TotalTransactions INTEGER NOT NULL DEFAULT 0,
+    TotalRevenue NUMERIC NOT NULL DEFAULT 0,
+    UpdatedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (TenantID, Shard)
+);
+GO
+
+INSERT INTO TenantStats_New (TenantID, TotalItems, TotalTransactions, TotalRevenue, UpdatedAt)
+SELECT TenantID, TotalItems, TotalTransactions, TotalRevenue, UpdatedAt FROM TenantStats;
+GO
+
+DROP TABLE TenantStats;
+GO
+
+ALTER TABLE TenantStats_New RENAME TO TenantStats;
+GO
+
+CREATE TABLE DailyTenantStats_New (
+    TenantID INTEGER NOT NULL,
+    StatDate DATE NOT NULL,
+    Shard INTEGER NOT NULL DEFAULT 0,
+    TransactionCount INTEGER NOT NULL DEFAULT 0,
+    Revenue NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (TenantID, StatDate, Shard)
+);
+GO
+
+INSERT INTO DailyTenantStats_New (TenantID, StatDate, TransactionCount, Revenue)
+SELECT TenantID, StatDate, TransactionCount, Revenue FROM DailyTenantStats;
+GO
+
+DROP TABLE DailyTenantStats;
+GO
+
+ALTER TABLE DailyTenantStats_New RENAME TO DailyTenantStats;
+GO
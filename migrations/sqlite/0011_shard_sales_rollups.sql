@@ -0,0 +1,50 @@
+-- Each rollup row is spread over Shard 0-15 (COUNTER_SHARDS); summaries
+-- already sum every matching row. Existing and backfilled totals use shard 0.
+-- SQLite can't change a primary key in place, so both tables are rebuilt.
+
+CREATE TABLE SalesDaily_New (
+    TenantID INTEGER NOT NULL,
+    SaleDate DATE NOT NULL,
+    Username TEXT NOT NULL,
+    Shard INTEGER NOT NULL DEFAULT 0,
+    TransactionCount INTEGER NOT NULL DEFAULT 0,
+    TotalAmount NUMERIC NOT NULL DEFAULT 0,
+    Discount NUMERIC NOT NULL DEFAULT 0,
+    NetAmount NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (TenantID, SaleDate, Username, Shard)
+);
+GO
+
+INSERT INTO SalesDaily_New (TenantID, SaleDate, Username, TransactionCount, TotalAmount, Discount, NetAmount)
+SELECT TenantID, SaleDate, Username, TransactionCount, TotalAmount, Discount, NetAmount FROM SalesDaily;
+GO
+
+DROP TABLE SalesDaily;
+GO
+
+ALTER TABLE SalesDaily_New RENAME TO SalesDaily;
+GO
+
+-- SaleMonth is the first day of the month
+CREATE TABLE SalesMonthly_New (
+    TenantID INTEGER NOT NULL,
+    SaleMonth DATE NOT NULL,
+    Username TEXT NOT NULL,
+    Shard INTEGER NOT NULL DEFAULT 0,
+    TransactionCount INTEGER NOT NULL DEFAULT 0,
+    TotalAmount NUMERIC NOT NULL DEFAULT 0,
+    Discount NUMERIC NOT NULL DEFAULT 0,
+    NetAmount NUMERIC NOT NULL DEFAULT 0,
+    PRIMARY KEY (TenantID, SaleMonth, Username, Shard)
+);
+GO
+
+INSERT INTO SalesMonthly_New (TenantID, SaleMonth, Username, TransactionCount, TotalAmount, Discount, NetAmount)
+SELECT TenantID, SaleMonth, Username, TransactionCount, TotalAmount, Discount, NetAmount FROM SalesMonthly;
+GO
+
+DROP TABLE SalesMonthly;
+GO
+
+ALTER TABLE SalesMonthly_New RENAME TO SalesMonthly;
+GO
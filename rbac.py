@@ -0,0 +1,147 @@
+import threading
+import time
+from functools import wraps
+
+from flask import jsonify, session
+
+from db_backend import dialect_of
+
+ROLE_PERMISSION_TTL = 300
+# How often each process compares its cache with the shared version stamp
+ROLE_VERSION_CHECK_INTERVAL = 1.0
+
+
+def fetch_role_permissions(cursor):
+    """Load {RoleName: frozenset(PermissionName)} for every role in one query."""
+    cursor.execute("""
+        SELECT r.RoleName, p.PermissionName
+        FROM Roles r
+        LEFT JOIN RolePermissions rp ON rp.RoleID = r.RoleID
+        LEFT JOIN Permissions p ON p.PermissionID = rp.PermissionID
+    """)
+    grouped = {}
+    for role_name, permission_name in cursor.fetchall():
+        permissions = grouped.setdefault(role_name, set())
+        if permission_name:
+            permissions.add(permission_name)
+    return {role: frozenset(permissions) for role, permissions in grouped.items()}
+
+
+def read_role_permission_version(cursor):
+    cursor.execute("SELECT Version FROM RolePermissionVersion WHERE ID = 1")
+    row = cursor.fetchone()
+    return int(row[0]) if row else 0
+
+
+def bump_role_permission_version(cursor):
+    """Tell every process to reload role permissions (caller commits)."""
+    cursor.execute(dialect_of(cursor).upsert(
+        'RolePermissionVersion', keys=[('ID', '1')], increments=[('Version', '1')], returning='Version',
+    ))
+    return int(cursor.fetchone()[0])
+
+
+class RBAC:
+    """Role -> permission sets cached in-process and refreshed after ``ttl`` seconds.
+
+    ``load`` returns the full {role: frozenset(permission)} mapping. The union for
+    each distinct combination of roles is memoised too, so checking a request
+    is one dict lookup plus one set membership test.
+
+    With ``read_version``, the shared RolePermissionVersion stamp is read at
+    most every ``check_interval`` seconds and a changed stamp reloads the
+    cache, so a revoke reaches every worker process within that interval
+    rather than the TTL.
+    """
+
+    def __init__(self, load, ttl=ROLE_PERMISSION_TTL, read_version=None,
+                 check_interval=ROLE_VERSION_CHECK_INTERVAL):
+        self._load = load
+        self.ttl = ttl
+        self._read_version = read_version
+        self.check_interval = check_interval
+        # (role map, memoised unions) swapped together so readers never mix them
+        self._state = None
+        self._version = None
+        self._expires_at = 0.0
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        """Drop this process's cached role permissions; the next check reloads them."""
+        with self._lock:
+            self._expires_at = 0.0
+
+    def permissions_for(self, roles):
+        key = roles if isinstance(roles, frozenset) else frozenset(roles)
+        if self._version_changed():
+            self.invalidate()
+        if time.monotonic() >= self._expires_at:
+            self._refresh()
+        role_map, unions = self._state
+        combined = unions.get(key)
+        if combined is None:
+            combined = frozenset().union(*(role_map.get(role, ()) for role in key))
+            unions[key] = combined
+        return combined
+
+    def allows(self, roles, permission):
+        return permission in self.permissions_for(roles)
+
+    def requires(self, permission=None):
+        """View decorator: 401 without a session, 403 without ``permission``."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                user = session.get('user')
+                if user is None:
+                    return jsonify({'error': 'Not authenticated'}), 401
+                if permission is not None:
+                    try:
+                        allowed = self.allows(user['roles'], permission)
+                    except Exception as e:
+                        print(f"Error loading role permissions: {e}")
+                        return jsonify({'error': 'Failed to load permissions'}), 500
+                    if not allowed:
+                        return jsonify({'error': 'Access denied'}), 403
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def _version_changed(self):
+        if self._read_version is None or self._state is None:
+            return False
+        now = time.monotonic()
+        if now < self._next_check:
+            return False
+        with self._lock:
+            # One thread reads the stamp; the others keep using the cache meanwhile
+            if now < self._next_check:
+                return False
+            self._next_check = now + self.check_interval
+        try:
+            return self._read_version() != self._version
+        except Exception as e:
+            print(f"Error reading role permission version: {e}")
+            return False
+
+    def _refresh(self):
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if time.monotonic() < self._expires_at:
+                return
+            try:
+                # Read before the roles: a change in between reloads again on the next check
+                version = self._read_version() if self._read_version else None
+                roles = self._load()
+            except Exception:
+                if self._state is None:
+                    raise
+                # Keep serving the last good mapping; retry shortly
+                print("Role permission reload failed; serving cached permissions")
+                self._expires_at = time.monotonic() + min(self.ttl, 30)
+                return
+            self._state = (roles, {})
+            self._version = version
+            self._expires_at = time.monotonic() + self.ttl
+            self._next_check = time.monotonic() + self.check_interval
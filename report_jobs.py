@@ -0,0 +1,305 @@
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+
+from instrumentation import SLOW_QUERY_SECONDS, InstrumentedConnection, log_event, track
+from reports import build_report, fetch_summary, iter_transactions
+
+REPORTS_DIR = os.path.join(tempfile.gettempdir(), 'rbac-pos-reports')
+REPORT_WORKERS = 2
+# Queued/running jobs with no progress for this long are reported as failed
+REPORT_STALE_SECONDS = 15 * 60
+# Job state and PDFs are deleted after this long
+REPORT_RETENTION_SECONDS = 60 * 60
+
+
+def job_id_for(filters, report_type, tenant_id, username):
+    """Deterministic id, so identical (filters, report_type, tenant, user) requests share a job.
+
+    The user is part of the key because the PDF names who generated it.
+    """
+    source = json.dumps([filters, report_type, tenant_id, username], sort_keys=True)
+    return hashlib.sha256(source.encode('utf-8')).hexdigest()[:32]
+
+
+class JobStore:
+    """Job state as small JSON files next to the rendered PDFs.
+
+    Keeping state on disk lets the worker process report progress without a
+    broker, and lets any web worker answer status and download requests.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.directory, f'{job_id}{suffix}')
+
+    def pdf_path(self, job_id):
+        return self._path(job_id, '.pdf')
+
+    def read(self, job_id):
+        try:
+            with open(self._path(job_id, '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def write(self, job_id, state):
+        state['updatedAt'] = time.time()
+        tmp_path = self._path(job_id, f'.json.{os.getpid()}.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self._path(job_id, '.json'))
+
+    def update(self, job_id, **fields):
+        state = self.read(job_id) or {'jobId': job_id}
+        state.update(fields)
+        self.write(job_id, state)
+        return state
+
+    def claim(self, job_id):
+        # O_EXCL makes creating the lock file atomic across processes
+        path = self._path(job_id, '.lock')
+        try:
+            os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+            return True
+        except FileExistsError:
+            # A creator that died mid-submit must not block the job forever
+            try:
+                if time.time() - os.path.getmtime(path) > 60:
+                    os.remove(path)
+            except OSError:
+                pass
+            return False
+
+    def unclaim(self, job_id):
+        try:
+            os.remove(self._path(job_id, '.lock'))
+        except OSError:
+            pass
+
+    def purge(self, older_than):
+        cutoff = time.time() - older_than
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def run_report_job(directory, job_id, backend, filters, report_type, meta,
+                   slow_query_seconds=SLOW_QUERY_SECONDS):
+    """Process-pool entry point: query, render to <job_id>.pdf and record progress.
+
+    Returns the job's timings ({'query', 'render', 'bytes'}), or None if it failed.
+    """
+    store = JobStore(directory)
+    store.update(job_id, status='running', startedAt=time.time(), pid=os.getpid())
+    try:
+        with track(f'report:{report_type}') as stats:
+            conn = InstrumentedConnection(backend.connect(), slow_query_seconds=slow_query_seconds)
+            try:
+                cursor = conn.cursor()
+                summary = fetch_summary(cursor, filters)
+                total = summary[0] if report_type == 'detailed' else 0
+                store.update(job_id, total=total, processed=0)
+
+                rows = iter_transactions(cursor, filters) if report_type == 'detailed' else ()
+                tmp_path = f'{store.pdf_path(job_id)}.{os.getpid()}.tmp'
+                # Detail rows are fetched while ReportLab lays out pages; the
+                # fetch time is taken back out of the build time below
+                build_started = time.perf_counter()
+                query_before_build = stats.db_time
+                build_report(tmp_path, meta, summary, rows, report_type,
+                             progress=lambda done: store.update(job_id, processed=done))
+                build_time = time.perf_counter() - build_started
+                os.replace(tmp_path, store.pdf_path(job_id))
+            finally:
+                conn.close()
+        timings = {
+            'query': stats.db_time,
+            'render': build_time - (stats.db_time - query_before_build),
+            'bytes': os.path.getsize(store.pdf_path(job_id)),
+        }
+        store.update(job_id, status='done', processed=total, finishedAt=time.time(), timings=timings)
+        log_event('report', jobId=job_id, reportType=report_type, rows=stats.rows, queries=stats.queries,
+                  queryMs=round(timings['query'] * 1000, 1), renderMs=round(timings['render'] * 1000, 1),
+                  bytes=timings['bytes'])
+        return timings
+    except Exception as e:
+        print(f"Error generating report {job_id}: {e}")
+        store.update(job_id, status='failed', error=str(e), finishedAt=time.time())
+        return None
+
+
+class ReportJobs:
+    def __init__(self, backend_for, directory=REPORTS_DIR, max_workers=REPORT_WORKERS,
+                 metrics=None, slow_query_seconds=SLOW_QUERY_SECONDS):
+        # backend_for(tenant_id) is the backend holding the tenant's data; it is
+        # pickled into the workers, which open their own connection from it
+        self.backend_for = backend_for
+        self.store = JobStore(directory)
+        self.max_workers = max_workers
+        self.metrics = metrics
+        self.slow_query_seconds = slow_query_seconds
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+        self._last_purge = 0.0
+
+    def _get_executor(self):
+        # Created lazily (and again after a fork) so each web worker owns its pool
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context('spawn'),
+                )
+                self._executor_pid = os.getpid()
+            return self._executor
+
+    def _reusable(self, state):
+        # Only a job still in flight is shared: a finished one may predate
+        # newer sales, so asking again renders a fresh report
+        if state.get('status') in ('queued', 'running'):
+            return time.time() - state.get('updatedAt', 0) < REPORT_STALE_SECONDS
+        return False
+
+    def _discard_executor(self, executor):
+        # A render worker died (OOM kill, segfault) and the pool refuses new
+        # work; the next submit starts a fresh one
+        with self._lock:
+            if self._executor is executor:
+                self._executor = None
+
+    def _orphaned(self, state):
+        """A queued/running job nothing will finish: stalled, or its process is gone."""
+        if state.get('status') not in ('queued', 'running'):
+            return False
+        if time.time() - state.get('updatedAt', 0) > REPORT_STALE_SECONDS:
+            return True
+        # pid is the web worker that queued the job, then the render worker running it
+        pid = state.get('pid')
+        if not pid:
+            return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            pass
+        return False
+
+    def _settle(self, state):
+        if state and self._orphaned(state):
+            return self.store.update(state['jobId'], status='failed', error='Report worker stopped',
+                                     finishedAt=time.time())
+        return state
+
+    def submit(self, filters, report_type, user):
+        now = time.time()
+        if now - self._last_purge > 60:
+            self._last_purge = now
+            self.store.purge(REPORT_RETENTION_SECONDS)
+
+        # Reports only ever cover the requesting user's tenant
+        filters = dict(filters, tenant_id=user['tenantID'])
+        job_id = job_id_for(filters, report_type, user['tenantID'], user['username'])
+        state = self._settle(self.store.read(job_id))
+        if state and self._reusable(state):
+            return state
+
+        if not self.store.claim(job_id):
+            # Another request is creating this exact job right now
+            return self.store.read(job_id) or {'jobId': job_id, 'status': 'queued'}
+        try:
+            state = self._settle(self.store.read(job_id))
+            if state and self._reusable(state):
+                return state
+
+            meta = {
+                'username': user['username'],
+                'tenantName': user['tenantName'],
+                'generatedOn': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'start_date': filters.get('start_date'),
+                'end_date': filters.get('end_date'),
+                'username_filter': filters.get('username'),
+            }
+            state = {
+                'jobId': job_id,
+                'status': 'queued',
+                'tenantID': user['tenantID'],
+                'reportType': report_type,
+                'processed': 0,
+                'total': None,
+                'createdAt': now,
+                'pid': os.getpid(),
+            }
+            self.store.write(job_id, state)
+            args = (run_report_job, self.store.directory, job_id, self.backend_for(user['tenantID']),
+                    filters, report_type, meta, self.slow_query_seconds)
+            try:
+                executor = self._get_executor()
+                try:
+                    future = executor.submit(*args)
+                except BrokenProcessPool:
+                    self._discard_executor(executor)
+                    executor = self._get_executor()
+                    future = executor.submit(*args)
+            except Exception as e:
+                self.store.update(job_id, status='failed', error=str(e), finishedAt=time.time())
+                raise
+            future.add_done_callback(lambda f: self._job_finished(f, executor, job_id, report_type))
+            return state
+        finally:
+            self.store.unclaim(job_id)
+
+    def _job_finished(self, future, executor, job_id, report_type):
+        if future.cancelled():
+            error = 'Report was cancelled'
+        else:
+            error = future.exception()
+        if error:
+            # The worker never got to record the outcome (it was killed, or the pool broke)
+            print(f"Error generating report {job_id}: {error}")
+            if isinstance(error, BrokenProcessPool):
+                self._discard_executor(executor)
+            self.store.update(job_id, status='failed', error='Report worker stopped', finishedAt=time.time())
+            return
+        if self.metrics:
+            self._record_timings(future.result(), report_type)
+
+    def _record_timings(self, timings, report_type):
+        # Workers have no metrics registry of their own; they report back here
+        if not timings:
+            return
+        self.metrics.observe('report_job_seconds', timings['query'], report_type=report_type, phase='query')
+        self.metrics.observe('report_job_seconds', timings['render'], report_type=report_type, phase='render')
+        self.metrics.observe('pdf_build_seconds', timings['render'], kind=f'report:{report_type}')
+        self.metrics.observe('pdf_size_bytes', timings['bytes'], kind=f'report:{report_type}')
+
+    def status(self, job_id, tenant_id):
+        if not re.fullmatch(r'[0-9a-f]{32}', job_id):
+            return None
+        state = self.store.read(job_id)
+        if not state or state.get('tenantID') != tenant_id:
+            return None
+        return self._settle(state)
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None and self._executor_pid == os.getpid():
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
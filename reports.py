@@ -0,0 +1,230 @@
+import itertools
+import zlib
+
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.pdfbase.pdfdoc import PDFArray, PDFDictionary, PDFName, PDFStream
+from reportlab.pdfgen.canvas import Canvas
+from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
+
+from sales_rollups import fetch_sales_summary
+from transaction_queries import TRANSACTION_COLUMNS, build_transaction_filters, where_sql
+
+FETCH_BATCH_SIZE = 1000
+# Detail rows per table: one table fits on an A4 page at the detail font size
+DETAIL_ROWS_PER_TABLE = 40
+
+# Report styles are built once per (worker) process
+styles = getSampleStyleSheet()
+
+title_style = ParagraphStyle(
+    'CustomTitle',
+    parent=styles['Heading1'],
+    fontSize=18,
+    spaceAfter=30,
+    alignment=1  # Center alignment
+)
+
+summary_table_style = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 14),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black)
+])
+
+detail_table_style = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, 0), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+    ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ('GRID', (0, 0), (-1, -1), 1, colors.black),
+    ('FONTSIZE', (0, 1), (-1, -1), 8),
+])
+
+DETAIL_HEADER = ['ID', 'Date', 'User', 'Total', 'Discount', 'Net Amount']
+DETAIL_COL_WIDTHS = [0.8*inch, 1.5*inch, 1.2*inch, 1*inch, 1*inch, 1.2*inch]
+
+
+def _money(value):
+    return f'${float(value):.2f}' if value else '$0.00'
+
+
+def detail_row(transaction):
+    return [
+        str(transaction[0]),
+        transaction[1].strftime('%Y-%m-%d %H:%M') if transaction[1] else '',
+        transaction[2] or '',
+        _money(transaction[3]),
+        _money(transaction[4]),
+        _money(transaction[5])
+    ]
+
+
+def fetch_summary(cursor, filters):
+    """(count, total, discount, net) for the filtered transactions, from the sales rollups."""
+    return fetch_sales_summary(cursor, **filters)
+
+
+def iter_transactions(cursor, filters, batch_size=FETCH_BATCH_SIZE):
+    clauses, params = build_transaction_filters(**filters)
+    cursor.execute(f"""
+        SELECT {TRANSACTION_COLUMNS}
+        FROM TransactionMaster tm
+        {where_sql(clauses)}
+        ORDER BY tm.TransactionDate DESC
+    """, params)
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield from rows
+
+
+class StreamedStory(list):
+    """A story that pulls flowables from an iterator as ReportLab consumes them.
+
+    BaseDocTemplate.build() only ever looks at the head of the story (len,
+    [0], small slices, insert/del at the front), so keeping a short lookahead
+    buffer lets a document of any length be built without materialising every
+    flowable up front.
+    """
+
+    def __init__(self, flowables, lookahead=8):
+        super().__init__()
+        self._source = iter(flowables)
+        self._lookahead = lookahead
+
+    def _fill(self):
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+
+class CompressingCanvas(Canvas):
+    """Canvas that Flate-compresses each page's content stream when the page ends.
+
+    ReportLab normally keeps every page's uncompressed drawing operators until
+    save(); compressing them page by page keeps a long report's resident size
+    close to the size of the finished PDF.
+    """
+
+    def showPage(self):
+        super().showPage()
+        page = self._doc.Pages.pages[-1]
+        if page.stream:
+            # A stream that already carries a Filter is written out as-is
+            contents = PDFStream(
+                PDFDictionary({'Filter': PDFArray([PDFName('FlateDecode')])}),
+                zlib.compress(page.stream.encode('utf8')),
+            )
+            contents.__Comment__ = "page stream"
+            page.Contents = contents
+            page.stream = None
+
+
+def detail_tables(transactions, progress=None, rows_per_table=DETAIL_ROWS_PER_TABLE):
+    """Yield one fixed-size detail table (header repeated) per page worth of rows."""
+    table_data = [DETAIL_HEADER]
+    done = 0
+    next_report = FETCH_BATCH_SIZE
+    for transaction in transactions:
+        table_data.append(detail_row(transaction))
+        done += 1
+        if len(table_data) > rows_per_table:
+            yield _detail_table(table_data)
+            table_data = [DETAIL_HEADER]
+        if progress and done >= next_report:
+            progress(done)
+            next_report += FETCH_BATCH_SIZE
+    if len(table_data) > 1:
+        yield _detail_table(table_data)
+
+
+def _detail_table(table_data):
+    table = Table(table_data, colWidths=DETAIL_COL_WIDTHS, repeatRows=1)
+    table.setStyle(detail_table_style)
+    return table
+
+
+def build_report(output, meta, summary, transactions, report_type, progress=None):
+    """Render the transaction report PDF into ``output`` (path or file object).
+
+    ``meta`` carries the header fields (username, tenantName, generatedOn,
+    start_date, end_date, username_filter); ``summary`` is fetch_summary()'s tuple;
+    ``transactions`` is an iterable of TransactionMaster rows, only consumed for
+    detailed reports. ``progress(rows_done)`` is called as rows are processed.
+
+    Detail rows are laid out one page-sized table at a time while they are
+    pulled from ``transactions``, so Python memory stays flat and render time
+    grows linearly with the row count.
+    """
+    count, total_amount, total_discount, total_net = summary
+    doc = SimpleDocTemplate(output, pagesize=A4, pageCompression=1)
+    story = []
+
+    # Title
+    story.append(Paragraph("Transaction Report", title_style))
+    story.append(Spacer(1, 12))
+
+    # Report Info
+    report_info = f"""
+    <b>Generated by:</b> {meta['username']}<br/>
+    <b>Tenant:</b> {meta['tenantName']}<br/>
+    <b>Generated on:</b> {meta['generatedOn']}<br/>
+    <b>Date Range:</b> {meta['start_date'] or 'All'} to {meta['end_date'] or 'All'}<br/>
+    <b>User Filter:</b> {meta['username_filter'] or 'All Users'}<br/>
+    <b>Total Transactions:</b> {count}
+    """
+    story.append(Paragraph(report_info, styles['Normal']))
+    story.append(Spacer(1, 20))
+
+    if count:
+        # Summary table
+        summary_data = [
+            ['Summary', 'Amount'],
+            ['Total Amount', f'${total_amount:.2f}'],
+            ['Total Discount', f'${total_discount:.2f}'],
+            ['Net Amount', f'${total_net:.2f}']
+        ]
+        summary_table = Table(summary_data, colWidths=[3*inch, 2*inch])
+        summary_table.setStyle(summary_table_style)
+        story.append(summary_table)
+        story.append(Spacer(1, 20))
+
+    if report_type == 'detailed':
+        # The detail query decides whether there is anything to list, not the
+        # rollup count, which lags behind transactions it hasn't been rebuilt for
+        transactions = iter(transactions)
+        first = next(transactions, None)
+        if first is not None:
+            story.append(Paragraph("Detailed Transactions", styles['Heading2']))
+            story.append(Spacer(1, 12))
+            story = itertools.chain(story, detail_tables(itertools.chain([first], transactions), progress))
+        else:
+            story.append(Paragraph("No transactions found for the specified criteria.", styles['Normal']))
+    elif not count:
+        story.append(Paragraph("No transactions found for the specified criteria.", styles['Normal']))
+
+    doc.build(StreamedStory(story), canvasmaker=CompressingCanvas)
@@ -0,0 +1,74 @@
+from db_backend import dialect_of
+
+# The routes' own queries (login, items, invoice header). Feature modules keep
+# theirs next to their logic (stats, catalog, checkout, item_changes,
+# sales_rollups, ...); all of them take a cursor and pick their SQL from its
+# dialect, so the same code runs on SQL Server and SQLite. Items and
+# transactions are always read and written for one tenant.
+
+ITEMS_QUERY = "SELECT ItemID, ItemName, Category, Quantity, Price FROM Items WHERE TenantID = ?"
+
+
+def fetch_login(cursor, username):
+    """(UserID, Username, PasswordHash, TenantID, TenantName, [RoleName]) or None, in one query."""
+    cursor.execute("""
+        SELECT u.UserID, u.Username, u.PasswordHash, u.TenantID, t.TenantName, r.RoleName
+        FROM Users u
+        JOIN Tenants t ON u.TenantID = t.TenantID
+        LEFT JOIN UserRoles ur ON ur.UserID = u.UserID
+        LEFT JOIN Roles r ON r.RoleID = ur.RoleID
+        WHERE u.Username = ?
+    """, (username,))
+    rows = cursor.fetchall()
+    if not rows:
+        return None
+    return (*rows[0][:5], [row[5] for row in rows if row[5] is not None])
+
+
+def update_password_hash(cursor, user_id, password_hash):
+    cursor.execute("UPDATE Users SET PasswordHash = ? WHERE UserID = ?", (password_hash, user_id))
+
+
+def fetch_items(cursor, tenant_id, item_ids=None):
+    if item_ids is None:
+        cursor.execute(ITEMS_QUERY, (tenant_id,))
+    else:
+        placeholders = ', '.join('?' * len(item_ids))
+        cursor.execute(f"{ITEMS_QUERY} AND ItemID IN ({placeholders})", [tenant_id, *item_ids])
+    return cursor.fetchall()
+
+
+def insert_item(cursor, tenant_id, item_name, category, quantity, price):
+    """Insert an item and return its ItemID (caller commits)."""
+    cursor.execute(dialect_of(cursor).insert_returning(
+        'Items', ['TenantID', 'ItemName', 'Category', 'Quantity', 'Price'], 'ItemID',
+    ), (tenant_id, item_name, category, quantity, price))
+    return int(cursor.fetchone()[0])
+
+
+def update_item(cursor, tenant_id, item_id, item_name, category, quantity, price):
+    """Update one of the tenant's items; returns the number of rows updated (caller commits)."""
+    cursor.execute("""
+        UPDATE Items
+        SET ItemName = ?, Category = ?, Quantity = ?, Price = ?
+        WHERE ItemID = ? AND TenantID = ?
+    """, (item_name, category, quantity, price, item_id, tenant_id))
+    return cursor.rowcount
+
+
+def delete_item(cursor, tenant_id, item_id):
+    """Delete one of the tenant's items; returns the number of rows deleted (caller commits)."""
+    cursor.execute("DELETE FROM Items WHERE ItemID = ? AND TenantID = ?", (item_id, tenant_id))
+    return cursor.rowcount
+
+
+def fetch_transaction(cursor, tenant_id, transaction_id):
+    """(TransactionID, TransactionDate, Username, TotalAmount, Discount, NetAmount, RowVersion) or None."""
+    cursor.execute(f"""
+        SELECT tm.TransactionID, tm.TransactionDate, tm.Username,
+               tm.TotalAmount, tm.Discount, tm.NetAmount,
+               {dialect_of(cursor).rowversion('tm.RowVersion')}
+        FROM TransactionMaster tm
+        WHERE tm.TransactionID = ? AND tm.TenantID = ?
+    """, (transaction_id, tenant_id))
+    return cursor.fetchone()
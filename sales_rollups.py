@@ -0,0 +1,186 @@
+from datetime import date, timedelta
+
+from db_backend import counter_shard, dialect_of
+from transaction_queries import DEFAULT_USERNAME_MATCH, LIKE_ESCAPE, escape_like
+
+# Sales totals per (tenant, user) and day, plus the same per calendar month,
+# keyed by tenant first.
+# Checkouts add to both in their own transaction, each to one of
+# COUNTER_SHARDS rows per key so concurrent sales don't queue on one row;
+# backfill_sales() recomputes history into shard 0. A summary over any date
+# range reads whole months from SalesMonthly and at most two partial months of
+# days from SalesDaily, so it touches (months + ~60 days) x users x shards rows
+# however many transactions there are.
+
+
+def record_sale(cursor, tenant_id, username, transaction_date, total_amount, discount, net_amount):
+    """Add one sale to the user's daily and monthly rollups (caller commits)."""
+    dialect = dialect_of(cursor)
+    amounts = [total_amount or 0, discount or 0, net_amount or 0]
+    shard = counter_shard()
+    for table, column, period in (
+        ('SalesDaily', 'SaleDate', dialect.to_date('?')),
+        ('SalesMonthly', 'SaleMonth', dialect.month_start('?')),
+    ):
+        dates = [transaction_date] * period.count('?')
+        cursor.execute(dialect.upsert(
+            table,
+            keys=[('TenantID', '?'), (column, period), ('Username', '?'), ('Shard', '?')],
+            increments=[('TransactionCount', '1'), ('TotalAmount', '?'), ('Discount', '?'), ('NetAmount', '?')],
+        ), [tenant_id, *dates, username, shard, *amounts])
+
+
+def _month_start(day):
+    return day.replace(day=1)
+
+
+def _next_month(day):
+    return (_month_start(day) + timedelta(days=32)).replace(day=1)
+
+
+def summary_ranges(start_date=None, end_date=None):
+    """Split an inclusive date range into whole months and the leftover days.
+
+    Returns (months, days): months is (first, stop) over SaleMonth, days a
+    list of (first, last) day ranges; None means unbounded. months is None
+    when the range holds no whole month.
+    """
+    start = date.fromisoformat(start_date) if start_date else None
+    end = date.fromisoformat(end_date) if end_date else None
+    if start and end and start > end:
+        return None, []
+
+    # Whole months are those starting on or after start and ending on or before end
+    month_from = start if start is None or start.day == 1 else _next_month(start)
+    month_stop = None if end is None else (
+        _next_month(end) if end + timedelta(days=1) == _next_month(end) else _month_start(end)
+    )
+    if month_from and month_stop and month_from >= month_stop:
+        return None, [(start, end)]
+
+    days = []
+    if start and start < month_from:
+        days.append((start, month_from - timedelta(days=1)))
+    if end and month_stop <= end:
+        days.append((month_stop, end))
+    return (month_from, month_stop), days
+
+
+def _username_clause(username, username_match):
+    if not username:
+        return '', []
+    if username_match == 'exact':
+        return ' AND Username = ?', [username]
+    if username_match == 'prefix':
+        return f' AND Username LIKE ? {LIKE_ESCAPE}', [f'{escape_like(username)}%']
+    return f' AND Username LIKE ? {LIKE_ESCAPE}', [f'%{escape_like(username)}%']
+
+
+def fetch_sales_summary(cursor, tenant_id, start_date=None, end_date=None, username=None,
+                        username_match=DEFAULT_USERNAME_MATCH):
+    """(count, total, discount, net) of the tenant's sales in the range, summed from the rollups."""
+    months, days = summary_ranges(start_date, end_date)
+    user_sql, user_params = _username_clause(username, username_match)
+    parts, params = [], []
+
+    if months:
+        clauses = ['TenantID = ?']
+        params.append(tenant_id)
+        if months[0]:
+            clauses.append('SaleMonth >= ?')
+            params.append(months[0])
+        if months[1]:
+            clauses.append('SaleMonth < ?')
+            params.append(months[1])
+        parts.append(f"""
+            SELECT TransactionCount, TotalAmount, Discount, NetAmount
+            FROM SalesMonthly
+            WHERE {' AND '.join(clauses)}{user_sql}
+        """)
+        params.extend(user_params)
+
+    for first, last in days:
+        clauses = ['TenantID = ?']
+        params.append(tenant_id)
+        if first:
+            clauses.append('SaleDate >= ?')
+            params.append(first)
+        if last:
+            clauses.append('SaleDate <= ?')
+            params.append(last)
+        parts.append(f"""
+            SELECT TransactionCount, TotalAmount, Discount, NetAmount
+            FROM SalesDaily
+            WHERE {' AND '.join(clauses)}{user_sql}
+        """)
+        params.extend(user_params)
+
+    if not parts:
+        return 0, 0.0, 0.0, 0.0
+    cursor.execute(f"""
+        SELECT COALESCE(SUM(r.TransactionCount), 0), COALESCE(SUM(r.TotalAmount), 0),
+               COALESCE(SUM(r.Discount), 0), COALESCE(SUM(r.NetAmount), 0)
+        FROM ({' UNION ALL '.join(parts)}) AS r
+    """, params)
+    count, total, discount, net = cursor.fetchone()
+    return int(count), float(total), float(discount), float(net)
+
+
+def _backfill_month(cursor, month):
+    dialect = dialect_of(cursor)
+    stop = _next_month(month)
+    # Shared table lock first: in-flight checkouts finish (they touch the
+    # rollups last) and new ones wait, so none is counted twice or missed.
+    # On SQLite the first DELETE takes the database write lock, which does the same
+    cursor.execute(f"SELECT COUNT(*) FROM TransactionMaster{dialect.table_hint('TABLOCK', 'HOLDLOCK')} "
+                   "WHERE TransactionDate >= ? AND TransactionDate < ?", (month, stop))
+    cursor.execute(f"DELETE FROM SalesDaily{dialect.table_hint('TABLOCKX')} WHERE SaleDate >= ? AND SaleDate < ?",
+                   (month, stop))
+    cursor.execute(f"DELETE FROM SalesMonthly{dialect.table_hint('TABLOCKX')} WHERE SaleMonth = ?", (month,))
+    sale_date = dialect.to_date('tm.TransactionDate')
+    cursor.execute(f"""
+        INSERT INTO SalesDaily (TenantID, SaleDate, Username, TransactionCount, TotalAmount, Discount, NetAmount)
+        SELECT tm.TenantID, {sale_date}, tm.Username,
+               COUNT(*), COALESCE(SUM(tm.TotalAmount), 0), COALESCE(SUM(tm.Discount), 0),
+               COALESCE(SUM(tm.NetAmount), 0)
+        FROM TransactionMaster tm
+        WHERE tm.TransactionDate >= ? AND tm.TransactionDate < ?
+        GROUP BY tm.TenantID, {sale_date}, tm.Username
+    """, (month, stop))
+    cursor.execute("""
+        INSERT INTO SalesMonthly (TenantID, SaleMonth, Username, TransactionCount, TotalAmount, Discount, NetAmount)
+        SELECT TenantID, ?, Username, SUM(TransactionCount), SUM(TotalAmount), SUM(Discount), SUM(NetAmount)
+        FROM SalesDaily
+        WHERE SaleDate >= ? AND SaleDate < ?
+        GROUP BY TenantID, Username
+    """, (month, month, stop))
+
+
+def backfill_sales(conn, start_date=None, end_date=None):
+    """Rebuild the rollups from TransactionMaster, one committed month at a time.
+
+    The range is widened to whole months; without bounds it covers every
+    transaction. Yields each month as it is committed.
+    """
+    cursor = conn.cursor()
+    dialect = dialect_of(cursor)
+    if not (start_date and end_date):
+        cursor.execute(f"SELECT {dialect.to_date('MIN(TransactionDate)')}, {dialect.to_date('MAX(TransactionDate)')} "
+                       "FROM TransactionMaster")
+        first, last = cursor.fetchone()
+        if first is None:
+            return
+        start_date = start_date or str(first)
+        end_date = end_date or str(last)
+
+    month = _month_start(date.fromisoformat(str(start_date)))
+    last_month = _month_start(date.fromisoformat(str(end_date)))
+    while month <= last_month:
+        try:
+            _backfill_month(cursor, month)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        yield month
+        month = _next_month(month)
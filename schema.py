@@ -0,0 +1,63 @@
+import os
+import re
+
+from db_backend import dialect_of
+
+_BATCH_SEPARATOR = re.compile(r'^\s*GO\s*$', re.IGNORECASE | re.MULTILINE)
+
+
+_MIGRATIONS_TABLE = {
+    'mssql': """
+        IF OBJECT_ID('SchemaMigrations') IS NULL
+            CREATE TABLE SchemaMigrations (
+                Name NVARCHAR(255) NOT NULL PRIMARY KEY,
+                AppliedAt DATETIME2 NOT NULL DEFAULT SYSUTCDATETIME()
+            )
+    """,
+    'sqlite': """
+        CREATE TABLE IF NOT EXISTS SchemaMigrations (
+            Name TEXT NOT NULL PRIMARY KEY,
+            AppliedAt TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """,
+}
+
+
+def migration_files(directory):
+    return sorted(
+        name for name in os.listdir(directory)
+        if name.endswith('.sql')
+    )
+
+
+def split_batches(sql):
+    # GO is a client-side batch separator, not T-SQL, so split on it ourselves
+    return [batch.strip() for batch in _BATCH_SEPARATOR.split(sql) if batch.strip()]
+
+
+def apply_migrations(conn):
+    """Apply every migration file not yet recorded in SchemaMigrations.
+
+    SQL Server runs migrations/*.sql, SQLite migrations/sqlite/*.sql.
+    """
+    cursor = conn.cursor()
+    dialect = dialect_of(cursor)
+    cursor.execute(_MIGRATIONS_TABLE[dialect.name])
+    conn.commit()
+
+    cursor.execute("SELECT Name FROM SchemaMigrations")
+    applied = {row[0] for row in cursor.fetchall()}
+
+    newly_applied = []
+    for name in migration_files(dialect.migrations_dir):
+        if name in applied:
+            continue
+        with open(os.path.join(dialect.migrations_dir, name), encoding='utf-8') as f:
+            batches = split_batches(f.read())
+        for batch in batches:
+            cursor.execute(batch)
+        cursor.execute("INSERT INTO SchemaMigrations (Name) VALUES (?)", (name,))
+        conn.commit()
+        newly_applied.append(name)
+
+    return newly_applied
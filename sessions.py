@@ -0,0 +1,220 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+
+SESSION_STORES = ('memory', 'sqlite')
+SESSION_TTL = 8 * 3600
+SESSION_MAX_ENTRIES = 10000
+DEFAULT_SESSION_DB = 'sessions.db'
+# Seconds between sweeps of expired rows from the SQLite store
+SESSION_PURGE_INTERVAL = 300
+# Last-seen times older than this are swept with the expired sessions
+ACTIVE_USER_RETENTION = 24 * 3600
+
+
+class MemorySessionStore:
+    """Sessions in this process, LRU-evicted beyond ``max_entries``.
+
+    Only for a single web worker: other processes can't see these sessions.
+    """
+
+    shared = False
+
+    def __init__(self, ttl=SESSION_TTL, max_entries=SESSION_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._sessions = OrderedDict()   # sid -> (data, expires_at)
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        """(data, expires_at) or None if unknown or expired."""
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(sid)
+            if entry is None:
+                return None
+            if entry[1] <= now:
+                del self._sessions[sid]
+                return None
+            self._sessions.move_to_end(sid)
+            return entry
+
+    def set(self, sid, data):
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._sessions[sid] = (data, expires_at)
+            self._sessions.move_to_end(sid)
+            while len(self._sessions) > self.max_entries:
+                self._sessions.popitem(last=False)
+        return expires_at
+
+    def delete(self, sid):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SqliteSessionStore:
+    """Sessions in a local SQLite file, shared by every worker on the host.
+
+    Also keeps each user's last-seen time, so every worker counts the same
+    active users.
+    """
+
+    shared = True
+
+    def __init__(self, path=DEFAULT_SESSION_DB, ttl=SESSION_TTL):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._last_purge = 0.0
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS Sessions (
+                SessionID TEXT PRIMARY KEY,
+                Data TEXT NOT NULL,
+                ExpiresAt REAL NOT NULL
+            )
+        """)
+        self._connect().execute("""
+            CREATE TABLE IF NOT EXISTS ActiveUsers (
+                TenantID INTEGER NOT NULL,
+                UserID INTEGER NOT NULL,
+                LastSeen REAL NOT NULL,
+                PRIMARY KEY (TenantID, UserID)
+            )
+        """)
+
+    def _connect(self):
+        # One connection per thread, and new ones after a fork
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, sid):
+        row = self._connect().execute(
+            "SELECT Data, ExpiresAt FROM Sessions WHERE SessionID = ? AND ExpiresAt > ?",
+            (sid, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), row[1]
+
+    def set(self, sid, data):
+        now = time.time()
+        expires_at = now + self.ttl
+        conn = self._connect()
+        conn.execute("""
+            INSERT INTO Sessions (SessionID, Data, ExpiresAt) VALUES (?, ?, ?)
+            ON CONFLICT (SessionID) DO UPDATE SET Data = excluded.Data, ExpiresAt = excluded.ExpiresAt
+        """, (sid, json.dumps(data, separators=(',', ':')), expires_at))
+        if now - self._last_purge > SESSION_PURGE_INTERVAL:
+            self._last_purge = now
+            conn.execute("DELETE FROM Sessions WHERE ExpiresAt <= ?", (now,))
+            conn.execute("DELETE FROM ActiveUsers WHERE LastSeen <= ?", (now - ACTIVE_USER_RETENTION,))
+        return expires_at
+
+    def delete(self, sid):
+        self._connect().execute("DELETE FROM Sessions WHERE SessionID = ?", (sid,))
+
+    def __len__(self):
+        return self._connect().execute("SELECT COUNT(*) FROM Sessions WHERE ExpiresAt > ?",
+                                       (time.time(),)).fetchone()[0]
+
+    def touch_user(self, tenant_id, user_id, seen_at):
+        self._connect().execute("""
+            INSERT INTO ActiveUsers (TenantID, UserID, LastSeen) VALUES (?, ?, ?)
+            ON CONFLICT (TenantID, UserID) DO UPDATE SET LastSeen = MAX(LastSeen, excluded.LastSeen)
+        """, (tenant_id, user_id, seen_at))
+
+    def forget_user(self, tenant_id, user_id):
+        self._connect().execute("DELETE FROM ActiveUsers WHERE TenantID = ? AND UserID = ?", (tenant_id, user_id))
+
+    def count_active_users(self, tenant_id, since):
+        return self._connect().execute("SELECT COUNT(*) FROM ActiveUsers WHERE TenantID = ? AND LastSeen > ?",
+                                       (tenant_id, since)).fetchone()[0]
+
+
+def create_session_store(name, ttl=SESSION_TTL, max_entries=SESSION_MAX_ENTRIES, path=DEFAULT_SESSION_DB):
+    if name == 'memory':
+        return MemorySessionStore(ttl, max_entries)
+    if name == 'sqlite':
+        return SqliteSessionStore(path, ttl)
+    raise ValueError(f"SESSION_STORE must be one of: {', '.join(SESSION_STORES)}")
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    def __init__(self, data=None, sid=None, expires_at=None):
+        def on_update(self):
+            self.modified = True
+        super().__init__(data, on_update)
+        self.sid = sid
+        self.expires_at = expires_at
+        self.new = sid is None
+        self.modified = False
+        self.rotate = False
+
+
+def rotate_session(session):
+    """Give the session a fresh id when it is next saved (call on login)."""
+    session.rotate = True
+    session.modified = True
+
+
+class ServerSessionInterface(SessionInterface):
+    """Keeps session data in ``store``; the cookie carries only a random session id.
+
+    Expiry slides: a session used after half its TTL has passed is saved
+    again with a full TTL, so reads don't write to the store every request.
+    """
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            entry = self.store.get(sid)
+            if entry is not None:
+                return ServerSession(entry[0], sid, entry[1])
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+
+        if not session:
+            if session.sid is not None and session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        refresh = session.expires_at is not None and session.expires_at - time.time() < self.store.ttl / 2
+        if not (session.modified or refresh):
+            return
+        if session.rotate and session.sid is not None:
+            # A new id on login, so an id planted before it can't ride along
+            self.store.delete(session.sid)
+            session.sid = None
+        if session.sid is None:
+            session.sid = secrets.token_urlsafe(32)
+        self.store.set(session.sid, dict(session))
+        response.set_cookie(
+            name, session.sid, max_age=int(self.store.ttl), domain=domain, path=path,
+            secure=self.get_cookie_secure(app), httponly=self.get_cookie_httponly(app),
+            samesite=self.get_cookie_samesite(app),
+        )
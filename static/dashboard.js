@@ -471,16 +471,51 @@ function deleteItem(itemID) {
 }
 
 // Search items function
+let searchTimer = null
+let searchSeq = 0
+
 function searchItems() {
-  const searchTerm = document.getElementById("itemSearch").value.toLowerCase()
+  // Debounced: the server-side index ranks matches, only the top results are sent
+  clearTimeout(searchTimer)
+  searchTimer = setTimeout(runItemSearch, 150)
+}
+
+async function runItemSearch() {
+  const searchTerm = document.getElementById("itemSearch").value.trim()
+  if (!searchTerm) {
+    loadPOSItems()
+    return
+  }
+
+  const seq = ++searchSeq
+  let results = []
+  try {
+    const response = await fetch(`/api/items/search?q=${encodeURIComponent(searchTerm)}&limit=50`, {
+      credentials: "include",
+    })
+    if (!response.ok) {
+      showMessage("Error searching items", "error")
+      return
+    }
+    results = await response.json()
+  } catch (error) {
+    console.error("Error searching items:", error)
+    return
+  }
+  // A newer keystroke's search has been started; drop this stale result
+  if (seq !== searchSeq) return
+
   const itemGrid = document.getElementById("itemGrid")
   itemGrid.innerHTML = ""
 
-  const filteredItems = items.filter(
-    (item) => item.itemName.toLowerCase().includes(searchTerm) || item.category.toLowerCase().includes(searchTerm),
-  )
-
-  filteredItems.forEach((item) => {
+  results.forEach((result) => {
+    const item = {
+      itemID: result.ItemID,
+      itemName: result.ItemName,
+      category: result.Category,
+      quantity: result.Quantity,
+      price: result.Price,
+    }
     const itemCard = document.createElement("div")
     itemCard.className = "item-card"
     itemCard.innerHTML = `
@@ -0,0 +1,124 @@
+import threading
+import time
+
+from db_backend import counter_shard, dialect_of
+
+ACTIVE_USER_WINDOW = 15 * 60
+# A user's last-seen time is written to the shared store at most this often
+ACTIVE_USER_WRITE_INTERVAL = 60
+
+
+def _bump_tenant(cursor, tenant_id, items=0, transactions=0, revenue=0):
+    dialect = dialect_of(cursor)
+    cursor.execute(dialect.upsert(
+        'TenantStats',
+        keys=[('TenantID', '?'), ('Shard', '?')],
+        increments=[('TotalItems', '?'), ('TotalTransactions', '?'), ('TotalRevenue', '?')],
+        sets=[('UpdatedAt', dialect.now())],
+    ), (tenant_id, counter_shard(), items, transactions, revenue))
+
+
+def record_transaction(cursor, tenant_id, transaction_date, net_amount):
+    """Add one sale to the tenant's running and per-day totals (caller commits).
+
+    Each total is kept in COUNTER_SHARDS rows and the sale lands on a random
+    one, so concurrent checkouts of a tenant don't queue on a single row.
+    """
+    net_amount = net_amount or 0
+    dialect = dialect_of(cursor)
+    cursor.execute(dialect.upsert(
+        'DailyTenantStats',
+        keys=[('TenantID', '?'), ('StatDate', dialect.to_date('?')), ('Shard', '?')],
+        increments=[('TransactionCount', '1'), ('Revenue', '?')],
+    ), (tenant_id, transaction_date, counter_shard(), net_amount))
+    _bump_tenant(cursor, tenant_id, transactions=1, revenue=net_amount)
+
+
+def record_items(cursor, tenant_id, delta):
+    """Adjust the tenant's item count by ``delta`` (caller commits)."""
+    if delta:
+        _bump_tenant(cursor, tenant_id, items=delta)
+
+
+def read_stats(cursor, tenant_id):
+    cursor.execute("""
+        SELECT SUM(TotalItems), SUM(TotalTransactions), SUM(TotalRevenue)
+        FROM TenantStats
+        WHERE TenantID = ?
+    """, (tenant_id,))
+    row = cursor.fetchone()
+    return {
+        'totalItems': int(row[0] or 0) if row else 0,
+        'totalTransactions': int(row[1] or 0) if row else 0,
+        'totalRevenue': float(row[2] or 0) if row else 0.0,
+    }
+
+
+def rebuild_stats(cursor):
+    """Recompute every running total from the base tables (caller commits)."""
+    dialect = dialect_of(cursor)
+    # Exclusive locks keep concurrent writers out until the rebuild commits
+    cursor.execute(f"DELETE FROM DailyTenantStats{dialect.table_hint('TABLOCKX')}")
+    cursor.execute(f"DELETE FROM TenantStats{dialect.table_hint('TABLOCKX')}")
+
+    stat_date = dialect.to_date('tm.TransactionDate')
+    cursor.execute(f"""
+        INSERT INTO DailyTenantStats (TenantID, StatDate, TransactionCount, Revenue)
+        SELECT tm.TenantID, {stat_date}, COUNT(*), COALESCE(SUM(tm.NetAmount), 0)
+        FROM TransactionMaster tm
+        GROUP BY tm.TenantID, {stat_date}
+    """)
+
+    cursor.execute("""
+        INSERT INTO TenantStats (TenantID, TotalItems, TotalTransactions, TotalRevenue)
+        SELECT TenantID, 0, SUM(TransactionCount), SUM(Revenue)
+        FROM DailyTenantStats
+        GROUP BY TenantID
+    """)
+
+    cursor.execute("SELECT TenantID, COUNT(*) FROM Items GROUP BY TenantID")
+    for tenant_id, count in cursor.fetchall():
+        record_items(cursor, tenant_id, count)
+
+
+class ActiveUserTracker:
+    """Count of users seen within the last ``window`` seconds.
+
+    Without a ``store`` the count is per process, which is only right with a
+    single web worker. With a shared store (the SQLite session store) each
+    user's last-seen time is written there at most every
+    ACTIVE_USER_WRITE_INTERVAL seconds, and every worker counts from it.
+    """
+
+    def __init__(self, window=ACTIVE_USER_WINDOW, store=None, write_interval=ACTIVE_USER_WRITE_INTERVAL):
+        self.window = window
+        self.store = store
+        self.write_interval = write_interval
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    def touch(self, tenant_id, user_id):
+        now = time.monotonic()
+        with self._lock:
+            users = self._seen.setdefault(tenant_id, {})
+            if self.store is not None and now - users.get(user_id, -self.write_interval) < self.write_interval:
+                return
+            users[user_id] = now
+        if self.store is not None:
+            self.store.touch_user(tenant_id, user_id, time.time())
+
+    def forget(self, tenant_id, user_id):
+        with self._lock:
+            self._seen.get(tenant_id, {}).pop(user_id, None)
+        if self.store is not None:
+            self.store.forget_user(tenant_id, user_id)
+
+    def count(self, tenant_id):
+        if self.store is not None:
+            return self.store.count_active_users(tenant_id, time.time() - self.window)
+        cutoff = time.monotonic() - self.window
+        with self._lock:
+            users = self._seen.get(tenant_id, {})
+            for user_id in [u for u, seen in users.items() if seen < cutoff]:
+                del users[user_id]
+            return len(users)
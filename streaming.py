@@ -0,0 +1,103 @@
+import json
+from contextlib import ExitStack
+
+from flask import Response
+
+FETCH_BATCH_SIZE = 1000
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_stream(request):
+    return (
+        request.args.get('stream', '').lower() in ('1', 'true', 'yes')
+        or wants_ndjson(request)
+    )
+
+
+def wants_ndjson(request):
+    return (
+        request.args.get('format') == 'ndjson'
+        or request.accept_mimetypes.best == NDJSON_MIMETYPE
+    )
+
+
+def iter_rows(cursor, batch_size=FETCH_BATCH_SIZE):
+    # fetchmany keeps at most one batch of driver rows alive at a time
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield from rows
+
+
+def json_array_chunks(rows, to_dict, batch_size=FETCH_BATCH_SIZE):
+    yield '['
+    separator = ''
+    batch = []
+    for row in rows:
+        batch.append(json.dumps(to_dict(row)))
+        if len(batch) >= batch_size:
+            yield separator + ','.join(batch)
+            separator = ','
+            batch = []
+    if batch:
+        yield separator + ','.join(batch)
+    yield ']'
+
+
+def ndjson_chunks(rows, to_dict, batch_size=FETCH_BATCH_SIZE):
+    batch = []
+    for row in rows:
+        batch.append(json.dumps(to_dict(row)))
+        if len(batch) >= batch_size:
+            yield '\n'.join(batch) + '\n'
+            batch = []
+    if batch:
+        yield '\n'.join(batch) + '\n'
+
+
+def stream_query(connection, query, params, to_dict, ndjson=False, batch_size=FETCH_BATCH_SIZE):
+    """Run ``query`` and stream its rows as a JSON array (or NDJSON).
+
+    ``connection`` is a context manager yielding a DB connection (or None when
+    unavailable, in which case None is returned). The connection is held for the
+    lifetime of the response and released when the response is closed.
+    """
+    chunks = ndjson_chunks if ndjson else json_array_chunks
+    return stream_chunks(
+        connection, query, params,
+        lambda rows: chunks(rows, to_dict, batch_size),
+        mimetype=NDJSON_MIMETYPE if ndjson else 'application/json',
+        batch_size=batch_size,
+    )
+
+
+def stream_chunks(connection, query, params, encode, mimetype, headers=None, batch_size=FETCH_BATCH_SIZE):
+    """Run ``query`` and stream ``encode(rows)`` as the response body.
+
+    ``encode`` turns the fetchmany row iterator into body chunks (str or bytes);
+    connection handling is the same as stream_query().
+    """
+    stack = ExitStack()
+    conn = stack.enter_context(connection)
+    if not conn:
+        stack.close()
+        return None
+
+    try:
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+    except Exception:
+        stack.close()
+        raise
+
+    def generate():
+        try:
+            yield from encode(iter_rows(cursor, batch_size))
+        except Exception as e:
+            # Headers are already sent; all we can do is stop the stream
+            print(f"Error while streaming rows: {e}")
+
+    response = Response(generate(), mimetype=mimetype, headers=headers)
+    response.call_on_close(stack.close)
+    return response
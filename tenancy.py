@@ -0,0 +1,54 @@
+import json
+import threading
+
+from db_backend import create_backend
+
+
+class PerTenant:
+    """Process-wide helpers (change feeds, search indexes) kept one per tenant.
+
+    ``factory(tenant_id)`` builds a tenant's instance the first time it is
+    asked for, so a process only pays for the tenants it actually serves.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instances = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, tenant_id):
+        instance = self._instances.get(tenant_id)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(tenant_id)
+                if instance is None:
+                    instance = self._instances[tenant_id] = self._factory(tenant_id)
+        return instance
+
+    def items(self):
+        with self._lock:
+            return list(self._instances.items())
+
+
+def parse_tenant_databases(text):
+    """{TenantID: backend} for tenants whose data lives in a database of their own.
+
+    ``text`` is a JSON object keyed by TenantID, e.g.
+    {"7": {"backend": "sqlite", "path": "/data/tenant7.db"},
+     "9": {"backend": "mssql", "connectionString": "Driver=...;Database=RBAC_T9;..."}}
+    Users, roles and tenants always stay in the main database.
+    """
+    if not text:
+        return {}
+    try:
+        config = json.loads(text)
+        return {
+            int(tenant_id): create_backend(
+                database['backend'],
+                conn_str=database.get('connectionString'),
+                sqlite_path=database['path'] if database['backend'] == 'sqlite' else None,
+            )
+            for tenant_id, database in config.items()
+        }
+    except (AttributeError, KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid TENANT_DATABASES: {e}")
@@ -0,0 +1,132 @@
+import base64
+import json
+from datetime import datetime
+
+from db_backend import SQL_SERVER
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+# How the username filter matches. 'contains' (the default, matching
+# anywhere) has a leading wildcard and scans the tenant's transactions;
+# 'exact' and 'prefix' are opt-in and seek IX_TransactionMaster_Tenant_Username
+USERNAME_MATCH_MODES = ('contains', 'prefix', 'exact')
+DEFAULT_USERNAME_MATCH = 'contains'
+
+TRANSACTION_COLUMNS = """tm.TransactionID, tm.TransactionDate, tm.Username,
+                   tm.TotalAmount, tm.Discount, tm.NetAmount"""
+
+
+def parse_username_match(value):
+    match = value or DEFAULT_USERNAME_MATCH
+    if match not in USERNAME_MATCH_MODES:
+        raise ValueError(f"username_match must be one of: {', '.join(USERNAME_MATCH_MODES)}")
+    return match
+
+
+# Backslash-escaped LIKE patterns read the same in T-SQL and SQLite
+LIKE_ESCAPE = "ESCAPE '\\'"
+
+
+def escape_like(value):
+    # Escape LIKE's wildcards (and T-SQL's [...] sets) so user input only ever matches literally
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_').replace('[', '\\[')
+
+
+def build_transaction_filters(tenant_id, start_date=None, end_date=None, username=None,
+                              username_match=DEFAULT_USERNAME_MATCH):
+    """Return (where_clauses, params) for the shared transaction filters.
+
+    Always scoped to ``tenant_id``, which leads every TransactionMaster index.
+    """
+    clauses = ["tm.TenantID = ?"]
+    params = [tenant_id]
+
+    if start_date:
+        clauses.append("tm.TransactionDate >= ?")
+        params.append(start_date)
+
+    if end_date:
+        clauses.append("tm.TransactionDate <= ?")
+        params.append(end_date + ' 23:59:59')  # Include full day
+
+    if username:
+        if username_match == 'exact':
+            clauses.append("tm.Username = ?")
+            params.append(username)
+        elif username_match == 'prefix':
+            clauses.append(f"tm.Username LIKE ? {LIKE_ESCAPE}")
+            params.append(f'{escape_like(username)}%')
+        else:
+            clauses.append(f"tm.Username LIKE ? {LIKE_ESCAPE}")
+            params.append(f'%{escape_like(username)}%')
+
+    return clauses, params
+
+
+# Lines of one transaction (invoice PDF); seeks IX_TransactionDetails_TransactionID
+TRANSACTION_LINES_QUERY = """
+    SELECT td.ItemName, td.Quantity, td.Price, td.Amount
+    FROM TransactionDetails td
+    WHERE td.TransactionID = ?
+"""
+
+
+def where_sql(clauses):
+    return " WHERE " + " AND ".join(clauses) if clauses else ""
+
+
+def parse_page_size(value):
+    try:
+        size = int(value) if value not in (None, '') else DEFAULT_PAGE_SIZE
+    except (TypeError, ValueError):
+        raise ValueError('limit must be an integer')
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+
+def encode_cursor(transaction_date, transaction_id):
+    payload = json.dumps([transaction_date.isoformat(), transaction_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        transaction_date, transaction_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(transaction_date), int(transaction_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def keyset_page_query(clauses, params, page_size, cursor=None, dialect=SQL_SERVER):
+    """Newest-first page of transactions after ``cursor`` (TransactionDate, TransactionID).
+
+    Fetches one extra row so the caller can tell whether another page exists.
+    """
+    clauses = list(clauses)
+    params = list(params)
+    if cursor:
+        after_date, after_id = decode_cursor(cursor)
+        clauses.append(
+            "(tm.TransactionDate < ? OR (tm.TransactionDate = ? AND tm.TransactionID < ?))"
+        )
+        params.extend([after_date, after_date, after_id])
+
+    query = f"""
+            SELECT {dialect.top(page_size + 1)} {TRANSACTION_COLUMNS}
+            FROM TransactionMaster tm
+            {where_sql(clauses)}
+            ORDER BY tm.TransactionDate DESC, tm.TransactionID DESC
+            {dialect.limit(page_size + 1)}
+        """
+    return query, params
+
+
+def transaction_to_dict(row):
+    return {
+        'TransactionID': row[0],
+        'TransactionDate': row[1].isoformat() if row[1] else None,
+        'Username': row[2],
+        'TotalAmount': float(row[3]) if row[3] else 0,
+        'Discount': float(row[4]) if row[4] else 0,
+        'NetAmount': float(row[5]) if row[5] else 0
+    }